@@ -1,14 +1,39 @@
 from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.utils.html import format_html
-from mainApp.models import Service, SitterService, Ad, Pet, Order
+from mainApp import search
+from mainApp.images import variant_url
+from mainApp.models import Service, SitterService, SitterAvailability, Ad, Pet, Order, OrderMessage, RatingSummary, Job
+from userApp.models import Address
+
+
+class FullTextSearchMixin:
+    """Search the changelist (and autocomplete) through the full-text index
+    named by ``search_index`` instead of LIKE scans over ``search_fields``,
+    which list the same lookups and only serve input without any words."""
+    search_index = None
+
+    def search_filter(self, terms, search_term, alias):
+        return search.matching(self.search_index, terms, alias)
+
+    def get_search_results(self, request, queryset, search_term):
+        terms = search.search_terms(search_term)
+        if not terms:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(self.search_filter(terms, search_term.strip(), queryset.db)), False
 
 
 @admin.register(Service)
-class ServiceAdmin(admin.ModelAdmin):
+class ServiceAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("id", "name", "pet", "image_thumb", "created_at")
     list_display_links = ("id", "name")
     list_filter = ("pet", "created_at")
-    search_fields = ("name",)
+    search_fields = ("name", "description")
+    search_index = "services"
+    search_help_text = "Words in the name or description; each matches as a word prefix."
     readonly_fields = ("created_at", "updated_at", "image_preview")
 
     fieldsets = (
@@ -25,17 +50,22 @@ class ServiceAdmin(admin.ModelAdmin):
 
     def image_thumb(self, obj: Service):
         if obj.image:
-            return format_html('<img src="{}" style="height:40px; width:auto; object-fit:cover;"/>', obj.image.url)
+            return format_html('<img src="{}" style="height:40px; width:auto; object-fit:cover;"/>', variant_url(obj.image, obj.image_variants, "thumb"))
         return "-"
     image_thumb.short_description = "Image"
 
     def image_preview(self, obj: Service):
         if obj.image:
-            return format_html('<img src="{}" style="max-height:180px; width:auto; object-fit:contain; border:1px solid #ddd; padding:4px;"/>', obj.image.url)
+            return format_html('<img src="{}" style="max-height:180px; width:auto; object-fit:contain; border:1px solid #ddd; padding:4px;"/>', variant_url(obj.image, obj.image_variants, "card"))
         return "No image"
     image_preview.short_description = "Preview"
 
 
+class SitterAvailabilityInline(admin.TabularInline):
+    model = SitterAvailability
+    extra = 0
+
+
 @admin.register(SitterService)
 class SitterServiceAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "service", "address", "rate", "created_at")
@@ -43,6 +73,7 @@ class SitterServiceAdmin(admin.ModelAdmin):
     search_fields = ("user__username", "service__name", "address__city")
     autocomplete_fields = ("user", "service", "address")
     readonly_fields = ("created_at", "updated_at")
+    inlines = (SitterAvailabilityInline,)
 
 
 @admin.register(Ad)
@@ -67,23 +98,25 @@ class AdAdmin(admin.ModelAdmin):
 
     def image_thumb(self, obj: Ad):
         if obj.image:
-            return format_html('<img src="{}" style="height:40px; width:auto; object-fit:cover;"/>', obj.image.url)
+            return format_html('<img src="{}" style="height:40px; width:auto; object-fit:cover;"/>', variant_url(obj.image, obj.image_variants, "thumb"))
         return "-"
     image_thumb.short_description = "Image"
 
     def image_preview(self, obj: Ad):
         if obj.image:
-            return format_html('<img src="{}" style="max-height:180px; width:auto; object-fit:contain; border:1px solid #ddd; padding:4px;"/>', obj.image.url)
+            return format_html('<img src="{}" style="max-height:180px; width:auto; object-fit:contain; border:1px solid #ddd; padding:4px;"/>', variant_url(obj.image, obj.image_variants, "card"))
         return "No image"
     image_preview.short_description = "Preview"
 
 
 @admin.register(Pet)
-class PetAdmin(admin.ModelAdmin):
+class PetAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("id", "name", "pet", "breed", "age", "user", "image_thumb", "created_at")
     list_display_links = ("id", "name")
     list_filter = ("pet", "user", "created_at")
-    search_fields = ("name", "breed", "user__username")
+    search_fields = ("name", "breed", "bio", "^user__username")
+    search_index = "pets"
+    search_help_text = "Words in the name, breed or bio, or the start of the owner's username."
     autocomplete_fields = ("user",)
     readonly_fields = ("created_at", "updated_at", "image_preview")
 
@@ -102,27 +135,49 @@ class PetAdmin(admin.ModelAdmin):
         }),
     )
 
+    def search_filter(self, terms, search_term, alias):
+        # Subqueries rather than a JOIN, so each side of the OR stays an index lookup
+        return super().search_filter(terms, search_term, alias) | Q(user__in=User.objects.filter(search.starting_with("username", search_term)))
+
     def image_thumb(self, obj: Pet):
         if obj.image:
-            return format_html('<img src="{}" style="height:40px; width:auto; object-fit:cover;"/>', obj.image.url)
+            return format_html('<img src="{}" style="height:40px; width:auto; object-fit:cover;"/>', variant_url(obj.image, obj.image_variants, "thumb"))
         return "-"
     image_thumb.short_description = "Image"
 
     def image_preview(self, obj: Pet):
         if obj.image:
-            return format_html('<img src="{}" style="max-height:180px; width:auto; object-fit:contain; border:1px solid #ddd; padding:4px;"/>', obj.image.url)
+            return format_html('<img src="{}" style="max-height:180px; width:auto; object-fit:contain; border:1px solid #ddd; padding:4px;"/>', variant_url(obj.image, obj.image_variants, "card"))
         return "No image"
     image_preview.short_description = "Preview"
 
 
+class OrderMessageInline(admin.TabularInline):
+    model = OrderMessage
+    fields = ("sender", "text", "created_at")
+    readonly_fields = ("sender", "text", "created_at")
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        # Conversations are append-only through the API
+        return False
+
+
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("id", "normal_user", "petsitter_user", "service_model", "pet", "user_address", "quantity", "final_rate", "rating_for_petsitter", "rating_for_user", "status", "start_datetime", "created_at")
     list_display_links = ("id",)
     list_filter = ("status", "rating_for_petsitter", "rating_for_user", "start_datetime", "created_at")
-    search_fields = ("normal_user__username", "petsitter_user__username", "service_model__service__name", "pet__name", "user_address__city")
+    search_fields = (
+        "rating_review_for_petsitter", "rating_review_for_user", "service_model__service__name", "service_model__service__description",
+        "pet__name", "pet__breed", "pet__bio", "^normal_user__username", "^petsitter_user__username", "^user_address__city",
+    )
+    search_index = "reviews"
+    search_help_text = "Words in a review, the service or the pet, the start of a customer's or sitter's username, or the start of the city."
     autocomplete_fields = ("normal_user", "petsitter_user", "service_model", "pet", "user_address")
     readonly_fields = ("final_rate", "created_at", "updated_at")
+    inlines = (OrderMessageInline,)
 
     fieldsets = (
         ("Order Details", {
@@ -138,3 +193,36 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ("created_at", "updated_at")
         }),
     )
+
+    def search_filter(self, terms, search_term, alias):
+        users = User.objects.filter(search.starting_with("username", search_term))
+        # Served by address_city_lower_idx
+        addresses = Address.objects.alias(city_lower=Lower("city")).filter(search.starting_with("city_lower", search_term.lower()))
+        services = Service.objects.filter(search.matching("services", terms, alias))
+        pets = Pet.objects.filter(search.matching("pets", terms, alias))
+        return (
+            super().search_filter(terms, search_term, alias)
+            | Q(normal_user__in=users) | Q(petsitter_user__in=users)
+            | Q(service_model__in=SitterService.objects.filter(service__in=services))
+            | Q(pet__in=pets)
+            | Q(user_address__in=addresses)
+        )
+
+
+@admin.register(RatingSummary)
+class RatingSummaryAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "count", "average", "stars_1", "stars_2", "stars_3", "stars_4", "stars_5", "updated_at")
+    search_fields = ("user__username",)
+    readonly_fields = ("user", "count", "total", "stars_1", "stars_2", "stars_3", "stars_4", "stars_5", "updated_at")
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "max_attempts", "run_at", "locked_until", "created_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("attempts", "lock_token", "locked_until", "last_error", "created_at", "updated_at")
+    actions = ("retry_now",)
+
+    @admin.action(description="Retry selected jobs now")
+    def retry_now(self, request, queryset):
+        queryset.exclude(status="running").update(status="queued", run_at=timezone.now(), attempts=0, last_error="")
@@ -0,0 +1,106 @@
+"""Sitter calendars: availability windows, bookings and free time.
+
+Each order books its sitter from ``start_datetime`` to ``end_datetime``
+(by default ``quantity`` times BOOKINGS['UNIT_MINUTES'] later). A new order
+is refused when it overlaps a booking of the same sitter, on any of their
+services, whose order is still in BOOKED_STATUSES. A cancelled or completed
+order keeps its Booking row, but no longer holds the time. ``create_order``
+checks and inserts inside one transaction, with the sitter's row locked
+first on databases that support SELECT ... FOR UPDATE. On SQLite the
+transaction itself serializes writers.
+
+Sitters publish SitterAvailability windows per service. The free windows of
+many services over a range are their availability minus their sitter's
+bookings, read in one UNION query over the ``(…, ends_at)`` indexes and
+subtracted here in a single sweep per service.
+"""
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Value
+
+from mainApp.models import Booking, SitterAvailability
+
+DEFAULT_BOOKINGS = {"UNIT_MINUTES": 60}
+# Orders in these statuses hold their sitter's time
+BOOKED_STATUSES = ("pending", "approved")
+
+
+def _bookings_settings():
+    return {**DEFAULT_BOOKINGS, **getattr(settings, "BOOKINGS", {})}
+
+
+def default_end(start, quantity):
+    return start + timedelta(minutes=quantity * _bookings_settings()["UNIT_MINUTES"])
+
+
+def lock_sitter(sitter_id):
+    """Serialize bookings of one sitter until the transaction ends. Call inside atomic()."""
+    if connection.features.has_select_for_update:
+        list(User.objects.select_for_update().filter(id=sitter_id).values_list("id"))
+
+
+def is_booked(sitter_id, starts_at, ends_at):
+    """Whether any booking of ``sitter_id`` overlaps [starts_at, ends_at)."""
+    return Booking.objects.filter(
+        sitter_id=sitter_id, ends_at__gt=starts_at, starts_at__lt=ends_at, order__status__in=BOOKED_STATUSES,
+    ).exists()
+
+
+def _merged(intervals):
+    """Sorted, non-overlapping union of (start, end) pairs."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def subtract(windows, busy):
+    """Parts of ``windows`` not covered by ``busy``; both are (start, end) pairs."""
+    free = []
+    busy = _merged(busy)
+    i = 0
+    for start, end in _merged(windows):
+        # Busy intervals ending before this window cannot affect it or any later one
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < end:
+            if busy[j][0] > start:
+                free.append((start, busy[j][0]))
+            start = max(start, busy[j][1])
+            j += 1
+        if start < end:
+            free.append((start, end))
+    return free
+
+
+def free_windows(sitter_service_ids, start, end, min_duration=timedelta(0)):
+    """{sitter service id: [(start, end), ...]} of the free time in [start, end)
+    of each service, with windows shorter than ``min_duration`` left out."""
+    availability = SitterAvailability.objects.filter(
+        sitter_service_id__in=sitter_service_ids, ends_at__gt=start, starts_at__lt=end,
+    ).values_list("sitter_service_id", "starts_at", "ends_at", Value(False))
+    # A sitter's bookings make every one of their services busy
+    bookings = Booking.objects.filter(
+        sitter__sitter_services__id__in=sitter_service_ids, ends_at__gt=start, starts_at__lt=end,
+        order__status__in=BOOKED_STATUSES,
+    ).values_list("sitter__sitter_services__id", "starts_at", "ends_at", Value(True))
+
+    result = {service_id: [] for service_id in sitter_service_ids}
+    rows = sorted(availability.union(bookings, all=True), key=lambda row: row[0])
+    for service_id, service_rows in groupby(rows, key=lambda row: row[0]):
+        windows, busy = [], []
+        for _, starts_at, ends_at, is_booking in service_rows:
+            (busy if is_booking else windows).append((max(starts_at, start), min(ends_at, end)))
+        result[service_id] = [
+            window for window in subtract(windows, busy) if window[1] - window[0] >= min_duration
+        ]
+    return result
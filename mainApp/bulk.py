@@ -0,0 +1,30 @@
+"""Shared request handling for the bulk create endpoints.
+
+Bulk endpoints take ``{"<key>": [item, ...]}``, validate every item before
+writing anything, and insert all rows with one ``bulk_create`` in a single
+transaction: either every item is created or none is.
+"""
+from rest_framework import status
+from rest_framework.response import Response
+
+BULK_MAX_ITEMS = 500
+
+
+def bulk_items(data, key):
+    """Return ``(items, None)``, or ``(None, error_response)`` for a malformed body."""
+    items = data.get(key)
+    if not isinstance(items, list) or not items:
+        return None, Response({"error": f"{key} must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > BULK_MAX_ITEMS:
+        return None, Response({"error": f"At most {BULK_MAX_ITEMS} {key} per request"}, status=status.HTTP_400_BAD_REQUEST)
+    if not all(isinstance(item, dict) for item in items):
+        return None, Response({"error": f"Each of {key} must be an object"}, status=status.HTTP_400_BAD_REQUEST)
+    return items, None
+
+
+def invalid_items_response(errors):
+    """400 listing ``(index, message)`` pairs for the items that failed validation."""
+    return Response(
+        {"error": "Invalid items, nothing was created", "errors": [{"index": i, "error": e} for i, e in errors]},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
@@ -0,0 +1,125 @@
+"""Versioned response cache for the near-static catalog endpoints.
+
+Rendered JSON bytes are stored in the Django cache under the current catalog
+version, which is bumped once a transaction saving or deleting a Service or Ad
+commits, so no entry ever needs explicit invalidation. Entries expire after
+CATALOG_CACHE['TIMEOUT'] seconds, which also clears out those of retired
+versions. Each entry carries a strong ETag and ``If-None-Match`` is answered
+with a 304 from the cache alone, before DRF authentication, throttling or any
+database access. Versions and entries live in the configured
+``CACHES['default']``; use a shared backend when running several worker
+processes.
+"""
+import hashlib
+import threading
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+DEFAULT_CATALOG_CACHE = {"TIMEOUT": 3600}
+VERSION_KEY = "catalog:version"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(result):
+    with _stats_lock:
+        _stats[result] += 1
+
+
+def cache_stats():
+    """Snapshot of hit/miss/not_modified counters for this process."""
+    with _stats_lock:
+        return {result: _stats[result] for result in ("hit", "miss", "not_modified")}
+
+
+def _catalog_cache_settings():
+    return {**DEFAULT_CATALOG_CACHE, **getattr(settings, "CATALOG_CACHE", {})}
+
+
+def catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Key missing or evicted: any fresh value orphans the old entries
+        cache.set(VERSION_KEY, catalog_version() + 1, timeout=None)
+
+
+def _entry_key(request, version):
+    vary = f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}"
+    return f"catalog:{version}:{hashlib.sha1(vary.encode()).hexdigest()}"
+
+
+def _etag_matches(request, etag):
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return "*" in etags or etag in etags
+
+
+def cached_catalog_response(view):
+    """Cache successful JSON GET responses of ``view`` per catalog version.
+
+    Apply outside ``@api_view`` so cache hits skip DRF entirely. That includes
+    authentication, permissions and throttling, so only use it on public
+    views that apply none of them.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return view(request, *args, **kwargs)
+
+        key = _entry_key(request, catalog_version())
+        entry = cache.get(key)
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if hasattr(response, "render"):
+                response.render()
+            content_type = response["Content-Type"]
+            if not content_type.startswith("application/json"):
+                return response
+            etag = f'"{hashlib.sha256(response.content).hexdigest()[:40]}"'
+            entry = (etag, content_type, response.content)
+            cache.set(key, entry, timeout=_catalog_cache_settings()["TIMEOUT"])
+            _count("miss")
+        else:
+            _count("hit")
+
+        etag, content_type, body = entry
+        if _etag_matches(request, etag):
+            _count("not_modified")
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type=content_type)
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Accept",))
+        return response
+
+    return wrapper
+
+
+def render_cache_metrics():
+    """Counters in Prometheus text exposition format."""
+    lines = [
+        "# HELP catalog_cache_requests_total Catalog response cache lookups by result.",
+        "# TYPE catalog_cache_requests_total counter",
+    ]
+    lines += [f'catalog_cache_requests_total{{result="{result}"}} {n}' for result, n in cache_stats().items()]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,57 @@
+"""Order conversations: append-only messages read with an id cursor.
+
+Posting a message is one primary-key read of the order (participants and
+status) plus one INSERT; the order row itself is not written. Reading is the
+same primary-key read, so only participants see a conversation, plus
+``WHERE order_id = ? AND id > ? ORDER BY id LIMIT ?``, a single range scan on
+the ``(order, id)`` index, so a client polling with the last id it holds
+gets only what is new. Both participants are also sent an ``order.message``
+event (see mainApp.events) so open streams know to read.
+"""
+from mainApp.events import publish_order_event
+from mainApp.models import Order, OrderMessage
+from mainApp.transitions import ACTIVE_STATUSES, TransitionError
+
+MAX_MESSAGE_LENGTH = 4000
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+MESSAGE_FIELDS = ("id", "sender_id", "text", "created_at")
+
+
+def post_message(order_id, sender_id, text):
+    """Append ``text`` from ``sender_id`` to the order's conversation and
+    return the new message id. Raises TransitionError when the order is
+    missing, closed, or ``sender_id`` is not one of its participants."""
+    row = Order.objects.filter(id=order_id).values_list("normal_user_id", "petsitter_user_id", "status").first()
+    if row is None:
+        raise TransitionError("Order not found", 404)
+    normal_user_id, petsitter_user_id, order_status = row
+    if order_status not in ACTIVE_STATUSES:
+        raise TransitionError(f"Cannot message on an order that is {order_status}", 409)
+    if sender_id not in (normal_user_id, petsitter_user_id):
+        raise TransitionError("User not part of this order", 400)
+    message = OrderMessage.objects.create(order_id=order_id, sender_id=sender_id, text=text)
+    publish_order_event(
+        "order.message", order_id, (normal_user_id, petsitter_user_id),
+        {"message_id": message.id, "sender_id": sender_id},
+    )
+    return message.id
+
+
+def read_messages(order_id, reader_id, after=0, limit=DEFAULT_PAGE_SIZE):
+    """messages_after() for ``reader_id``. Raises TransitionError (404) when
+    the order is missing or ``reader_id`` is not one of its participants, so
+    the answer does not tell outsiders which orders exist."""
+    participants = Order.objects.filter(id=order_id).values_list("normal_user_id", "petsitter_user_id").first()
+    if participants is None or reader_id not in participants:
+        raise TransitionError("Order not found", 404)
+    return messages_after(order_id, after, limit)
+
+
+def messages_after(order_id, after=0, limit=DEFAULT_PAGE_SIZE):
+    """Up to ``limit`` messages of the order with an id above ``after``,
+    oldest first, as dicts of MESSAGE_FIELDS."""
+    return list(
+        OrderMessage.objects.filter(order_id=order_id, id__gt=after).order_by("id").values(*MESSAGE_FIELDS)[:limit]
+    )
@@ -0,0 +1,287 @@
+"""Ranked sitter discovery over an in-memory feature index.
+
+Each process keeps one column per feature of every SitterService in NumPy
+arrays: location, rate, the sitter's rating and completion ratio, plus the
+service and pet type used to filter. A discovery request masks the arrays
+down to the requested service and radius, scores every remaining candidate
+in one vectorized pass and takes the top k with ``argpartition``, so no SQL
+runs while ranking and only the k winners are read from the database.
+
+The index is loaded in full once and then refreshed incrementally, at most
+every DISCOVERY['REFRESH_SECONDS']. As in delta sync (mainApp.sync), the
+refresh reads only rows whose ``updated_at`` is past the last watermark:
+changed sitter services, addresses and services, rating summaries and
+orders, plus sitter service tombstones. Changed rows are patched into copies
+of the arrays, which replace them whole, and deleted rows are masked out until
+enough pile up to compact the arrays.
+
+Scores are weighted means of features scaled to 0..1 (DISCOVERY['WEIGHTS']):
+
+- ``price``: 1 for the cheapest candidate, 0 for the dearest
+- ``rating``: the sitter's average rating, pulled towards
+  DISCOVERY['RATING_PRIOR'] while they have few ratings
+- ``distance``: 1 at the user's address, 0 at the edge of the radius
+- ``completion``: the sitter's completed share of completed and cancelled
+  orders, smoothed the same way with DISCOVERY['COMPLETION_PRIOR']
+"""
+import math
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from mainApp.models import PET_CHOICES, Order, RatingSummary, Service, SitterService, Tombstone
+from userApp import geo
+from userApp.models import Address
+
+DEFAULT_DISCOVERY = {
+    "WEIGHTS": {"price": 1.0, "rating": 1.0, "distance": 1.0, "completion": 1.0},
+    "REFRESH_SECONDS": 5,
+    "OVERLAP_SECONDS": 5,
+    "RATING_PRIOR": (5, 3.5),  # (pseudo-ratings, their mean) blended into every average
+    "COMPLETION_PRIOR": (5, 0.8),  # (pseudo-orders, their completed share)
+}
+
+# Changed rows beyond which a refresh reloads everything instead of patching
+FULL_RELOAD_THRESHOLD = 10_000
+
+PET_CODES = {key: code for code, (key, _) in enumerate(PET_CHOICES)}
+
+# name -> dtype of every column; "alive" is False for deleted rows awaiting compaction
+COLUMNS = {
+    "id": np.int64,
+    "sitter": np.int64,
+    "service": np.int64,
+    "pet": np.int8,
+    "lat": np.float64,
+    "lng": np.float64,
+    "rate": np.float64,
+    "rating": np.float64,
+    "completion": np.float64,
+    "alive": bool,
+    # Derived from lat/lng once, so distances need no per-request conversions
+    "lat_rad": np.float64,
+    "lng_rad": np.float64,
+    "cos_lat": np.float64,
+}
+DERIVED_COLUMNS = ("lat_rad", "lng_rad", "cos_lat")
+SERVICE_FIELDS = ("id", "user_id", "service_id", "service__pet", "address__latitude", "address__longitude", "rate")
+
+
+def _with_geometry(columns):
+    columns["lat_rad"] = np.radians(columns["lat"])
+    columns["lng_rad"] = np.radians(columns["lng"])
+    columns["cos_lat"] = np.cos(columns["lat_rad"])
+    return columns
+
+
+def _distances_km(lat, lng, columns, rows):
+    """geo.haversine_km from (lat, lng) to ``rows``, using the precomputed columns."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    a = (
+        np.sin((columns["lat_rad"][rows] - lat1) / 2) ** 2
+        + math.cos(lat1) * columns["cos_lat"][rows] * np.sin((columns["lng_rad"][rows] - lng1) / 2) ** 2
+    )
+    return 2 * geo.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _discovery_settings():
+    return {**DEFAULT_DISCOVERY, **getattr(settings, "DISCOVERY", {})}
+
+
+def _smoothed(hits, total, prior):
+    weight, mean = prior
+    return (hits + weight * mean) / (total + weight)
+
+
+def _prior_means():
+    """(rating, completion ratio) of sitters with no history yet."""
+    config = _discovery_settings()
+    return config["RATING_PRIOR"][1], config["COMPLETION_PRIOR"][1]
+
+
+def _ratings(sitter_ids=None):
+    """{sitter id: smoothed average rating} for sitters with ratings."""
+    summaries = RatingSummary.objects.all()
+    if sitter_ids is not None:
+        summaries = summaries.filter(user_id__in=sitter_ids)
+    prior = _discovery_settings()["RATING_PRIOR"]
+    return {user_id: _smoothed(total, count, prior) for user_id, count, total in summaries.values_list("user_id", "count", "total")}
+
+
+def _completions(sitter_ids=None):
+    """{sitter id: smoothed completion ratio} for sitters with finished orders."""
+    orders = Order.objects.filter(status__in=("completed", "cancelled"))
+    if sitter_ids is not None:
+        orders = orders.filter(petsitter_user_id__in=sitter_ids)
+    counts = orders.values_list("petsitter_user_id").annotate(
+        completed=Count("id", filter=Q(status="completed")), finished=Count("id"),
+    )
+    prior = _discovery_settings()["COMPLETION_PRIOR"]
+    return {sitter_id: _smoothed(completed, finished, prior) for sitter_id, completed, finished in counts}
+
+
+class SitterIndex:
+    """Feature columns of every SitterService, see the module docstring."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.columns = None
+        self._rows = {}  # sitter service id -> row number
+        self._dead = 0
+        self.watermark = None
+        self._checked_at = None
+
+    @classmethod
+    def from_columns(cls, **columns):
+        """An index over given column arrays (for benchmarks); it is never refreshed."""
+        index = cls()
+        size = len(columns["id"])
+        index.columns = _with_geometry({
+            name: np.asarray(columns.get(name, np.ones(size)), dtype=dtype)
+            for name, dtype in COLUMNS.items() if name not in DERIVED_COLUMNS
+        })
+        index._rows = {service_id: row for row, service_id in enumerate(index.columns["id"].tolist())}
+        index._checked_at = float("inf")
+        return index
+
+    def refresh(self):
+        """Load the index, or apply what changed since the last refresh if that
+        was more than DISCOVERY['REFRESH_SECONDS'] ago."""
+        config = _discovery_settings()
+        if self._checked_at is not None and time.monotonic() - self._checked_at < config["REFRESH_SECONDS"]:
+            return
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < config["REFRESH_SECONDS"]:
+                return
+            started = timezone.now()
+            if self.watermark is None:
+                self._load_all()
+            else:
+                self._apply_changes(self.watermark - timedelta(seconds=config["OVERLAP_SECONDS"]))
+            self.watermark = started
+            self._checked_at = time.monotonic()
+
+    def _build(self, rows, ratings, completions):
+        rating_mean, completion_mean = _prior_means()
+        ids, sitters, services, pets, lats, lngs, rates = zip(*rows) if rows else ((),) * 7
+        return _with_geometry({
+            "id": np.array(ids, dtype=np.int64),
+            "sitter": np.array(sitters, dtype=np.int64),
+            "service": np.array(services, dtype=np.int64),
+            "pet": np.array([PET_CODES.get(pet, -1) for pet in pets], dtype=np.int8),
+            "lat": np.array(lats, dtype=np.float64),  # None becomes nan and never matches a radius
+            "lng": np.array(lngs, dtype=np.float64),
+            "rate": np.array(rates, dtype=np.float64),
+            "rating": np.array([ratings.get(s, rating_mean) for s in sitters], dtype=np.float64),
+            "completion": np.array([completions.get(s, completion_mean) for s in sitters], dtype=np.float64),
+            "alive": np.ones(len(ids), dtype=bool),
+        })
+
+    def _load_all(self):
+        rows = list(SitterService.objects.values_list(*SERVICE_FIELDS).iterator(chunk_size=10_000))
+        self.columns = self._build(rows, _ratings(), _completions())
+        self._rows = {service_id: row for row, service_id in enumerate(self.columns["id"].tolist())}
+        self._dead = 0
+
+    def _apply_changes(self, since):
+        changed_ids = set(SitterService.objects.filter(updated_at__gt=since).values_list("id", flat=True))
+        changed_ids.update(SitterService.objects.filter(
+            address__in=Address.objects.filter(updated_at__gt=since)).values_list("id", flat=True))
+        changed_ids.update(SitterService.objects.filter(
+            service__in=Service.objects.filter(updated_at__gt=since)).values_list("id", flat=True))
+        deleted_ids = set(Tombstone.objects.filter(
+            kind="sitter_services", deleted_at__gt=since).values_list("object_id", flat=True))
+        sitter_ids = set(RatingSummary.objects.filter(updated_at__gt=since).values_list("user_id", flat=True))
+        sitter_ids.update(Order.objects.filter(updated_at__gt=since).values_list("petsitter_user_id", flat=True))
+
+        if len(changed_ids) + len(sitter_ids) > FULL_RELOAD_THRESHOLD:
+            # A bulk import or migration: one full read beats huge IN lists
+            self._load_all()
+            return
+        rows = list(SitterService.objects.filter(id__in=changed_ids - deleted_ids).values_list(*SERVICE_FIELDS))
+        sitter_ids.update(row[1] for row in rows)
+        if not rows and not deleted_ids and not sitter_ids:
+            return
+        ratings, completions = _ratings(sitter_ids), _completions(sitter_ids)
+
+        # Patch copies: top() on other threads keeps reading the arrays it holds
+        columns = {name: array.copy() for name, array in self.columns.items()}
+        for service_id in deleted_ids:
+            row = self._rows.pop(service_id, None)
+            if row is not None:
+                columns["alive"][row] = False
+                self._dead += 1
+
+        changed = self._build(rows, ratings, completions)
+        existing = np.array([self._rows.get(service_id, -1) for service_id in changed["id"].tolist()], dtype=np.int64)
+        updated = existing >= 0
+        for name in COLUMNS:
+            columns[name][existing[updated]] = changed[name][updated]
+
+        # Stats of sitters whose ratings or orders changed, on all their rows
+        affected = np.flatnonzero(np.isin(columns["sitter"], np.fromiter(sitter_ids, dtype=np.int64)) & columns["alive"])
+        if len(affected):
+            rating_mean, completion_mean = _prior_means()
+            sitters = columns["sitter"][affected].tolist()
+            columns["rating"][affected] = [ratings.get(s, rating_mean) for s in sitters]
+            columns["completion"][affected] = [completions.get(s, completion_mean) for s in sitters]
+
+        added = ~updated
+        if added.any() or self._dead > len(columns["id"]) // 4:
+            # Grow and compact in one more copy
+            keep = columns["alive"]
+            columns = {name: np.concatenate([columns[name][keep], changed[name][added]]) for name in COLUMNS}
+            self._rows = {service_id: row for row, service_id in enumerate(columns["id"].tolist())}
+            self._dead = 0
+        self.columns = columns
+
+    def top(self, lat, lng, radius_km, limit, service_id=None, pet=None):
+        """[(sitter service id, score, distance km)] of the best ``limit`` candidates, best first."""
+        columns = self.columns
+        if columns is None or not len(columns["id"]):
+            return []
+        # A latitude band is a cheap first cut before any trigonometry
+        dlat = radius_km / geo.KM_PER_DEGREE_LAT
+        mask = columns["alive"] & (np.abs(columns["lat"] - lat) <= dlat)
+        if service_id is not None:
+            mask &= columns["service"] == service_id
+        if pet is not None:
+            mask &= columns["pet"] == PET_CODES[pet]
+        candidates = np.flatnonzero(mask)
+        distances = _distances_km(lat, lng, columns, candidates)
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        if not len(candidates):
+            return []
+
+        weights = _discovery_settings()["WEIGHTS"]
+        rates = columns["rate"][candidates]
+        low, high = rates.min(), rates.max()
+        price = (high - rates) / (high - low) if high > low else np.ones(len(rates))
+        scores = (
+            weights["price"] * price
+            + weights["rating"] * (columns["rating"][candidates] - 1) / 4
+            + weights["distance"] * (1 - distances / radius_km)
+            + weights["completion"] * columns["completion"][candidates]
+        ) / sum(weights.values())
+
+        if len(scores) > limit:
+            best = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return list(zip(columns["id"][candidates[best]].tolist(), scores[best].tolist(), distances[best].tolist()))
+
+
+sitter_index = SitterIndex()
+
+
+def discover(lat, lng, radius_km, limit, service_id=None, pet=None):
+    """Refresh this process's index if due, then rank candidates; see SitterIndex.top."""
+    sitter_index.refresh()
+    return sitter_index.top(lat, lng, radius_km, limit, service_id=service_id, pet=pet)
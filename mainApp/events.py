@@ -0,0 +1,149 @@
+"""Order change events pushed to clients over server-sent events (SSE).
+
+Order endpoints publish a compact event (the order id plus only the fields
+that changed) to the topic of each participant once the write commits, and
+``GET /api/main/users/<id>/orders/events/`` streams the user's topic as
+``text/event-stream``. Clients keep one connection open instead of polling
+the order list; after a reconnect, or a ``resync`` event sent when they fell
+too far behind, they catch up with the delta sync endpoint.
+
+The stream is an async view and needs the ASGI application
+(``petproject.asgi``); WSGI servers cannot hold it open. Events go through
+the broker named by ORDER_EVENTS['BROKER']. InProcessBroker delivers to
+subscribers in the same process, which suits a single ASGI process and
+tests; to fan out across processes, point the setting at a class with the
+same ``publish(topic, event)`` / ``subscribe(topic)`` interface backed by a
+shared broker.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_ORDER_EVENTS = {
+    "BROKER": "mainApp.events.InProcessBroker",
+    "KEEPALIVE_SECONDS": 15,  # comment line sent on idle streams so proxies keep them open
+    "QUEUE_SIZE": 100,  # events buffered per subscriber before it is told to resync
+}
+
+
+def _events_settings():
+    return {**DEFAULT_ORDER_EVENTS, **getattr(settings, "ORDER_EVENTS", {})}
+
+
+class Subscription:
+    """Events for one topic, buffered for one consumer on its event loop."""
+
+    def __init__(self, broker, topic, maxsize):
+        self.broker = broker
+        self.topic = topic
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def offer(self, event):
+        # Runs on self.loop
+        if self.queue.full():
+            # The consumer fell behind: drop what it has not read and tell it to resync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"event": "resync"}
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Topic fan-out within this process. ``publish`` may be called from any
+    thread (sync views run in a thread pool under ASGI); ``subscribe`` must
+    be called on the consumer's event loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, topic):
+        subscription = Subscription(self, topic, _events_settings()["QUEUE_SIZE"])
+        with self._lock:
+            self._subscriptions[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.topic]
+
+    def publish(self, topic, event):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # Its event loop has closed without unsubscribing
+                self.unsubscribe(subscription)
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker():
+    path = _events_settings()["BROKER"]
+    with _brokers_lock:
+        if path not in _brokers:
+            _brokers[path] = import_string(path)()
+        return _brokers[path]
+
+
+def user_topic(user_id):
+    return f"user:{user_id}"
+
+
+def publish_order_event(event, order_id, participant_ids, fields):
+    """Publish ``{"event": event, "order": {"id": order_id, **fields}}`` to each
+    participant once the current transaction commits."""
+    message = {"event": event, "order": {"id": order_id, **fields}}
+
+    def publish():
+        broker = get_broker()
+        for user_id in set(participant_ids):
+            broker.publish(user_topic(user_id), message)
+
+    transaction.on_commit(publish)
+
+
+def format_sse(message):
+    data = json.dumps(message.get("order", {}), cls=DjangoJSONEncoder, separators=(",", ":"))
+    return f"event: {message['event']}\ndata: {data}\n\n"
+
+
+async def order_event_stream(user_id):
+    """The text/event-stream body for ``user_id``: their order events, with
+    keep-alive comments while idle. Subscribes on first iteration, so it runs
+    on the loop that consumes it, and unsubscribes when the client leaves."""
+    config = _events_settings()
+    with get_broker().subscribe(user_topic(user_id)) as subscription:
+        # Sent at once, so clients and proxies see the stream open
+        yield ": connected\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(), config["KEEPALIVE_SECONDS"])
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(message)
@@ -0,0 +1,125 @@
+"""``Idempotency-Key`` support for retried POSTs.
+
+A client sends the same ``Idempotency-Key`` header with every retry of one
+logical request. The first request inserts an in-flight IdempotencyKey row,
+runs the view and stores the rendered response; retries are answered with
+the stored bytes after a single primary-key lookup, without running the view
+or any of its validation queries. A duplicate arriving while the first is
+still running is answered 409 with ``Retry-After`` at once, without holding a
+worker thread, so concurrent duplicates collapse to one insert. A key left in
+flight longer than IDEMPOTENCY['ABANDON_SECONDS'] is taken over; each claim
+carries its own token and the original owner's late finish only touches
+its own row. Keys are scoped to the
+method, path and Authorization header, and reusing a key with a different
+body is rejected with 422. Server errors are not stored, so the client may
+retry them.
+"""
+import hashlib
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from mainApp.models import IdempotencyKey
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+DEFAULT_IDEMPOTENCY = {"TTL": 24 * 60 * 60, "ABANDON_SECONDS": 60, "RETRY_AFTER_SECONDS": 1}
+MAX_KEY_LENGTH = 255
+
+
+def _idempotency_settings():
+    return {**DEFAULT_IDEMPOTENCY, **getattr(settings, "IDEMPOTENCY", {})}
+
+
+def expiry_cutoff():
+    return timezone.now() - timedelta(seconds=_idempotency_settings()["TTL"])
+
+
+def _scoped_key(request, client_key):
+    scope = "\n".join((request.method, request.path, request.META.get("HTTP_AUTHORIZATION", ""), client_key))
+    return hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _replay(record):
+    response = HttpResponse(bytes(record.body), status=record.status_code, content_type=record.content_type)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _claim(key, request_hash):
+    """Insert the in-flight row. Returns this request's claim token, or None
+    if another request owns the key."""
+    token = uuid.uuid4().hex
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key, request_hash=request_hash, token=token)
+        return token
+    except IntegrityError:
+        return None
+
+
+def idempotent(view):
+    """Honour ``Idempotency-Key`` on POSTs to ``view``. Apply outside ``@api_view``."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        client_key = request.META.get(HEADER)
+        if request.method != "POST" or not client_key:
+            return view(request, *args, **kwargs)
+        if len(client_key) > MAX_KEY_LENGTH:
+            return JsonResponse({"error": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"}, status=400)
+
+        config = _idempotency_settings()
+        key = _scoped_key(request, client_key)
+        request_hash = hashlib.sha256(request.body).hexdigest()
+        while True:
+            record = IdempotencyKey.objects.filter(key=key, created_at__gte=expiry_cutoff()).first()
+            if record is None:
+                # Clear an expired row for this key, if any, then race for the insert
+                IdempotencyKey.objects.filter(key=key, created_at__lt=expiry_cutoff()).delete()
+                token = _claim(key, request_hash)
+                if token:
+                    break
+                continue
+            if record.request_hash != request_hash:
+                return JsonResponse({"error": "Idempotency-Key was already used with a different request"}, status=422)
+            if record.status_code is not None:
+                return _replay(record)
+            if record.created_at < timezone.now() - timedelta(seconds=config["ABANDON_SECONDS"]):
+                # The worker that claimed the key died mid-request; let this one retry it
+                IdempotencyKey.objects.filter(key=key, token=record.token, status_code=None).delete()
+                continue
+            response = JsonResponse({"error": "A request with this Idempotency-Key is still in progress"}, status=409)
+            response["Retry-After"] = str(config["RETRY_AFTER_SECONDS"])
+            return response
+
+        # If this claim was taken over meanwhile, the new owner's row is left alone
+        mine = IdempotencyKey.objects.filter(key=key, token=token)
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+        except BaseException:
+            mine.delete()
+            raise
+        if response.status_code >= 500 or response.streaming:
+            mine.delete()
+        else:
+            mine.update(
+                status_code=response.status_code,
+                content_type=response.get("Content-Type", ""),
+                body=response.content,
+            )
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys():
+    """Delete keys past their TTL. Returns the number of rows removed."""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expiry_cutoff()).delete()
+    return deleted
@@ -0,0 +1,110 @@
+"""Fixed-size image variants for Service, Pet and Ad uploads.
+
+When a model's ``image`` changes, saving it queues a background job
+(mainApp.tasks.render_image_variants) that renders each of IMAGE_VARIANTS
+from the upload (WebP, or JPEG when Pillow has no WebP support) and stores
+them next to it under ``<upload_to>variants/``. Variant file names carry a
+hash of their bytes, so a URL always points at the same content and can be
+served with a far-future ``Cache-Control: immutable``.
+The stored names are kept in the model's ``image_variants`` JSON field,
+together with the original name they were rendered from, so saving the model
+again without a new image does no work. Row shapes expose them as
+``image_urls`` (see mainApp.rows); ``manage.py build_image_variants``
+renders them for images uploaded before this existed.
+"""
+import hashlib
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+logger = logging.getLogger(__name__)
+
+# name: (width, height, crop). Cropped variants fill the box exactly; the
+# others fit inside it keeping the aspect ratio, and are never upscaled.
+IMAGE_VARIANTS = {
+    "thumb": (160, 160, True),
+    "card": (640, 480, False),
+    "full": (1600, 1600, False),
+}
+VARIANT_FORMAT, VARIANT_EXTENSION = ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+VARIANT_QUALITY = 80
+
+
+def _render(image, width, height, crop):
+    if crop:
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    else:
+        resized = image.copy()
+        resized.thumbnail((width, height), Image.LANCZOS)
+    if VARIANT_FORMAT == "JPEG" and resized.mode != "RGB":
+        resized = resized.convert("RGB")
+    buffer = io.BytesIO()
+    resized.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def render_variants(field_file):
+    """Render IMAGE_VARIANTS of an image field's file and save them to its
+    storage. Returns {variant: storage name}, or {} if the file is not an image."""
+    try:
+        with field_file.open("rb"), Image.open(field_file) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+            rendered = {name: _render(image, *spec) for name, spec in IMAGE_VARIANTS.items()}
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning("Cannot render variants of %s: %s", field_file.name, e)
+        return {}
+
+    storage = field_file.storage
+    upload_to = field_file.field.upload_to
+    stem = os.path.splitext(os.path.basename(field_file.name))[0]
+    names = {}
+    for name, content in rendered.items():
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        target = f"{upload_to}variants/{stem}.{name}.{digest}.{VARIANT_EXTENSION}"
+        # Same name means same bytes, so an existing file is already right
+        names[name] = target if storage.exists(target) else storage.save(target, ContentFile(content))
+    return names
+
+
+def variant_url(field_file, variants, name):
+    """URL of one variant of ``field_file``, or of the original if it has none."""
+    variants = variants or {}
+    if variants.get("source") == field_file.name and name in variants:
+        return field_file.storage.url(variants[name])
+    return field_file.url
+
+
+def update_image_variants(instance, save_kwargs):
+    """Note a new ``instance.image`` before ``super().save()``. Returns True if
+    the image changed; then call ``schedule_image_variants`` after saving.
+
+    Until the job has run, ``image_variants`` holds only the source name and
+    every variant URL falls back to the original.
+    """
+    update_fields = save_kwargs.get("update_fields")
+    if update_fields is not None and "image" not in update_fields:
+        return False
+    image = instance.image
+    if (instance.image_variants or {}).get("source") == (image.name or None):
+        return False
+    if image and not image._committed:
+        # What FileField.pre_save would do next; done first so the final name is known
+        image.save(image.name, image.file, save=False)
+    instance.image_variants = {"source": image.name} if image else {}
+    if update_fields is not None:
+        save_kwargs["update_fields"] = {*update_fields, "image_variants"}
+    return bool(image)
+
+
+def schedule_image_variants(instance):
+    """Queue rendering of ``instance.image``'s variants in a background worker."""
+    # Imported here: mainApp.tasks and mainApp.queue import the models, which import this module
+    from mainApp.queue import enqueue
+    from mainApp.tasks import render_image_variants
+
+    enqueue(render_image_variants, model=instance._meta.label, pk=instance.pk, source=instance.image.name)
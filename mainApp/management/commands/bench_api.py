@@ -0,0 +1,407 @@
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta, timezone
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from mainApp.models import PET_CHOICES, Ad, Order, Pet, Service, SitterService
+from mainApp.seeding import AVAILABILITY_DAYS, PET_NAMES, SEED_PASSWORD, SERVICE_NAMES, UPCOMING_DAYS, seed
+from mainApp.sync import format_watermark
+from userApp.models import Address, UserProfile
+
+# How many users/orders of each kind requests are drawn from
+POOL_SIZE = 500
+
+Call = namedtuple("Call", "method path data token")
+Scenario = namedtuple("Scenario", "name build hashes_password", defaults=(False,))
+
+
+class Pools:
+    """Ids sampled from the database that the scenarios draw their requests from."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.orders = {
+            status: list(Order.objects.filter(status=status).values_list("id", "normal_user_id", "petsitter_user_id")[:POOL_SIZE])
+            for status in ("pending", "approved", "completed")
+        }
+        self.active_orders = [o for orders in self.orders.values() for o in orders]
+        if not self.active_orders:
+            raise CommandError("No orders to benchmark against; run seed_data first or pass --seed-orders.")
+
+        customer_ids = list({customer for _, customer, _ in self.active_orders})
+        sitter_ids = list(
+            UserProfile.objects.filter(role="petsitter", user__sitter_services__isnull=False)
+            .values_list("user_id", flat=True).distinct()[:POOL_SIZE]
+        )
+        user_ids = customer_ids + sitter_ids
+        # Order transitions act as either participant
+        participants = {user_id for _, *pair in self.active_orders for user_id in pair}
+        self.tokens = dict(Token.objects.filter(user_id__in=participants.union(user_ids)).values_list("user_id", "key"))
+        for user_id in participants.union(user_ids):
+            if user_id not in self.tokens:
+                self.tokens[user_id] = Token.objects.create(user_id=user_id).key
+        self.addresses = dict(Address.objects.filter(user_id__in=user_ids).values_list("user_id", "id"))
+        self.pets = {}
+        for user_id, pet_id in Pet.objects.filter(user_id__in=customer_ids).values_list("user_id", "id"):
+            self.pets.setdefault(user_id, []).append(pet_id)
+        # Only users with what their requests need: an address, and pets for customers
+        self.customers = [c for c in customer_ids if c in self.pets and c in self.addresses]
+        self.sitters = [s for s in sitter_ids if s in self.addresses]
+        if not (self.customers and self.sitters):
+            raise CommandError("Need customers with pets and addresses and sitters with services; run seed_data first.")
+        self.points = list(Address.objects.filter(user_id__in=self.sitters).values_list("latitude", "longitude"))
+        self.sitter_services = list(SitterService.objects.filter(user_id__in=self.sitters).values_list("id", "user_id"))
+        self.services = list(Service.objects.values_list("id", flat=True))
+
+    def pick(self, items):
+        return self.rng.choice(items)
+
+    def customer(self):
+        return self.pick(self.customers)
+
+    def sitter(self):
+        return self.pick(self.sitters)
+
+
+def _scenarios():
+    def get(name):
+        return lambda p, i: Call("get", reverse(name), {}, None)
+
+    def orders_of(p, i, query):
+        user_id = p.customer()
+        return Call("get", reverse("order-list-by-user", args=[user_id]), query, p.tokens[user_id])
+
+    def order_transition(name, statuses, actor, data=None):
+        def build(p, i):
+            order_id, customer, sitter = p.pick([o for s in statuses for o in p.orders[s]])
+            user_id = customer if actor == "customer" else sitter
+            return Call("patch", reverse(name, args=[order_id]), data or {}, p.tokens[user_id])
+        return build
+
+    def create_sitter_service(p, i):
+        sitter = p.sitter()
+        data = {"user_id": sitter, "service_id": p.pick(p.services), "address_id": p.addresses[sitter], "rate": "499.00"}
+        return Call("post", reverse("sitter-service-create"), data, p.tokens[sitter])
+
+    def full_text_search(p, i):
+        # A word prefix, as a search box sends while typing
+        word = p.pick(SERVICE_NAMES + PET_NAMES).split()[0].lower()
+        return Call("get", reverse("full-text-search"), {"q": word[:4]}, None)
+
+    def search(p, i):
+        lat, lng = p.pick(p.points)
+        return Call("get", reverse("sitter-service-search"), {"lat": lat, "lng": lng, "radius_km": 10}, None)
+
+    def discover(p, i):
+        user_id = p.customer()
+        data = {"address_id": p.addresses[user_id], "service_id": p.pick(p.services)}
+        return Call("get", reverse("sitter-service-discover"), data, None)
+
+    def free_windows(p, i):
+        start = datetime.now(timezone.utc)
+        data = {
+            "ids": ",".join(str(ss_id) for ss_id, _ in p.rng.sample(p.sitter_services, min(20, len(p.sitter_services)))),
+            "from": start.isoformat(), "to": (start + timedelta(days=AVAILABILITY_DAYS)).isoformat(),
+        }
+        return Call("get", reverse("sitter-service-free-windows"), data, None)
+
+    def availability(p, i):
+        return Call("get", reverse("sitter-service-availability", args=[p.pick(p.sitter_services)[0]]), {}, None)
+
+    def add_availability(p, i):
+        ss_id, sitter = p.pick(p.sitter_services)
+        # Past the seeded windows, a day per request
+        start = datetime.now(timezone.utc) + timedelta(days=AVAILABILITY_DAYS + 1 + i)
+        data = {"windows": [{"start": start.isoformat(), "end": (start + timedelta(hours=8)).isoformat()}]}
+        return Call("post", reverse("sitter-service-availability", args=[ss_id]), data, p.tokens[sitter])
+
+    def create_sitter_services_bulk(p, i):
+        sitter = p.sitter()
+        services = [
+            {"service_id": p.pick(p.services), "address_id": p.addresses[sitter], "rate": "499.00"} for _ in range(20)
+        ]
+        return Call("post", reverse("sitter-service-bulk-create"), {"user_id": sitter, "services": services}, p.tokens[sitter])
+
+    def create_pet(p, i):
+        user_id = p.customer()
+        data = {"user_id": user_id, "name": f"Bench {i}", "pet": p.pick(PET_CHOICES)[0], "age": 3}
+        return Call("post", reverse("pet-create"), data, p.tokens[user_id])
+
+    def create_pets_bulk(p, i):
+        user_id = p.customer()
+        pets = [{"name": f"Bench {i}-{n}", "pet": p.pick(PET_CHOICES)[0], "age": 3} for n in range(20)]
+        return Call("post", reverse("pet-bulk-create"), {"user_id": user_id, "pets": pets}, p.tokens[user_id])
+
+    def create_order(p, i):
+        user_id = p.customer()
+        ss_id, sitter = p.pick(p.sitter_services)
+        data = {
+            "normal_user_id": user_id, "petsitter_user_id": sitter, "service_model_id": ss_id,
+            "pet_id": p.pick(p.pets[user_id]), "user_address_id": p.addresses[user_id], "quantity": 2,
+            # Two-hour orders, one after another and after the seeded bookings, so the
+            # overlap check searches a populated index but never conflicts
+            "start_datetime": (datetime.now(timezone.utc) + timedelta(days=UPCOMING_DAYS + 1, hours=2 * i)).isoformat(),
+        }
+        return Call("post", reverse("order-create"), data, p.tokens[user_id])
+
+    def review(p, i):
+        order_id, customer, _ = p.pick(p.orders["completed"] or p.active_orders)
+        data = {"user_id": customer, "review": "Benchmark review", "rating": 1 + i % 5}
+        return Call("patch", reverse("order-add-review", args=[order_id]), data, p.tokens[customer])
+
+    def post_message(p, i):
+        order_id, customer, sitter = p.pick(p.active_orders)
+        sender = customer if i % 2 else sitter
+        data = {"sender_id": sender, "text": f"Benchmark message {i}"}
+        return Call("post", reverse("order-messages", args=[order_id]), data, p.tokens[sender])
+
+    def read_messages(p, i):
+        order_id, customer, _ = p.pick(p.active_orders)
+        return Call("get", reverse("order-messages", args=[order_id]), {"user_id": customer}, p.tokens[customer])
+
+    def sync(p, i, since=None):
+        user_id = p.customer()
+        data = {"since": format_watermark(datetime.now(timezone.utc) - since)} if since else {}
+        return Call("get", reverse("user-sync", args=[user_id]), data, p.tokens[user_id])
+
+    def addresses(p, i):
+        user_id = p.customer()
+        return Call("get", reverse("user-addresses", args=[user_id]), {}, p.tokens[user_id])
+
+    def add_address(p, i):
+        user_id = p.customer()
+        lat, lng = p.pick(p.points)
+        data = {"address": "1 Bench Road", "city": "Bench", "latitude": lat, "longitude": lng}
+        return Call("post", reverse("user-addresses", args=[user_id]), data, p.tokens[user_id])
+
+    def add_addresses_bulk(p, i):
+        user_id = p.customer()
+        addresses = []
+        for n in range(20):
+            lat, lng = p.pick(p.points)
+            addresses.append({"address": f"{n} Bench Road", "city": "Bench", "latitude": lat, "longitude": lng})
+        return Call("post", reverse("user-addresses-bulk", args=[user_id]), {"addresses": addresses}, p.tokens[user_id])
+
+    def register(p, i):
+        name = f"bench-register-{i}-{p.rng.getrandbits(32):08x}"
+        data = {"username": name, "email": f"{name}@example.com", "password": SEED_PASSWORD, "password2": SEED_PASSWORD}
+        return Call("post", reverse("register"), data, None)
+
+    def login(p, i):
+        email = User.objects.filter(id=p.customer()).values_list("email", flat=True).get()
+        return Call("post", reverse("login-email"), {"email": email, "password": SEED_PASSWORD}, None)
+
+    def logout(p, i):
+        # A throwaway user per request, since logging out deletes the token
+        user = User.objects.create(username=f"bench-logout-{i}-{p.rng.getrandbits(32):08x}")
+        return Call("post", reverse("logout"), {}, Token.objects.create(user=user).key)
+
+    def services_by_pet(p, i):
+        return Call("get", reverse("services-by-pet", args=[PET_CHOICES[i % len(PET_CHOICES)][0]]), {}, None)
+
+    def sitter_services_of(p, i):
+        user_id = p.sitter()
+        return Call("get", reverse("sitter-service-list-by-user", args=[user_id]), {}, p.tokens[user_id])
+
+    def sitter_service_detail(p, i):
+        return Call("get", reverse("sitter-service-detail", args=[p.pick(p.sitter_services)[0]]), {}, None)
+
+    def pets_of(p, i):
+        user_id = p.customer()
+        return Call("get", reverse("pet-list-by-user", args=[user_id]), {}, p.tokens[user_id])
+
+    return [
+        Scenario("service-list", get("service-list")),
+        Scenario("pet-list", get("pet-list")),
+        Scenario("services-by-pet", services_by_pet),
+        Scenario("ad-list", get("ad-list")),
+        Scenario("full-text-search", full_text_search),
+        Scenario("sitter-service-create", create_sitter_service),
+        Scenario("sitter-service-bulk-create", create_sitter_services_bulk),
+        Scenario("sitter-service-list-by-user", sitter_services_of),
+        Scenario("sitter-service-search", search),
+        Scenario("sitter-service-discover", discover),
+        Scenario("sitter-service-detail", sitter_service_detail),
+        Scenario("sitter-service-free-windows", free_windows),
+        Scenario("sitter-service-availability", availability),
+        Scenario("sitter-service-availability POST", add_availability),
+        Scenario("pet-create", create_pet),
+        Scenario("pet-bulk-create", create_pets_bulk),
+        Scenario("pet-list-by-user", pets_of),
+        Scenario("order-create", create_order),
+        Scenario("order-list-by-user", lambda p, i: orders_of(p, i, {})),
+        Scenario("order-list-by-user?limit=50", lambda p, i: orders_of(p, i, {"limit": 50})),
+        Scenario("order-list-by-user?stream=1", lambda p, i: orders_of(p, i, {"stream": 1})),
+        Scenario("order-approve", order_transition("order-approve", ("pending",), "sitter")),
+        Scenario("order-complete", order_transition("order-complete", ("approved",), "customer")),
+        Scenario("order-msg-to-petsitter", order_transition(
+            "order-msg-to-petsitter", ("pending", "approved", "completed"), "customer", {"message": "Hello"})),
+        Scenario("order-msg-to-user", order_transition(
+            "order-msg-to-user", ("pending", "approved", "completed"), "sitter", {"message": "Hello"})),
+        # Posts first, so the reads below find messages
+        Scenario("order-messages POST", post_message),
+        Scenario("order-messages", read_messages),
+        Scenario("order-add-review", review),
+        Scenario("user-sync", sync),
+        Scenario("user-sync?since=1h", lambda p, i: sync(p, i, timedelta(hours=1))),
+        Scenario("user-addresses", addresses),
+        Scenario("user-addresses POST", add_address),
+        Scenario("user-addresses-bulk", add_addresses_bulk),
+        Scenario("register", register, hashes_password=True),
+        Scenario("login-email", login, hashes_password=True),
+        Scenario("logout", logout),
+    ]
+
+
+def _send(client, call):
+    headers = {"authorization": f"Token {call.token}"} if call.token else None
+    if call.method == "get":
+        response = client.get(call.path, call.data, headers=headers)
+    else:
+        response = getattr(client, call.method)(call.path, call.data, content_type="application/json", headers=headers)
+    if response.streaming:
+        b"".join(response.streaming_content)
+    return response
+
+
+def _percentiles(values):
+    if len(values) < 2:
+        value = values[0] if values else None
+        return value, value, value
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every API endpoint through the Django test client and report p50/p95/p99 latency, "
+        "queries per request and peak allocations per request as JSON. Writes are rolled back. "
+        "The order event stream (users/<id>/orders/events/, which never ends) and /metrics are not included."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint.")
+        parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per endpoint first.")
+        parser.add_argument("--alloc-requests", type=int, default=20,
+                            help="Extra requests per endpoint run under tracemalloc (kept out of the latency numbers).")
+        parser.add_argument("--password-requests", type=int, default=10,
+                            help="Measured requests for endpoints that hash a password (register, login).")
+        parser.add_argument("--only", nargs="*", help="Endpoint names to run (default: all).")
+        parser.add_argument("--seed", type=int, default=0, help="RNG seed for request parameters.")
+        parser.add_argument("--seed-users", type=int, default=0,
+                            help="Seed this many users inside the benchmark transaction (rolled back afterwards).")
+        parser.add_argument("--seed-orders", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        scenarios = _scenarios()
+        if options["only"]:
+            unknown = set(options["only"]) - {s.name for s in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            scenarios = [s for s in scenarios if s.name in options["only"]]
+
+        with transaction.atomic():
+            if options["seed_users"] or options["seed_orders"]:
+                seed(users=options["seed_users"] or 1000, orders=options["seed_orders"], seed=options["seed"])
+            rng = random.Random(options["seed"])
+            pools = Pools(rng)
+            report = {"meta": self._meta(options), "endpoints": {}}
+            for scenario in scenarios:
+                self.stderr.write(f"{scenario.name} ...")
+                report["endpoints"][scenario.name] = self._run(scenario, pools, options)
+            transaction.set_rollback(True)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def _meta(self, options):
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "sqlite": sqlite3.sqlite_version if connection.vendor == "sqlite" else None,
+            "options": {k: options[k] for k in ("requests", "warmup", "alloc_requests", "password_requests", "seed")},
+            "dataset": {
+                "users": User.objects.count(),
+                "addresses": Address.objects.count(),
+                "services": Service.objects.count(),
+                "sitter_services": SitterService.objects.count(),
+                "pets": Pet.objects.count(),
+                "orders": Order.objects.count(),
+                "ads": Ad.objects.count(),
+            },
+        }
+
+    def _run(self, scenario, pools, options):
+        client = Client()
+        requests = options["password_requests"] if scenario.hashes_password else options["requests"]
+        calls = iter(range(options["warmup"] + requests + options["alloc_requests"]))
+
+        def next_call():
+            return scenario.build(pools, next(calls))
+
+        for _ in range(options["warmup"] if not scenario.hashes_password else 1):
+            _send(client, next_call())
+
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        latencies, query_counts, statuses = [], [], Counter()
+        for _ in range(requests):
+            call = next_call()
+            queries = 0
+            with connection.execute_wrapper(count_queries):
+                start = time.perf_counter()
+                response = _send(client, call)
+                latencies.append((time.perf_counter() - start) * 1000)
+            query_counts.append(queries)
+            statuses[response.status_code] += 1
+
+        peaks = []
+        tracemalloc.start()
+        try:
+            for _ in range(min(options["alloc_requests"], requests)):
+                call = next_call()
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                _send(client, call)
+                peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024)
+        finally:
+            tracemalloc.stop()
+
+        p50, p95, p99 = _percentiles(latencies)
+        alloc_p50, _, _ = _percentiles(peaks)
+        return {
+            "requests": requests,
+            "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+            "latency_ms": {
+                "p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3),
+                "mean": round(statistics.fmean(latencies), 3), "max": round(max(latencies), 3),
+            },
+            "queries_per_request": {"mean": round(statistics.fmean(query_counts), 2), "max": max(query_counts)},
+            "peak_alloc_kib": {"p50": round(alloc_p50, 1) if peaks else None, "max": round(max(peaks), 1) if peaks else None},
+        }
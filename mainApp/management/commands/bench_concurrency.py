@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test import Client
+from django.urls import reverse
+
+from mainApp.models import Order
+
+PROFILES = ("default", "production")
+
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {"write": [], "read": []}
+        self.lock_errors = {"write": 0, "read": 0}
+        self.other_errors = {"write": 0, "read": 0}
+
+    def record(self, kind, latency=None, error=None):
+        with self.lock:
+            if error is None:
+                self.latencies[kind].append(latency)
+            elif "locked" in str(error):
+                self.lock_errors[kind] += 1
+            else:
+                self.other_errors[kind] += 1
+
+    def summary(self, duration):
+        result = {}
+        for kind, latencies in self.latencies.items():
+            attempts = len(latencies) + self.lock_errors[kind] + self.other_errors[kind]
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else [0] * 99
+            result[kind] = {
+                "ok": len(latencies),
+                "ok_per_second": round(len(latencies) / duration, 1),
+                "lock_errors": self.lock_errors[kind],
+                "other_errors": self.other_errors[kind],
+                "lock_error_rate": round(self.lock_errors[kind] / attempts, 4) if attempts else 0.0,
+                "latency_ms": {"p50": round(cuts[49], 2), "p99": round(cuts[98], 2)},
+            }
+        return result
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent order writers and listing readers against copies of the database, once with the "
+        "default SQLite settings and once with the production profile (DJANGO_DB_PROFILE=production). "
+        "Reports throughput and 'database is locked' error rates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per profile.")
+        parser.add_argument("--profiles", nargs="*", choices=PROFILES, default=list(PROFILES))
+        parser.add_argument("--json", action="store_true", help="Print the raw JSON results.")
+        # Internal: run the load in this process against the configured database
+        parser.add_argument("--worker", action="store_true", help="(internal)")
+
+    def handle(self, *args, **options):
+        if options["worker"]:
+            self.stdout.write(json.dumps(self._run_load(options)))
+            return
+
+        source = settings.DATABASES["default"]["NAME"]
+        if settings.DATABASES["default"]["ENGINE"] not in ("django.db.backends.sqlite3", "petproject.sqlite_backend"):
+            raise CommandError("bench_concurrency compares SQLite configurations only.")
+        results = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for profile in options["profiles"]:
+                copy = Path(tmp) / f"{profile}.sqlite3"
+                self._snapshot(source, copy, journal_mode="DELETE" if profile == "default" else "WAL")
+                self.stderr.write(f"{profile}: {options['writers']} writers, {options['readers']} readers, {options['duration']}s ...")
+                results[profile] = self._run_worker(profile, copy, options)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'profile':<11} {'kind':<6} {'ok/s':>8} {'lock errors':>12} {'rate':>7} {'p50 ms':>8} {'p99 ms':>8}")
+        for profile, result in results.items():
+            for kind in ("write", "read"):
+                r = result[kind]
+                self.stdout.write(
+                    f"{profile:<11} {kind:<6} {r['ok_per_second']:>8} {r['lock_errors']:>12} "
+                    f"{r['lock_error_rate']:>7.2%} {r['latency_ms']['p50']:>8} {r['latency_ms']['p99']:>8}"
+                )
+
+    def _snapshot(self, source, target, journal_mode):
+        # The backup API gives a consistent copy even while the source is in use
+        with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+            src.backup(dst)
+            dst.execute(f"PRAGMA journal_mode={journal_mode}")
+
+    def _run_worker(self, profile, database, options):
+        env = {**os.environ, "DJANGO_DB_PATH": str(database)}
+        env.pop("DJANGO_DB_PROFILE", None)
+        if profile == "production":
+            env["DJANGO_DB_PROFILE"] = "production"
+        command = [
+            sys.executable, str(Path(settings.BASE_DIR) / "manage.py"), "bench_concurrency", "--worker",
+            "--writers", str(options["writers"]), "--readers", str(options["readers"]),
+            "--duration", str(options["duration"]),
+        ]
+        finished = subprocess.run(command, env=env, capture_output=True, text=True)
+        if finished.returncode:
+            raise CommandError(f"{profile} run failed:\n{finished.stderr}")
+        return json.loads(finished.stdout)
+
+    def _run_load(self, options):
+        # Slow-request logs would drown the output under deliberate contention
+        logging.getLogger("petproject.slow_requests").disabled = True
+        bookings = list(
+            Order.objects.values_list("normal_user_id", "petsitter_user_id", "service_model_id", "pet_id", "user_address_id")
+            .exclude(pet=None).exclude(user_address=None)[:500]
+        )
+        reviewable = list(Order.objects.filter(status="completed").values_list("id", "normal_user_id")[:500])
+        if not (bookings and reviewable):
+            raise CommandError("No orders to copy bookings from; run seed_data first.")
+        connection.close()
+
+        stats = _Stats()
+        deadline = time.monotonic() + options["duration"]
+        start_datetime = (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()
+
+        def write(client, rng):
+            # Half new orders (autocommit INSERTs), half reviews (an atomic read-then-write)
+            if rng.random() < 0.5:
+                order_id, customer = rng.choice(reviewable)
+                return client.patch(
+                    reverse("order-add-review", args=[order_id]),
+                    {"user_id": customer, "review": "Benchmark review", "rating": rng.randint(1, 5)},
+                    content_type="application/json",
+                )
+            customer, sitter, service_model, pet, address = rng.choice(bookings)
+            return client.post(reverse("order-create"), {
+                "normal_user_id": customer, "petsitter_user_id": sitter, "service_model_id": service_model,
+                "pet_id": pet, "user_address_id": address, "start_datetime": start_datetime,
+            }, content_type="application/json")
+
+        def read(client, rng):
+            customer = rng.choice(bookings)[0]
+            return client.get(reverse("order-list-by-user", args=[customer]), {"limit": 50})
+
+        def worker(kind, action, seed):
+            rng = random.Random(seed)
+            client = Client()
+            try:
+                while time.monotonic() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        response = action(client, rng)
+                    except OperationalError as e:
+                        stats.record(kind, error=e)
+                        continue
+                    if response.status_code == 503:
+                        # Lock contention, answered as retryable by petproject.exceptions
+                        stats.record(kind, error="database is locked")
+                    elif response.status_code >= 400:
+                        stats.record(kind, error=f"HTTP {response.status_code}")
+                    else:
+                        stats.record(kind, latency=(time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=("write", write, i)) for i in range(options["writers"])]
+        threads += [threading.Thread(target=worker, args=("read", read, 1000 + i)) for i in range(options["readers"])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {"journal_mode": self._journal_mode(), **stats.summary(time.monotonic() - started)}
+
+    def _journal_mode(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            mode = cursor.fetchone()[0]
+        connection.close()
+        return mode
@@ -0,0 +1,84 @@
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from mainApp.discovery import PET_CODES, SitterIndex
+from mainApp.management.commands.bench_api import _percentiles
+
+# Synthetic sitters cluster around these (lat, lng) points
+CITIES = ((51.507, -0.128), (53.481, -2.243), (52.486, -1.890), (55.953, -3.188), (53.408, -2.991))
+SERVICES = 20
+
+
+def synthetic_index(size, cities, rng):
+    """A SitterIndex of ``size`` random sitter services around the first ``cities`` CITIES."""
+    city = rng.integers(cities, size=size)
+    centres = np.array(CITIES)[city]
+    return SitterIndex.from_columns(
+        id=np.arange(1, size + 1),
+        sitter=rng.integers(1, size // 3 + 2, size=size),
+        service=rng.integers(1, SERVICES + 1, size=size),
+        pet=rng.integers(len(PET_CODES), size=size),
+        lat=centres[:, 0] + rng.normal(0, 0.08, size=size),
+        lng=centres[:, 1] + rng.normal(0, 0.12, size=size),
+        rate=rng.uniform(100, 1500, size=size).round(2),
+        rating=rng.uniform(1, 5, size=size),
+        completion=rng.uniform(0.5, 1, size=size),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time top-k ranking of the sitter discovery index (mainApp.discovery) and report "
+        "p50/p95/p99 latency as JSON, over a synthetic index or the one loaded from the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--services", type=int, default=500_000, help="Sitter services in the synthetic index.")
+        parser.add_argument("--cities", type=int, default=len(CITIES), choices=range(1, len(CITIES) + 1),
+                            help="Spread synthetic sitters over this many cities; 1 puts all of them in range.")
+        parser.add_argument("--from-db", action="store_true", help="Load the index from the database instead.")
+        parser.add_argument("--queries", type=int, default=200, help="Measured rankings per case.")
+        parser.add_argument("--limit", type=int, default=50, help="k of the top-k.")
+        parser.add_argument("--radius-km", type=float, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        start = time.perf_counter()
+        if options["from_db"]:
+            index = SitterIndex()
+            index.refresh()
+        else:
+            index = synthetic_index(options["services"], options["cities"], rng)
+        report = {
+            "services": len(index.columns["id"]),
+            "load_ms": round((time.perf_counter() - start) * 1000, 1),
+            "limit": options["limit"],
+            "radius_km": options["radius_km"],
+            "cases": {},
+        }
+
+        services = np.unique(index.columns["service"]).tolist() or [None]
+        points = np.column_stack([index.columns["lat"], index.columns["lng"]])
+        points = points[np.isfinite(points).all(axis=1)]
+        if not len(points):
+            points = np.array(CITIES)
+        cases = {
+            # Every sitter service in range is a candidate: the worst case
+            "any-service": lambda: {},
+            "one-service": lambda: {"service_id": services[rng.integers(len(services))]},
+        }
+        for name, filters in cases.items():
+            latencies = []
+            for _ in range(options["queries"]):
+                lat, lng = points[rng.integers(len(points))]
+                kwargs = filters()
+                start = time.perf_counter()
+                index.top(lat, lng, options["radius_km"], options["limit"], **kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+            p50, p95, p99 = _percentiles(latencies)
+            report["cases"][name] = {"p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2)}
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,111 @@
+import time
+from datetime import datetime, timezone
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mainApp.models import PET_CHOICES, Order, Pet, Service, SitterService
+from mainApp.rows import ORDER_ROW
+from userApp.models import Address
+
+
+# Instance-based helpers as they were before mainApp.rows, kept as the baseline
+def _legacy_user(user):
+    data = {"id": user.id, "username": user.username, "email": user.email}
+    profile = getattr(user, "profile", None)
+    if profile:
+        data["profile"] = {"name": profile.name, "role": profile.role, "phone_number": profile.phone_number, "verified": profile.verified}
+    summary = getattr(user, "rating_summary", None)
+    data["rating"] = {"count": summary.count if summary else 0}
+    return data
+
+
+def _legacy_address(addr):
+    return {
+        "id": addr.id, "address": addr.address, "city": addr.city, "state": addr.state, "zipcode": addr.zipcode,
+        "latitude": addr.latitude, "longitude": addr.longitude, "country": addr.country,
+        "created_at": addr.created_at, "updated_at": addr.updated_at,
+    }
+
+
+def _legacy_service(svc):
+    return {
+        "id": svc.id, "name": svc.name, "pet": svc.pet, "pet_label": dict(PET_CHOICES).get(svc.pet, svc.pet),
+        "description": svc.description, "image_url": (svc.image.url if svc.image else None),
+    }
+
+
+def _legacy_order(order):
+    ss, pet = order.service_model, order.pet
+    return {
+        "id": order.id, "quantity": order.quantity, "final_rate": float(order.final_rate),
+        "start_datetime": order.start_datetime, "status": order.status,
+        "msg_for_user": order.msg_for_user, "msg_for_petsitter": order.msg_for_petsitter,
+        "rating_for_petsitter": order.rating_for_petsitter, "rating_review_for_petsitter": order.rating_review_for_petsitter,
+        "rating_for_user": order.rating_for_user, "rating_review_for_user": order.rating_review_for_user,
+        "created_at": order.created_at, "updated_at": order.updated_at,
+        "normal_user": _legacy_user(order.normal_user),
+        "petsitter_user": _legacy_user(order.petsitter_user),
+        "service_model": {
+            "id": ss.id, "rate": float(ss.rate), "created_at": ss.created_at, "updated_at": ss.updated_at,
+            "user": _legacy_user(ss.user), "service": _legacy_service(ss.service), "address": _legacy_address(ss.address),
+        },
+        "pet": {
+            "id": pet.id, "name": pet.name, "pet": pet.pet, "pet_label": dict(PET_CHOICES).get(pet.pet, pet.pet),
+            "breed": pet.breed, "age": pet.age, "bio": pet.bio, "important_info": pet.important_info,
+            "image_url": (pet.image.url if pet.image else None), "created_at": pet.created_at, "updated_at": pet.updated_at,
+            "user": {"id": pet.user.id, "username": pet.user.username, "email": pet.user.email},
+        } if pet else None,
+        "user_address": _legacy_address(order.user_address) if order.user_address else None,
+    }
+
+
+LEGACY_GRAPH = (
+    "normal_user__profile", "normal_user__rating_summary",
+    "petsitter_user__profile", "petsitter_user__rating_summary",
+    "service_model__user__profile", "service_model__user__rating_summary",
+    "service_model__service", "service_model__address", "pet__user", "user_address",
+)
+
+
+class Command(BaseCommand):
+    help = "Rows/second of order serialization: model instances + dict helpers vs mainApp.rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        n = options["orders"]
+        # Synthetic data lives only inside this transaction
+        with transaction.atomic():
+            self._seed(n)
+            orders = Order.objects.all()
+            for label, run in (
+                ("instances + helpers", lambda: [_legacy_order(o) for o in orders.select_related(*LEGACY_GRAPH)]),
+                ("values() rows", lambda: list(ORDER_ROW.rows(orders))),
+            ):
+                start = time.perf_counter()
+                count = len(run())
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{label:<22} {count / elapsed:>12,.0f} rows/s  ({elapsed:.2f}s for {count} rows)")
+            transaction.set_rollback(True)
+
+    def _seed(self, n):
+        customer = User.objects.create(username="bench-rows-customer")
+        sitter = User.objects.create(username="bench-rows-sitter")
+        address = Address.objects.create(user=customer, city="Bench", latitude=1.0, longitude=1.0)
+        service = Service.objects.create(name="Bench walking", pet="dog", image="services/bench.png")
+        sitter_service = SitterService.objects.create(user=sitter, service=service, address=address, rate=10)
+        pet = Pet.objects.create(user=customer, name="Bench", image="pets/bench.png")
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        Order.objects.bulk_create(
+            (
+                Order(
+                    normal_user=customer, petsitter_user=sitter, service_model=sitter_service, pet=pet,
+                    user_address=address, quantity=1, final_rate=10, start_datetime=start,
+                )
+                for _ in range(n)
+            ),
+            batch_size=2000,
+        )
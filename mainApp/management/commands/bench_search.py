@@ -0,0 +1,88 @@
+import json
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from mainApp.management.commands.bench_api import _percentiles
+from mainApp.models import SitterService
+from mainApp.seeding import CITIES, DEFAULT_BATCH_SIZE, _ensure_services, _insert
+from userApp.geo import grid_cell
+from userApp.models import Address
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the nearby sitter-service search (GET /api/main/sitter-services/search/) over synthetic "
+        "addresses scattered around the seed cities and report p50/p95/p99 latency as JSON. "
+        "The addresses are inserted in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--addresses", type=int, default=1_000_000, help="Synthetic addresses to insert.")
+        parser.add_argument("--sitter-share", type=float, default=0.2,
+                            help="Share of the addresses a sitter service is offered from.")
+        parser.add_argument("--queries", type=int, default=200, help="Measured searches per case.")
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            start = time.perf_counter()
+            self._insert_addresses(rng, options)
+            report = {
+                "addresses": Address.objects.count(),
+                "sitter_services": SitterService.objects.count(),
+                "insert_s": round(time.perf_counter() - start, 1),
+                "cases": {},
+            }
+            services = list(SitterService.objects.values_list("service_id", flat=True).distinct())
+            cases = {
+                "radius-10": lambda: {"radius_km": 10},
+                "radius-10-service": lambda: {"radius_km": 10, "service_id": rng.choice(services)},
+                # The largest radius allowed: the most candidates a search can read
+                "radius-50": lambda: {"radius_km": 50},
+            }
+            client = Client()
+            for name, params in cases.items():
+                self.stderr.write(f"{name} ...")
+                latencies, sizes = [], []
+                for i in range(options["warmup"] + options["queries"]):
+                    _, _, lat, lng = rng.choice(CITIES)
+                    query = {"lat": round(rng.gauss(lat, 0.05), 6), "lng": round(rng.gauss(lng, 0.05), 6), **params()}
+                    begin = time.perf_counter()
+                    response = client.get(reverse("sitter-service-search"), query)
+                    if i >= options["warmup"]:
+                        latencies.append((time.perf_counter() - begin) * 1000)
+                        sizes.append(len(response.json()))
+                p50, p95, p99 = _percentiles(latencies)
+                report["cases"][name] = {
+                    "p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2),
+                    "results_mean": round(sum(sizes) / len(sizes), 1),
+                }
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _insert_addresses(self, rng, options):
+        owner = User.objects.create(username=f"bench-search-{rng.getrandbits(32):08x}")
+        services = [service_id for service_id, _ in _ensure_services(rng)]
+
+        def address(i):
+            city, state, lat, lng = rng.choice(CITIES)
+            lat, lng = round(rng.gauss(lat, 0.08), 6), round(rng.gauss(lng, 0.08), 6)
+            return Address(user=owner, city=city, state=state, latitude=lat, longitude=lng, grid_cell=grid_cell(lat, lng))
+
+        address_ids = _insert(Address, (address(i) for i in range(options["addresses"])), DEFAULT_BATCH_SIZE)
+        offered = rng.sample(address_ids, int(len(address_ids) * options["sitter_share"]))
+        _insert(
+            SitterService,
+            (SitterService(user=owner, service_id=rng.choice(services), address_id=address_id,
+                           rate=Decimal(rng.randrange(200, 2000))) for address_id in offered),
+            DEFAULT_BATCH_SIZE,
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from mainApp.models import Ad, Pet, Service
+from mainApp.tasks import render_image_variants
+
+
+class Command(BaseCommand):
+    help = "Render thumb/card/full variants for Service, Pet and Ad images that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Re-render every image, not only missing ones.")
+
+    def handle(self, *args, **options):
+        for model in (Service, Pet, Ad):
+            built = 0
+            for obj in model.objects.exclude(image="").exclude(image=None).iterator():
+                variants = obj.image_variants or {}
+                if options["force"] or variants.get("source") != obj.image.name or len(variants) == 1:
+                    # Inline rather than queued: this is already a batch process
+                    render_image_variants(model._meta.label, obj.pk, obj.image.name)
+                    built += 1
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {built} rendered")
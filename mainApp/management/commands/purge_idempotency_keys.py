@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from mainApp.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Key records older than IDEMPOTENCY['TTL']."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired idempotency keys"))
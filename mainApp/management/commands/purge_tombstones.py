@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from mainApp.sync import purge_expired_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete delta sync tombstones older than SYNC['TOMBSTONE_TTL']."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired tombstones"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from mainApp.ratings import rebuild_rating_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild every user's rating summary from the ratings stored on orders."
+
+    def handle(self, *args, **options):
+        written = rebuild_rating_summaries()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating summaries for {written} users"))
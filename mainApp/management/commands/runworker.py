@@ -0,0 +1,54 @@
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mainApp.queue import work
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs from the database queue (see mainApp.queue). "
+        "SIGTERM or Ctrl-C stops after the job in progress."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Worker processes to run side by side.")
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is eligible to run.")
+
+    def handle(self, *args, **options):
+        if options["processes"] > 1:
+            self._supervise(options)
+            return
+
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            processed = work(burst=options["burst"], should_stop=lambda: stopping)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(f"Ran {processed} jobs")
+
+    def _supervise(self, options):
+        command = [sys.executable, str(Path(settings.BASE_DIR) / "manage.py"), "runworker"]
+        if options["burst"]:
+            command.append("--burst")
+        workers = [subprocess.Popen(command) for _ in range(options["processes"])]
+
+        def forward(signum, frame):
+            for worker in workers:
+                worker.send_signal(signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for worker in workers:
+            worker.wait()
@@ -0,0 +1,39 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mainApp.caching import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database onto every DATABASE_REPLICAS file with the online backup API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Keep syncing every INTERVAL seconds.")
+
+    def handle(self, *args, **options):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            raise CommandError("No replicas configured; set DJANGO_DB_REPLICAS.")
+        if settings.DATABASES["default"]["ENGINE"] not in ("django.db.backends.sqlite3", "petproject.sqlite_backend"):
+            raise CommandError("sync_replicas only copies SQLite databases.")
+        while True:
+            self.sync(replicas)
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def sync(self, replicas):
+        start = time.perf_counter()
+        with sqlite3.connect(settings.DATABASES["default"]["NAME"]) as primary:
+            for alias in replicas:
+                # Readers on the replica keep seeing the previous copy until the backup commits
+                with sqlite3.connect(settings.DATABASES[alias]["NAME"], timeout=30) as replica:
+                    primary.backup(replica)
+                replica.close()
+        primary.close()
+        # Catalog responses cached from a lagging replica are retired with the new version
+        bump_catalog_version()
+        self.stdout.write(f"Synced {', '.join(replicas)} in {(time.perf_counter() - start) * 1000:.0f} ms")
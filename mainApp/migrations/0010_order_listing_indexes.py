@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-17 12:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0009_order_rating_for_petsitter_order_rating_for_user'),
+        ('userApp', '0003_address_user_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['normal_user', 'created_at'], name='order_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['petsitter_user', 'created_at'], name='order_sitter_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['user', 'name'], name='pet_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['pet', 'name'], name='service_pet_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitterservice',
+            index=models.Index(fields=['user', 'created_at'], name='sitterservice_user_created_idx'),
+        ),
+    ]
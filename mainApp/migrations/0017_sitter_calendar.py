@@ -0,0 +1,63 @@
+# Generated by Django 5.0.7 on 2026-10-17 13:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+from mainApp.bookings import default_end
+
+
+def book_upcoming_orders(apps, schema_editor):
+    # Past and cancelled orders cannot conflict with new ones
+    Order = apps.get_model('mainApp', 'Order')
+    Booking = apps.get_model('mainApp', 'Booking')
+    upcoming = Order.objects.filter(status__in=('pending', 'approved'), start_datetime__gte=timezone.now())
+    bookings = (
+        Booking(
+            order_id=order_id, sitter_id=sitter_id, sitter_service_id=sitter_service_id,
+            starts_at=start, ends_at=default_end(start, quantity),
+        )
+        for order_id, sitter_id, sitter_service_id, start, quantity in upcoming.values_list(
+            'id', 'petsitter_user_id', 'service_model_id', 'start_datetime', 'quantity'
+        ).iterator()
+    )
+    Booking.objects.bulk_create(bookings, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0016_ordermessage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='booking', to='mainApp.order')),
+                ('sitter', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to=settings.AUTH_USER_MODEL)),
+                ('sitter_service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='mainApp.sitterservice')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sitter', 'ends_at'], name='booking_sitter_end_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SitterAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('sitter_service', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='mainApp.sitterservice')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sitter_service', 'ends_at'], name='availability_service_end_idx')],
+            },
+        ),
+        migrations.RunPython(book_upcoming_orders, migrations.RunPython.noop),
+    ]
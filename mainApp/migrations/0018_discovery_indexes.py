@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-17 13:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0017_sitter_calendar'),
+        ('userApp', '0006_address_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ratingsummary',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitterservice',
+            index=models.Index(fields=['updated_at'], name='sitterservice_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.7 on 2026-10-17 13:18
+
+from django.db import migrations
+
+# (FTS table, content table, indexed columns, bm25 column weights, only rows where)
+FTS_TABLES = (
+    ('service_fts', 'mainApp_service', ('name', 'description'), (10.0, 1.0), None),
+    ('pet_fts', 'mainApp_pet', ('name', 'breed', 'bio'), (10.0, 5.0, 1.0), None),
+    # Most orders carry no review; leave them out of the index altogether
+    ('order_review_fts', 'mainApp_order', ('rating_review_for_petsitter', 'rating_review_for_user'), (1.0, 1.0),
+     "{row}.rating_review_for_petsitter <> '' OR {row}.rating_review_for_user <> ''"),
+)
+
+
+def _fts_sql(fts, content, columns, weights, condition):
+    cols = ', '.join(columns)
+
+    def values(row):
+        return ', '.join(f'{row}.{column}' for column in columns)
+
+    def where(row):
+        return f' WHERE {condition.format(row=row)}' if condition else ''
+
+    # External content: the index stores tokens only and reads nothing back
+    # from the base table. A 'delete' must be given the exact values that were
+    # indexed, hence the OLD row in the delete and update triggers.
+    add = f'INSERT INTO {fts}(rowid, {cols}) SELECT new.id, {values("new")}{where("new")};'
+    drop = f"INSERT INTO {fts}({fts}, rowid, {cols}) SELECT 'delete', old.id, {values('old')}{where('old')};"
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{content}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {content} BEGIN {add} END',
+        f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {content} BEGIN {drop} END',
+        # Only writes to the indexed columns reindex the row
+        f'CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {content} BEGIN {drop} {add} END',
+        f'INSERT INTO {fts}(rowid, {cols}) SELECT id, {cols} FROM {content}{where(content)}',
+        f"INSERT INTO {fts}({fts}, rank) VALUES ('rank', 'bm25({', '.join(map(str, weights))})')",
+    ]
+
+
+def create_fts_tables(apps, schema_editor):
+    # FTS5 is SQLite's; other backends search with LIKE (see mainApp.search)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in FTS_TABLES:
+        for sql in _fts_sql(*table):
+            schema_editor.execute(sql)
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for fts, *_ in FTS_TABLES:
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0018_discovery_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+    ]
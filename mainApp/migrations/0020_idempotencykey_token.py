@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-17 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0019_search_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='token',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-17 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainApp', '0020_idempotencykey_token'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tombstone',
+            name='object_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='tombstone',
+            name='user_id',
+            field=models.PositiveBigIntegerField(null=True),
+        ),
+    ]
@@ -1,5 +1,12 @@
-from django.db import models
+import threading
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from mainApp.caching import bump_catalog_version
+from mainApp.images import schedule_image_variants, update_image_variants
 from userApp.models import Address
 
 # Create your models here.
@@ -19,13 +26,37 @@ class Service(models.Model):
     pet = models.CharField(max_length=20, choices=PET_CHOICES, default="dog")
     description = models.TextField(blank=True, default="")
     image = models.ImageField(upload_to="services/", null=True, blank=True)
+    # Resized copies of image, see mainApp.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["pet", "name"], name="service_pet_name_idx"),
+            models.Index(fields=["updated_at"], name="service_updated_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        image_changed = update_image_variants(self, kwargs)
+        super().save(*args, **kwargs)
+        if image_changed:
+            schedule_image_variants(self)
+
     def __str__(self):
         return f"{self.name} ({self.get_pet_display()})"
 
 
+@receiver(post_save, sender="mainApp.Ad")
+@receiver(post_delete, sender="mainApp.Ad")
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_catalog_cache(sender, **kwargs):
+    # Cached catalog responses are keyed by version; bumping it retires them all.
+    # Only after commit: a read racing the write could cache the old rows under the new version
+    transaction.on_commit(bump_catalog_version)
+
+
 class SitterService(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sitter_services")
     service = models.ForeignKey('mainApp.Service', on_delete=models.CASCADE, related_name="sitter_services")
@@ -34,17 +65,33 @@ class SitterService(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="sitterservice_user_created_idx"),
+            models.Index(fields=["user", "updated_at"], name="sitterservice_user_updated_idx"),
+            # Incremental refresh of the discovery index (mainApp.discovery)
+            models.Index(fields=["updated_at"], name="sitterservice_updated_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.service.name} @ {self.rate}"
 
 
 class Ad(models.Model):
     image = models.ImageField(upload_to="ads/", null=True, blank=True)
+    # Resized copies of image, see mainApp.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     punch_line = models.CharField(max_length=255, blank=True, default="")
     url = models.URLField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        image_changed = update_image_variants(self, kwargs)
+        super().save(*args, **kwargs)
+        if image_changed:
+            schedule_image_variants(self)
+
     def __str__(self):
         return f"Ad: {self.punch_line[:50]}"
 
@@ -56,11 +103,25 @@ class Pet(models.Model):
     breed = models.CharField(max_length=150, blank=True, default="")
     age = models.PositiveIntegerField(null=True, blank=True)
     image = models.ImageField(upload_to="pets/", null=True, blank=True)
+    # Resized copies of image, see mainApp.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     bio = models.TextField(blank=True, default="")
     important_info = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "name"], name="pet_user_name_idx"),
+            models.Index(fields=["user", "updated_at"], name="pet_user_updated_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        image_changed = update_image_variants(self, kwargs)
+        super().save(*args, **kwargs)
+        if image_changed:
+            schedule_image_variants(self)
+
     def __str__(self):
         return f"{self.name} ({self.get_pet_display()}) - {self.user.username}"
 
@@ -92,6 +153,18 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # "My orders" is served as two range scans, one per side of the order.
+            models.Index(fields=["normal_user", "created_at"], name="order_customer_created_idx"),
+            models.Index(fields=["petsitter_user", "created_at"], name="order_sitter_created_idx"),
+            # Delta sync (mainApp.sync) reads each side's changes since a watermark.
+            models.Index(fields=["normal_user", "updated_at"], name="order_customer_updated_idx"),
+            models.Index(fields=["petsitter_user", "updated_at"], name="order_sitter_updated_idx"),
+            # The discovery index re-reads completion stats of sitters with changed orders
+            models.Index(fields=["updated_at"], name="order_updated_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         # Auto-calculate final_rate = service_model.rate * quantity
         if self.service_model and self.quantity:
@@ -100,3 +173,232 @@ class Order(models.Model):
 
     def __str__(self):
         return f"Order #{self.id}: {self.normal_user.username} -> {self.petsitter_user.username} ({self.status})"
+
+
+class OrderMessage(models.Model):
+    """One message in an order's conversation, see mainApp.conversations.
+
+    Messages are only ever inserted. Ids grow with insertion order, so a
+    conversation is read as a range scan on ``(order, id)`` from the last id
+    the client has.
+    """
+    # The composite index below leads with order, so no separate FK index
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="messages", db_index=False)
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name="order_messages")
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["order", "id"], name="ordermessage_order_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"OrderMessage #{self.id} on order #{self.order_id}"
+
+
+class SitterAvailability(models.Model):
+    """A window in which a sitter offers one of their services, see mainApp.bookings."""
+    sitter_service = models.ForeignKey(SitterService, on_delete=models.CASCADE, related_name="availability", db_index=False)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Windows overlapping a range are those ending after its start, of which
+            # only the ones starting before its end are kept: one range scan per service
+            models.Index(fields=["sitter_service", "ends_at"], name="availability_service_end_idx"),
+        ]
+
+    def __str__(self):
+        return f"Availability of sitter service #{self.sitter_service_id}: {self.starts_at} - {self.ends_at}"
+
+
+class Booking(models.Model):
+    """The time an order takes up in its sitter's calendar, see mainApp.bookings.
+
+    Bookings belong to the sitter rather than the sitter service: a sitter
+    offering several services can still only be in one place at a time.
+    """
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="booking")
+    sitter = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bookings", db_index=False)
+    sitter_service = models.ForeignKey(SitterService, on_delete=models.CASCADE, related_name="bookings")
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # The overlap check reads the sitter's bookings ending after the new
+            # start, i.e. current and future ones, never their whole history
+            models.Index(fields=["sitter", "ends_at"], name="booking_sitter_end_idx"),
+        ]
+
+    def __str__(self):
+        return f"Booking of order #{self.order_id}: {self.starts_at} - {self.ends_at}"
+
+
+class RatingSummary(models.Model):
+    """Running totals of the ratings a user has received across their orders.
+
+    Recomputed for the rated user by a background job after each review (see
+    mainApp.ratings) so listings can show a user's rating without aggregating
+    over orders.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="rating_summary")
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    @property
+    def average(self):
+        return round(self.total / self.count, 2) if self.count else None
+
+    @property
+    def histogram(self):
+        return {str(stars): getattr(self, f"stars_{stars}") for stars in range(1, 6)}
+
+    def __str__(self):
+        return f"Rating({self.user.username}: {self.average} from {self.count})"
+
+
+class IdempotencyKey(models.Model):
+    """Outcome of a POST sent with an ``Idempotency-Key`` header, see mainApp.idempotency.
+
+    The row is inserted before the view runs (``status_code`` null while in
+    flight), so the primary key on ``key`` lets exactly one of several
+    concurrent duplicates through. Rows older than IDEMPOTENCY['TTL'] are
+    ignored and purged by ``manage.py purge_idempotency_keys``.
+    """
+    key = models.CharField(max_length=64, primary_key=True)  # sha256 of scope + client key
+    request_hash = models.CharField(max_length=64)
+    # Random per claim; a takeover of an abandoned key gets a new one
+    token = models.CharField(max_length=32, blank=True, default="")
+    status_code = models.PositiveSmallIntegerField(null=True)
+    content_type = models.CharField(max_length=100, blank=True, default="")
+    body = models.BinaryField(default=b"")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"IdempotencyKey({self.key[:12]}…, {self.status_code or 'in flight'})"
+
+
+JOB_STATUS_CHOICES = (
+    ("queued", "Queued"),
+    ("running", "Running"),
+    ("failed", "Failed"),
+)
+
+
+class Job(models.Model):
+    """A unit of background work, see mainApp.queue.
+
+    Queued jobs become eligible at ``run_at``. A worker claims a job by
+    setting ``lock_token`` and ``locked_until``; a running job whose lock has
+    expired is claimed again by the next worker, unless that was its last
+    attempt. Finished jobs are deleted, and jobs that used up ``max_attempts``
+    stay behind as ``failed``.
+    """
+    name = models.CharField(max_length=150)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=JOB_STATUS_CHOICES, default="queued")
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    lock_token = models.CharField(max_length=32, blank=True, default="")
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="job_status_run_at_idx"),
+            models.Index(fields=["lock_token"], name="job_lock_token_idx"),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.id}: {self.name} ({self.status})"
+
+
+class Tombstone(models.Model):
+    """A deleted row, kept so delta sync (mainApp.sync) can tell clients to drop it.
+
+    ``user_id`` is the user whose sync feed carries the deletion, or null for
+    catalog rows every client sees; it is a plain integer so tombstones can
+    be written while the user row itself is being deleted. Rows older than
+    SYNC['TOMBSTONE_TTL'] are purged by ``manage.py purge_tombstones``.
+    """
+    user_id = models.PositiveBigIntegerField(null=True)
+    kind = models.CharField(max_length=20)  # sync collection name, e.g. "orders"
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_id", "deleted_at"], name="tombstone_user_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"Tombstone({self.kind} #{self.object_id})"
+
+
+TOMBSTONE_KINDS = {Order: "orders", Pet: "pets", SitterService: "sitter_services", Address: "addresses", Service: "services"}
+
+# Tombstones of the delete() calls running in this thread, by id() of their
+# origin (the model instance or queryset delete() was called on)
+_pending_tombstones = threading.local()
+
+
+def _tombstones(sender, instance):
+    kind = TOMBSTONE_KINDS[sender]
+    if sender is Order:
+        user_ids = {instance.normal_user_id, instance.petsitter_user_id}
+    elif sender is Service:
+        user_ids = {None}
+    else:
+        user_ids = {instance.user_id}
+    return [Tombstone(user_id=user_id, kind=kind, object_id=instance.pk) for user_id in user_ids]
+
+
+@receiver(pre_delete, sender=Order)
+@receiver(pre_delete, sender=Pet)
+@receiver(pre_delete, sender=SitterService)
+@receiver(pre_delete, sender=Address)
+@receiver(pre_delete, sender=Service)
+def collect_tombstones(sender, instance, origin=None, **kwargs):
+    # A delete() sends pre_delete for every row it collected, cascades
+    # included, before it deletes any of them
+    pending = getattr(_pending_tombstones, "deletes", None)
+    if pending is None:
+        pending = _pending_tombstones.deletes = {}
+    entry = pending.get(id(origin))
+    if entry is None or entry["origin"] is not origin:
+        # New, or left over from a delete() that raised
+        entry = pending[id(origin)] = {"origin": origin, "rows": 0, "tombstones": []}
+    entry["rows"] += 1
+    entry["tombstones"].extend(_tombstones(sender, instance))
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Pet)
+@receiver(post_delete, sender=SitterService)
+@receiver(post_delete, sender=Address)
+@receiver(post_delete, sender=Service)
+def record_tombstones(sender, instance, origin=None, **kwargs):
+    # The last row's post_delete writes the whole delete()'s tombstones at once,
+    # still inside its transaction. (These receivers do cost Django's fast-delete
+    # path, so cascades load every dependent row to send the signals.)
+    pending = getattr(_pending_tombstones, "deletes", {})
+    entry = pending.get(id(origin))
+    if entry is None or entry["origin"] is not origin:
+        Tombstone.objects.bulk_create(_tombstones(sender, instance))
+        return
+    entry["rows"] -= 1
+    if not entry["rows"]:
+        del pending[id(origin)]
+        Tombstone.objects.bulk_create(entry["tombstones"])
@@ -0,0 +1,131 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+def encode_cursor(position):
+    """Serialize a keyset position (tuple of column values) into an opaque token."""
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else str(v) if isinstance(v, Decimal) else v for v in position]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; returns the raw JSON values (not yet typed)."""
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        raise ValidationError({"error": "Invalid cursor"})
+    if not isinstance(values, list):
+        raise ValidationError({"error": "Invalid cursor"})
+    return values
+
+
+def keyset_filter(ordering, position):
+    """Build a Q selecting rows strictly after ``position`` in ``ordering``.
+
+    For ordering (a, b) ascending this is ``a > x OR (a = x AND b > y)``;
+    descending fields flip the comparison. The filter is a range predicate on
+    the ordering columns, so the database seeks straight to the page instead
+    of walking past every skipped row like OFFSET does.
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, position):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return condition
+
+
+class KeysetPagination:
+    """Opaque cursor pagination keyed on the ordering columns.
+
+    Opt-in per request: clients pass ``?limit=`` and/or ``?cursor=`` and get
+    ``{"next": <cursor|null>, "results": [...]}`` back. Requests without either
+    parameter keep the plain list response. The last ordering field must be
+    unique (``id``) so positions are total.
+    """
+
+    limit_query_param = "limit"
+    cursor_query_param = "cursor"
+    default_limit = 50
+    max_limit = 500
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+        self.next_position = None
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.limit_query_param in params or self.cursor_query_param in params
+
+    def get_limit(self, request):
+        raw = request.query_params.get(self.limit_query_param)
+        if raw is None:
+            return self.default_limit
+        try:
+            limit = int(raw)
+        except (TypeError, ValueError):
+            raise ValidationError({"error": "limit must be a number"})
+        if limit <= 0:
+            raise ValidationError({"error": "limit must be positive"})
+        return min(limit, self.max_limit)
+
+    def get_position(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        values = decode_cursor(token)
+        # Cursors come from clients: one scalar per ordering column, nothing else
+        if len(values) != len(self.ordering) or not all(
+            isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in values
+        ):
+            raise ValidationError({"error": "Invalid cursor"})
+        try:
+            position = tuple(
+                model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, values)
+            )
+        except (TypeError, ValueError, DjangoValidationError):
+            raise ValidationError({"error": "Invalid cursor"})
+        if None in position:
+            raise ValidationError({"error": "Invalid cursor"})
+        return position
+
+    def position_of(self, row):
+        if isinstance(row, dict):  # rows from mainApp.rows
+            return tuple(row[field.lstrip("-")] for field in self.ordering)
+        return tuple(getattr(row, field.lstrip("-")) for field in self.ordering)
+
+    def paginate_queryset(self, queryset, request):
+        """Return one page of rows, or None when the client did not ask to paginate."""
+        if not self.is_requested(request):
+            return None
+        limit = self.get_limit(request)
+        position = self.get_position(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, position))
+        rows = list(queryset.order_by(*self.ordering)[:limit + 1])
+        return self.trim_page(rows, limit)
+
+    def trim_page(self, rows, limit):
+        """Cut a limit+1 fetch down to ``limit`` rows and remember the next position."""
+        page = rows[:limit]
+        self.next_position = self.position_of(page[-1]) if len(rows) > limit else None
+        return page
+
+    def get_next_cursor(self):
+        return encode_cursor(self.next_position) if self.next_position is not None else None
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_cursor(), "results": data})
@@ -0,0 +1,172 @@
+"""A small job queue kept in the database, for work that should not hold up
+a request. It needs no broker, so it runs unchanged on SQLite.
+
+Register a function with ``@job`` (in an app's ``tasks`` module, which
+workers import on start) and call ``enqueue(func, **payload)`` from a view.
+The Job row is inserted in the caller's transaction, so the work is queued
+exactly when the write that needs it commits. ``manage.py runworker`` then
+claims eligible jobs with a conditional UPDATE, runs them, deletes them on
+success and re-queues them with exponential backoff on failure.
+
+A claimed job is hidden from other workers for
+JOBS['VISIBILITY_TIMEOUT'] seconds; if its worker dies the job is claimed
+again after that, so a job may run more than once and should be
+idempotent. A worker that finishes after losing its claim records nothing.
+"""
+import logging
+import random
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from mainApp.models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS = {
+    "VISIBILITY_TIMEOUT": 300,
+    "MAX_ATTEMPTS": 5,
+    "BACKOFF_SECONDS": 10,
+    "MAX_BACKOFF_SECONDS": 60 * 60,
+    "POLL_SECONDS": 1.0,
+}
+MAX_ERROR_LENGTH = 4000
+
+# Job name -> (function, max_attempts or None for the JOBS default)
+registry = {}
+
+
+def _job_settings():
+    return {**DEFAULT_JOBS, **getattr(settings, "JOBS", {})}
+
+
+def job(name=None, max_attempts=None):
+    """Register the decorated function as a job, by default under ``module.function``."""
+
+    def register(func):
+        func.job_name = name or f"{func.__module__}.{func.__name__}"
+        registry[func.job_name] = (func, max_attempts)
+        return func
+
+    return register
+
+
+def enqueue(func, delay=0, **payload):
+    """Queue ``func(**payload)`` to run in a worker, ``delay`` seconds from now
+    at the earliest. ``func`` is a registered job or its name; the payload
+    must be JSON serializable. Returns the Job."""
+    name = getattr(func, "job_name", func)
+    max_attempts = registry.get(name, (None, None))[1] or _job_settings()["MAX_ATTEMPTS"]
+    return Job.objects.create(
+        name=name, payload=payload, max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def claim(limit=1):
+    """Claim up to ``limit`` eligible jobs for this worker and return them;
+    an empty list means no job is eligible."""
+    while True:
+        now = timezone.now()
+        expired = Q(status="running", locked_until__lt=now)
+        eligible = Q(status="queued", run_at__lte=now) | (expired & Q(attempts__lt=F("max_attempts")))
+        # Read first, so an idle worker polling the queue never takes the write lock
+        rows = list(
+            Job.objects.filter(Q(status="queued", run_at__lte=now) | expired)
+            .order_by("run_at", "id").values_list("id", "status", "attempts", "max_attempts")[:limit]
+        )
+        if not rows:
+            return []
+        # A worker died during the last attempt (e.g. killed for memory); don't retry it forever
+        lost = [job_id for job_id, status, attempts, max_attempts in rows if status == "running" and attempts >= max_attempts]
+        if lost:
+            failed = Job.objects.filter(expired, id__in=lost, attempts__gte=F("max_attempts")).update(
+                status="failed", lock_token="", locked_until=None, updated_at=now,
+                last_error="The worker running the last attempt stopped before finishing",
+            )
+            if failed:
+                logger.error("Jobs %s failed for good: their worker stopped on the last attempt", lost)
+        ids = [row[0] for row in rows if row[0] not in lost]
+        if not ids:
+            continue
+        token = uuid.uuid4().hex
+        # Re-checking eligibility in the UPDATE lets only one of several racing workers win each job
+        Job.objects.filter(eligible, id__in=ids).update(
+            status="running",
+            lock_token=token,
+            locked_until=now + timedelta(seconds=_job_settings()["VISIBILITY_TIMEOUT"]),
+            attempts=F("attempts") + 1,
+            updated_at=now,
+        )
+        claimed = list(Job.objects.filter(lock_token=token))
+        if claimed:
+            return claimed
+        # Other workers took all of these; look again
+
+
+def backoff_seconds(attempts):
+    """Delay before retry number ``attempts``: exponential, capped, with jitter."""
+    config = _job_settings()
+    delay = min(config["MAX_BACKOFF_SECONDS"], config["BACKOFF_SECONDS"] * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run(claimed):
+    """Run one claimed job and record the outcome. Returns True on success."""
+    mine = Job.objects.filter(id=claimed.id, lock_token=claimed.lock_token)
+    try:
+        if claimed.name not in registry:
+            raise LookupError(f"No job registered as {claimed.name!r}")
+        func, _ = registry[claimed.name]
+        func(**claimed.payload)
+    except Exception:
+        error = traceback.format_exc()[-MAX_ERROR_LENGTH:]
+        now = timezone.now()
+        if claimed.attempts >= claimed.max_attempts:
+            logger.error("Job %s (%s) failed for good after %s attempts", claimed.id, claimed.name, claimed.attempts)
+            mine.update(status="failed", lock_token="", locked_until=None, last_error=error, updated_at=now)
+        else:
+            delay = backoff_seconds(claimed.attempts)
+            logger.warning("Job %s (%s) failed, retrying in %.0fs", claimed.id, claimed.name, delay)
+            mine.update(
+                status="queued", lock_token="", locked_until=None, last_error=error, updated_at=now,
+                run_at=now + timedelta(seconds=delay),
+            )
+        return False
+    mine.delete()
+    return True
+
+
+def load_jobs():
+    """Import every installed app's ``tasks`` module so its jobs are registered."""
+    autodiscover_modules("tasks")
+
+
+def work(burst=False, should_stop=lambda: False):
+    """Claim and run jobs until ``should_stop()``; with ``burst``, stop as soon
+    as no job is eligible. Returns the number of jobs run."""
+    load_jobs()
+    poll = _job_settings()["POLL_SECONDS"]
+    processed = 0
+    while not should_stop():
+        if not connection.in_atomic_block:
+            # Drop connections past CONN_MAX_AGE or broken, as the request cycle does;
+            # never inside a transaction (as when tests call this), which would end it
+            close_old_connections()
+        jobs = claim()
+        if not jobs:
+            if burst:
+                break
+            time.sleep(poll)
+            continue
+        for claimed in jobs:
+            run(claimed)
+            processed += 1
+    return processed
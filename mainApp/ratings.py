@@ -0,0 +1,94 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from mainApp.models import Order, RatingSummary
+
+# Which order column holds the rating a participant *received*.
+RECEIVED_RATING_COLUMNS = (
+    ("petsitter_user_id", "rating_for_petsitter"),
+    ("normal_user_id", "rating_for_user"),
+)
+
+
+RATING_COLUMNS = ("count", "total", "stars_1", "stars_2", "stars_3", "stars_4", "stars_5")
+
+
+def apply_rating_change(user_id, old, new):
+    """Move one of user_id's received ratings from ``old`` to ``new`` stars.
+
+    Either side may be None (no rating before / rating removed). Runs as a
+    single UPDATE with F() expressions, so concurrent reviews add up instead
+    of overwriting each other. Call inside the transaction that writes the
+    order so the summary never drifts from the orders.
+    """
+    if old == new:
+        return
+    RatingSummary.objects.get_or_create(user_id=user_id)
+    changes = defaultdict(int)
+    if old is not None:
+        changes["count"] -= 1
+        changes["total"] -= old
+        changes[f"stars_{old}"] -= 1
+    if new is not None:
+        changes["count"] += 1
+        changes["total"] += new
+        changes[f"stars_{new}"] += 1
+    RatingSummary.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in changes.items() if delta}
+    )
+
+
+def rating_from_values(count, total, *stars):
+    """API shape of a RatingSummary given its RATING_COLUMNS (all None when it has no row)."""
+    if not count:
+        return {"count": 0, "average": None, "histogram": {str(n): 0 for n in range(1, 6)}}
+    return {
+        "count": count,
+        "average": round(total / count, 2),
+        "histogram": {str(n): stars[n - 1] for n in range(1, 6)},
+    }
+
+
+def _received_histograms(user_id=None):
+    """{user_id: {stars: n}} of the ratings received by every user, or just ``user_id``."""
+    totals = defaultdict(lambda: defaultdict(int))
+    for user_column, rating_column in RECEIVED_RATING_COLUMNS:
+        orders = Order.objects.all() if user_id is None else Order.objects.filter(**{user_column: user_id})
+        rows = (
+            orders.exclude(**{rating_column: None})
+            .values_list(user_column, rating_column)
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        for rated_id, stars, n in rows:
+            totals[rated_id][stars] += n
+    return totals
+
+
+def _summary(user_id, histogram):
+    summary = RatingSummary(user_id=user_id)
+    for stars, n in histogram.items():
+        setattr(summary, f"stars_{stars}", n)
+    summary.count = sum(histogram.values())
+    summary.total = sum(stars * n for stars, n in histogram.items())
+    return summary
+
+
+@transaction.atomic
+def rebuild_rating_summary(user_id):
+    """Recompute one user's RatingSummary from their orders. Safe to repeat,
+    so it can run as a retried background job to reconcile a summary."""
+    summary = _summary(user_id, _received_histograms(user_id).get(user_id, {}))
+    values = {column: getattr(summary, column) for column in RATING_COLUMNS}
+    RatingSummary.objects.update_or_create(user_id=user_id, defaults=values)
+
+
+@transaction.atomic
+def rebuild_rating_summaries():
+    """Recompute every RatingSummary from the orders. Returns the number of rows written."""
+    summaries = [_summary(user_id, histogram) for user_id, histogram in _received_histograms().items()]
+    RatingSummary.objects.all().delete()
+    RatingSummary.objects.bulk_create(summaries, batch_size=500)
+    return len(summaries)
@@ -0,0 +1,269 @@
+"""API dicts built straight from ``values_list()`` tuples.
+
+A RowSerializer describes the JSON shape of a model once; ``rows(queryset)``
+returns the queryset as ``values_list()`` over exactly the columns the shape
+needs (related columns come from JOINs, so a whole graph is one query) and
+yields ready-made dicts instead of model instances. On first use the shape
+is compiled into a single lambda with fixed tuple offsets; per-row helpers
+such as choice labels and media URLs use lookups prepared once at import.
+"""
+from django.core.files.storage import FileSystemStorage, storages
+from django.db.models.query import ValuesListIterable
+from django.utils.encoding import filepath_to_uri
+
+from mainApp.images import IMAGE_VARIANTS
+from mainApp.models import PET_CHOICES
+from mainApp.ratings import RATING_COLUMNS, rating_from_values
+
+
+class Col:
+    """Copy one column, optionally passing it through ``convert``."""
+
+    def __init__(self, path, convert=None):
+        self.path = path
+        self.convert = convert
+
+
+class Computed:
+    """Derive one value from several columns: ``compute(*values)``."""
+
+    def __init__(self, paths, compute):
+        self.paths = tuple(paths)
+        self.compute = compute
+
+
+class Nested:
+    """Embed ``serializer`` for the relation at ``path``.
+
+    ``missing`` decides what happens when the relation is absent (nullable FK
+    or missing reverse one-to-one): ``None`` for a non-nullable relation,
+    ``"null"`` to emit null, ``"omit"`` to leave the key out.
+    """
+
+    def __init__(self, path, serializer, missing=None):
+        self.path = path
+        self.serializer = serializer
+        self.missing = missing
+
+
+class RowSerializer:
+    def __init__(self, fields):
+        self.fields = {key: Col(source) if isinstance(source, str) else source for key, source in fields.items()}
+        self._compiled = None
+
+    def compile(self):
+        """Return (paths, iterable_class); the iterable maps row tuples to dicts."""
+        if self._compiled is None:
+            paths, env = [], {}
+
+            def column(path):
+                if path not in paths:
+                    paths.append(path)
+                return f"r[{paths.index(path)}]"
+
+            def bind(func):
+                name = f"f{len(env)}"
+                env[name] = func
+                return name
+
+            def expression(serializer, prefix):
+                items = []
+                for key, source in serializer.fields.items():
+                    if isinstance(source, Col):
+                        value = column(prefix + source.path)
+                        if source.convert is not None:
+                            value = f"{bind(source.convert)}({value})"
+                    elif isinstance(source, Computed):
+                        args = ", ".join(column(prefix + path) for path in source.paths)
+                        value = f"{bind(source.compute)}({args})"
+                    else:
+                        nested_prefix = f"{prefix}{source.path}__"
+                        value = expression(source.serializer, nested_prefix)
+                        if source.missing is not None:
+                            present = f"{column(nested_prefix + 'id')} is not None"
+                            if source.missing == "omit":
+                                items.append(f"**({{{key!r}: {value}}} if {present} else {{}})")
+                                continue
+                            value = f"({value} if {present} else None)"
+                    items.append(f"{key!r}: {value}")
+                return "{" + ", ".join(items) + "}"
+
+            build = eval(f"lambda r: {expression(self, '')}", env)
+
+            class RowIterable(ValuesListIterable):
+                def __iter__(self):
+                    return map(build, super().__iter__())
+
+            self._compiled = (tuple(paths), RowIterable)
+        return self._compiled
+
+    def rows(self, queryset):
+        """``queryset`` narrowed to this shape's columns, yielding dicts.
+
+        The result is still a lazy QuerySet: filter, order_by, slice, get and
+        iterator() all work as usual.
+        """
+        paths, iterable_class = self.compile()
+        queryset = queryset.values_list(*paths)
+        queryset._iterable_class = iterable_class
+        return queryset
+
+
+# --------- Converters, prepared once ---------
+
+_PET_LABELS = dict(PET_CHOICES)
+
+
+def pet_label(pet):
+    return _PET_LABELS.get(pet, pet)
+
+
+def _media_url_converter():
+    storage = storages["default"]
+    if isinstance(storage, FileSystemStorage):
+        # Same result as storage.url(name), without the per-call storage machinery
+        prefix = storage.base_url
+
+        def media_url(name):
+            return prefix + filepath_to_uri(name) if name else None
+    else:
+        def media_url(name):
+            return storage.url(name) if name else None
+    return media_url
+
+
+media_url = _media_url_converter()
+
+
+def image_urls(image, variants):
+    """URL of each image variant plus the original; the original stands in for
+    variants not rendered yet."""
+    if not image:
+        return None
+    original = media_url(image)
+    if not variants or variants.get("source") != image:
+        variants = {}
+    urls = {name: media_url(variants[name]) if name in variants else original for name in IMAGE_VARIANTS}
+    urls["original"] = original
+    return urls
+
+
+def as_float(value):
+    return float(value)
+
+
+# --------- Shapes ---------
+
+PROFILE_ROW = RowSerializer({
+    "name": "name",
+    "role": "role",
+    "phone_number": "phone_number",
+    "verified": "verified",
+})
+
+USER_ROW = RowSerializer({
+    "id": "id",
+    "username": "username",
+    "email": "email",
+    "profile": Nested("profile", PROFILE_ROW, missing="omit"),
+    "rating": Computed([f"rating_summary__{column}" for column in RATING_COLUMNS], rating_from_values),
+})
+
+USER_BRIEF_ROW = RowSerializer({
+    "id": "id",
+    "username": "username",
+    "email": "email",
+})
+
+ADDRESS_ROW = RowSerializer({
+    "id": "id",
+    "address": "address",
+    "city": "city",
+    "state": "state",
+    "zipcode": "zipcode",
+    "latitude": "latitude",
+    "longitude": "longitude",
+    "country": "country",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+})
+
+SERVICE_ROW = RowSerializer({
+    "id": "id",
+    "name": "name",
+    "pet": "pet",
+    "pet_label": Col("pet", pet_label),
+    "description": "description",
+    "image_url": Col("image", media_url),
+    "image_urls": Computed(["image", "image_variants"], image_urls),
+})
+
+SITTER_SERVICE_ROW = RowSerializer({
+    "id": "id",
+    "rate": Col("rate", as_float),
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "user": Nested("user", USER_ROW),
+    "service": Nested("service", SERVICE_ROW),
+    "address": Nested("address", ADDRESS_ROW),
+})
+
+AD_ROW = RowSerializer({
+    "id": "id",
+    "punch_line": "punch_line",
+    "url": "url",
+    "image_url": Col("image", media_url),
+    "image_urls": Computed(["image", "image_variants"], image_urls),
+    "created_at": "created_at",
+})
+
+PET_ROW = RowSerializer({
+    "id": "id",
+    "name": "name",
+    "pet": "pet",
+    "pet_label": Col("pet", pet_label),
+    "breed": "breed",
+    "age": "age",
+    "bio": "bio",
+    "important_info": "important_info",
+    "image_url": Col("image", media_url),
+    "image_urls": Computed(["image", "image_variants"], image_urls),
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "user": Nested("user", USER_BRIEF_ROW),
+})
+
+ORDER_ROW = RowSerializer({
+    "id": "id",
+    "quantity": "quantity",
+    "final_rate": Col("final_rate", as_float),
+    "start_datetime": "start_datetime",
+    # Null for orders placed before bookings existed
+    "end_datetime": "booking__ends_at",
+    "status": "status",
+    "msg_for_user": "msg_for_user",
+    "msg_for_petsitter": "msg_for_petsitter",
+    "rating_for_petsitter": "rating_for_petsitter",
+    "rating_review_for_petsitter": "rating_review_for_petsitter",
+    "rating_for_user": "rating_for_user",
+    "rating_review_for_user": "rating_review_for_user",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "normal_user": Nested("normal_user", USER_ROW),
+    "petsitter_user": Nested("petsitter_user", USER_ROW),
+    "service_model": Nested("service_model", SITTER_SERVICE_ROW),
+    "pet": Nested("pet", PET_ROW, missing="null"),
+    "user_address": Nested("user_address", ADDRESS_ROW, missing="null"),
+})
+
+REVIEW_ROW = RowSerializer({
+    "id": "id",
+    "status": "status",
+    "rating_for_petsitter": "rating_for_petsitter",
+    "rating_review_for_petsitter": "rating_review_for_petsitter",
+    "rating_for_user": "rating_for_user",
+    "rating_review_for_user": "rating_review_for_user",
+    "updated_at": "updated_at",
+    "normal_user": Nested("normal_user", USER_BRIEF_ROW),
+    "petsitter_user": Nested("petsitter_user", USER_BRIEF_ROW),
+})
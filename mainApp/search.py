@@ -0,0 +1,93 @@
+"""Full-text search over services, pets and order reviews.
+
+On SQLite each searchable table has an external-content FTS5 index
+(migration 0019): ``service_fts`` over Service.name/description, ``pet_fts``
+over Pet.name/breed/bio and ``order_review_fts`` over the two review texts of
+orders that have one. Triggers on the base tables keep them in step with
+every INSERT, DELETE and UPDATE of an indexed column, whichever code path
+writes. A search is a MATCH on the index ranked by its configured bm25
+weights (names count most), so no base-table rows are read until the top
+ids are known.
+
+User input is never passed through as FTS syntax: each word becomes a quoted
+prefix term (``gold ret`` -> ``"gold"* "ret"*``), all of which must match.
+Other databases have no index and fall back to ``icontains`` on the same
+columns.
+
+SQLite drops a table's triggers with the table, and Django rebuilds a table
+for most column changes, so a migration that alters one of these models must
+recreate its triggers.
+"""
+import re
+from collections import namedtuple
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from mainApp.models import Order, Pet, Service
+
+MAX_TERMS = 8
+
+SearchIndex = namedtuple("SearchIndex", ["table", "model", "columns"])
+
+SEARCH_INDEXES = {
+    "services": SearchIndex("service_fts", Service, ("name", "description")),
+    "pets": SearchIndex("pet_fts", Pet, ("name", "breed", "bio")),
+    "reviews": SearchIndex("order_review_fts", Order, ("rating_review_for_petsitter", "rating_review_for_user")),
+}
+
+_WORD = re.compile(r"\w+")
+
+
+def search_terms(text):
+    return _WORD.findall(text.lower())[:MAX_TERMS]
+
+
+def match_expression(terms):
+    """FTS5 query matching rows that contain a word starting with each term."""
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _uses_fts(alias):
+    return connections[alias].vendor == "sqlite"
+
+
+def _contains_all(index, terms):
+    return reduce(and_, (reduce(or_, (Q(**{f"{column}__icontains": term}) for column in index.columns)) for term in terms))
+
+
+def matching(kind, terms, alias="default"):
+    """Filter of the ``kind`` rows matching every term, for use on a queryset
+    of its model read from ``alias``: an ``id IN (...)`` over the index."""
+    index = SEARCH_INDEXES[kind]
+    if not _uses_fts(alias):
+        return _contains_all(index, terms)
+    return Q(id__in=RawSQL(
+        f"SELECT rowid FROM {index.table} WHERE {index.table} MATCH %s", (match_expression(terms),),
+    ))
+
+
+def starting_with(field, prefix):
+    """Filter of rows whose ``field`` starts with ``prefix``, as a range a
+    B-tree index on ``field`` can serve (SQLite scans for LIKE 'prefix%')."""
+    return Q(**{f"{field}__gte": prefix, f"{field}__lt": prefix + "\U0010ffff"})
+
+
+def ranked(kind, terms, limit):
+    """[(id, score), ...] of the best ``limit`` matches, best first. Scores
+    are bm25 relevance (higher is better), or None without an index."""
+    index = SEARCH_INDEXES[kind]
+    alias = router.db_for_read(index.model)
+    if not _uses_fts(alias):
+        ids = index.model.objects.using(alias).filter(_contains_all(index, terms)).order_by("-id").values_list("id", flat=True)
+        return [(pk, None) for pk in ids[:limit]]
+    with connections[alias].cursor() as cursor:
+        # ORDER BY rank with a LIMIT lets FTS5 keep only the top rows
+        cursor.execute(
+            f"SELECT rowid, rank FROM {index.table} WHERE {index.table} MATCH %s ORDER BY rank LIMIT %s",
+            (match_expression(terms), limit),
+        )
+        return [(pk, -rank) for pk, rank in cursor.fetchall()]
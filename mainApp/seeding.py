@@ -0,0 +1,237 @@
+"""Synthetic, reproducible datasets for load tests and benchmarks.
+
+Everything is written with ``bulk_create`` in fixed-size batches, so model
+signals do not run: profiles, tokens, address grid cells and rating
+summaries are filled in explicitly, and the catalog cache version is bumped
+once the seed commits. The same ``seed`` on the same starting database always produces
+the same rows.
+"""
+import itertools
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from mainApp.bookings import BOOKED_STATUSES, default_end
+from mainApp.caching import bump_catalog_version
+from mainApp.models import PET_CHOICES, Booking, Order, Pet, Service, SitterAvailability, SitterService
+from mainApp.ratings import rebuild_rating_summaries
+from userApp.geo import grid_cell
+from userApp.models import Address, UserProfile
+
+# Every seeded user can log in with this password
+SEED_PASSWORD = "seed-password"
+
+# (city, state, latitude, longitude); addresses are scattered around these
+CITIES = (
+    ("Mumbai", "Maharashtra", 19.076, 72.8777),
+    ("Delhi", "Delhi", 28.7041, 77.1025),
+    ("Bengaluru", "Karnataka", 12.9716, 77.5946),
+    ("Hyderabad", "Telangana", 17.385, 78.4867),
+    ("Chennai", "Tamil Nadu", 13.0827, 80.2707),
+    ("Kolkata", "West Bengal", 22.5726, 88.3639),
+    ("Pune", "Maharashtra", 18.5204, 73.8567),
+    ("Jaipur", "Rajasthan", 26.9124, 75.7873),
+)
+SERVICE_NAMES = ("Walking", "Day care", "Overnight sitting", "Grooming", "Feeding visit", "Training")
+PET_NAMES = ("Bruno", "Coco", "Simba", "Milo", "Luna", "Tiger", "Bella", "Rocky", "Oreo", "Kiwi", "Max", "Daisy")
+REVIEWS = ("Great experience", "Very caring", "On time and friendly", "Would book again", "Could be better")
+ORDER_STATUSES = (("completed", 50), ("approved", 20), ("pending", 20), ("cancelled", 10))
+
+SITTER_SHARE = 0.2
+REVIEWED_SHARE = 0.7
+# Pending and approved orders start within this many days from now; the rest are in the past year
+UPCOMING_DAYS = 30
+# Every sitter service is available 08:00-20:00 UTC on each of the next AVAILABILITY_DAYS days
+AVAILABILITY_DAYS = 7
+AVAILABLE_HOURS = (8, 20)
+DEFAULT_BATCH_SIZE = 5000
+
+
+def _insert(model, objs, batch_size):
+    """bulk_create an iterable in batches without materializing it. Returns the saved objects' pks."""
+    objs = iter(objs)
+    pks = []
+    while batch := list(itertools.islice(objs, batch_size)):
+        pks.extend(obj.pk for obj in model.objects.bulk_create(batch))
+    return pks
+
+
+def _ensure_services(rng):
+    """Catalog services per pet type; reuses existing ones. Returns [(id, pet)]."""
+    existing = list(Service.objects.values_list("id", "pet"))
+    if existing:
+        return existing
+    services = [
+        Service(name=f"{pet_label} {name}", pet=pet, description=f"{name} for your {pet_label.lower()}")
+        for pet, pet_label in PET_CHOICES
+        for name in rng.sample(SERVICE_NAMES, 3)
+    ]
+    Service.objects.bulk_create(services)
+    return [(s.pk, s.pet) for s in services]
+
+
+@transaction.atomic
+def seed(users=10_000, orders=100_000, seed=0, batch_size=DEFAULT_BATCH_SIZE, log=None):
+    """Generate ``users`` users (profiles, tokens, addresses, pets or sitter
+    services by role) and ``orders`` orders between them, with bookings for
+    the upcoming ones and a week of availability per sitter service. Returns
+    row counts."""
+    log = log or (lambda message: None)
+    now = datetime.now(timezone.utc)
+    # Usernames (and token keys, via the RNG) continue after existing users,
+    # so seeding an already seeded database adds rows instead of colliding
+    offset = User.objects.count()
+    rng = random.Random(f"{seed}-{offset}")
+    password = make_password(SEED_PASSWORD)
+    sitter_count = max(1, int(users * SITTER_SHARE))
+
+    names = [f"seed{offset + i}" for i in range(users)]
+    user_ids = _insert(
+        User,
+        (User(username=name, email=f"{name}@example.com", password=password, date_joined=now) for name in names),
+        batch_size,
+    )
+    sitter_ids, customer_ids = user_ids[:sitter_count], user_ids[sitter_count:]
+    roles = ["petsitter"] * sitter_count + ["normalUser"] * (users - sitter_count)
+    _insert(
+        UserProfile,
+        (
+            UserProfile(
+                user_id=user_id, name=name.title(), email=f"{name}@example.com", username=name, role=role,
+                phone_number=f"9{rng.randrange(10**9):09d}", verified=True,
+            )
+            for user_id, name, role in zip(user_ids, names, roles)
+        ),
+        batch_size,
+    )
+    _insert(Token, (Token(key=f"{rng.getrandbits(160):040x}", user_id=user_id) for user_id in user_ids), batch_size)
+    log(f"users: {users} ({sitter_count} sitters)")
+
+    def address(user_id):
+        city, state, lat, lng = rng.choice(CITIES)
+        lat, lng = round(rng.gauss(lat, 0.08), 6), round(rng.gauss(lng, 0.08), 6)
+        return Address(
+            user_id=user_id, address=f"{rng.randrange(1, 500)} Seed Street", city=city, state=state,
+            zipcode=f"{rng.randrange(100000, 999999)}", latitude=lat, longitude=lng, country="India",
+            grid_cell=grid_cell(lat, lng),
+        )
+
+    address_ids = _insert(Address, (address(user_id) for user_id in user_ids), batch_size)
+    address_of = dict(zip(user_ids, address_ids))
+    log(f"addresses: {len(address_ids)}")
+
+    services = _ensure_services(rng)
+    rows = [
+        (sitter_id, rng.choice(services)[0], Decimal(rng.randrange(200, 2000)))
+        for sitter_id in sitter_ids
+        for _ in range(rng.randint(1, 3))
+    ]
+    ss_ids = _insert(
+        SitterService,
+        (SitterService(user_id=u, service_id=s, address_id=address_of[u], rate=rate) for u, s, rate in rows),
+        batch_size,
+    )
+    sitter_services = [(ss_id, sitter_id, rate) for ss_id, (sitter_id, _, rate) in zip(ss_ids, rows)]
+    log(f"sitter services: {len(sitter_services)}")
+
+    pet_owners = [customer_id for customer_id in customer_ids for _ in range(rng.randint(1, 3))]
+    pet_ids = _insert(
+        Pet,
+        (
+            Pet(
+                user_id=owner, name=rng.choice(PET_NAMES), pet=rng.choice(PET_CHOICES)[0],
+                breed="", age=rng.randint(1, 15),
+            )
+            for owner in pet_owners
+        ),
+        batch_size,
+    )
+    pets_of = {}
+    for owner, pet_id in zip(pet_owners, pet_ids):
+        pets_of.setdefault(owner, []).append(pet_id)
+    log(f"pets: {len(pet_ids)}")
+
+    statuses, weights = zip(*ORDER_STATUSES)
+    # (index of the order, sitter, sitter service, start, end) of each booked order
+    bookings = []
+    busy = {}
+    order_index = itertools.count()
+
+    def order():
+        index = next(order_index)
+        customer_id = rng.choice(customer_ids)
+        ss_id, sitter_id, rate = rng.choice(sitter_services)
+        quantity = rng.randint(1, 5)
+        status = rng.choices(statuses, weights)[0]
+        if status in BOOKED_STATUSES:
+            start = now + timedelta(minutes=rng.randrange(UPCOMING_DAYS * 24 * 60))
+            end = default_end(start, quantity)
+            if any(s < end and start < e for s, e in busy.get(sitter_id, ())):
+                # The sitter is already booked then, as create_order would have answered
+                status = "cancelled"
+            else:
+                busy.setdefault(sitter_id, []).append((start, end))
+                bookings.append((index, sitter_id, ss_id, start, end))
+        else:
+            start = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+        reviewed = status == "completed" and rng.random() < REVIEWED_SHARE
+        return Order(
+            normal_user_id=customer_id, petsitter_user_id=sitter_id, service_model_id=ss_id,
+            pet_id=rng.choice(pets_of[customer_id]), user_address_id=address_of[customer_id],
+            quantity=quantity, final_rate=rate * quantity, status=status,
+            start_datetime=start,
+            rating_for_petsitter=rng.randint(1, 5) if reviewed else None,
+            rating_review_for_petsitter=rng.choice(REVIEWS) if reviewed else "",
+            rating_for_user=rng.randint(1, 5) if reviewed else None,
+            rating_review_for_user=rng.choice(REVIEWS) if reviewed else "",
+        )
+
+    order_ids = []
+    if customer_ids and sitter_services:
+        order_ids = _insert(Order, (order() for _ in range(orders)), batch_size)
+    log(f"orders: {len(order_ids)}")
+    _insert(
+        Booking,
+        (
+            Booking(order_id=order_ids[index], sitter_id=sitter_id, sitter_service_id=ss_id, starts_at=start, ends_at=end)
+            for index, sitter_id, ss_id, start, end in bookings
+        ),
+        batch_size,
+    )
+    log(f"bookings: {len(bookings)}")
+
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    opens, closes = AVAILABLE_HOURS
+    availability = _insert(
+        SitterAvailability,
+        (
+            SitterAvailability(
+                sitter_service_id=ss_id,
+                starts_at=today + timedelta(days=day, hours=opens), ends_at=today + timedelta(days=day, hours=closes),
+            )
+            for ss_id, _, _ in sitter_services
+            for day in range(AVAILABILITY_DAYS)
+        ),
+        batch_size,
+    )
+    log(f"availability windows: {len(availability)}")
+
+    summaries = rebuild_rating_summaries()
+    transaction.on_commit(bump_catalog_version)
+    return {
+        "users": users,
+        "sitters": sitter_count,
+        "addresses": len(address_ids),
+        "services": len(services),
+        "sitter_services": len(sitter_services),
+        "pets": len(pet_ids),
+        "orders": len(order_ids),
+        "bookings": len(bookings),
+        "availability": len(availability),
+        "rating_summaries": summaries,
+    }
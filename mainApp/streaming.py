@@ -0,0 +1,35 @@
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+# Rows fetched per database round-trip and rendered per yielded body chunk
+STREAM_CHUNK_SIZE = 2000
+
+
+def wants_stream(request):
+    """True for ``?stream=1`` requests negotiated to JSON (the browsable API never streams)."""
+    if request.query_params.get("stream") not in ("1", "true"):
+        return False
+    renderer = getattr(request, "accepted_renderer", None)
+    return renderer is not None and renderer.format == "json"
+
+
+def _json_array_chunks(rows, chunk_size):
+    # Each element goes through the same renderer DRF would use for the whole
+    # list, so "[" + ",".join(elements) + "]" is byte-identical to rendering
+    # the materialized list, while only ``chunk_size`` rows are held at once.
+    render = JSONRenderer().render
+    yield b"["
+    batch, first = [], True
+    for row in rows:
+        batch.append(render(row))
+        if len(batch) == chunk_size:
+            yield (b"" if first else b",") + b",".join(batch)
+            batch, first = [], False
+    if batch:
+        yield (b"" if first else b",") + b",".join(batch)
+    yield b"]"
+
+
+def streaming_json_response(rows, chunk_size=STREAM_CHUNK_SIZE):
+    """Stream an iterable of dicts as a JSON array."""
+    return StreamingHttpResponse(_json_array_chunks(rows, chunk_size), content_type="application/json")
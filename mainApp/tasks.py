@@ -0,0 +1,23 @@
+"""Background jobs run by ``manage.py runworker``, see mainApp.queue."""
+from django.apps import apps
+
+from mainApp.images import render_variants
+from mainApp.queue import job
+from mainApp.ratings import rebuild_rating_summary
+
+
+@job("mainApp.render_image_variants")
+def render_image_variants(model, pk, source):
+    """Render the variants of ``model`` row ``pk``'s image, if it is still ``source``."""
+    obj = apps.get_model(model).objects.filter(pk=pk).first()
+    if obj is None or obj.image.name != source:
+        # Deleted, or a newer upload has queued its own job
+        return
+    obj.image_variants = {"source": source, **render_variants(obj.image)}
+    obj.save(update_fields=["image_variants", "updated_at"])
+
+
+@job("mainApp.refresh_rating_summary")
+def refresh_rating_summary(user_id):
+    """Reconcile user_id's RatingSummary with their orders; reviews keep it current themselves."""
+    rebuild_rating_summary(user_id)
@@ -1,3 +1,1389 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import runpy
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from datetime import datetime, timezone
+from io import BytesIO, StringIO
 
-# Create your tests here.
+import numpy as np
+from django.contrib.admin.sites import site
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, router
+from django.db.backends.utils import CursorWrapper
+from django.db.models import Q
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from mainApp import transitions
+from mainApp.bookings import BOOKED_STATUSES, free_windows, subtract
+from mainApp.caching import cache_stats, catalog_version
+from mainApp.conversations import messages_after
+from mainApp.discovery import SitterIndex
+from mainApp.events import InProcessBroker, order_event_stream, user_topic
+from mainApp.idempotency import idempotent
+from mainApp.models import Booking, IdempotencyKey, Job, OrderMessage, Service, SitterAvailability, SitterService, Pet, Order, RatingSummary, Tombstone
+from mainApp.pagination import encode_cursor, keyset_filter
+from mainApp.queue import claim, enqueue, job, run, work
+from mainApp.rows import ORDER_ROW, PET_ROW, SERVICE_ROW
+from mainApp.seeding import seed
+from mainApp.streaming import streaming_json_response
+from mainApp.sync import SYNC_KEYSET, _user_collections
+from mainApp.views import ORDER_KEYSET, _order_rows
+from petproject.metrics import registry
+from petproject.routers import ReplicaStickinessMiddleware, read_from_replica
+from petproject.settings import SQLITE_PRODUCTION_PRAGMAS
+from petproject.sqlite_backend.base import DatabaseWrapper as ProductionSQLiteWrapper
+from userApp.geo import grid_cell
+from userApp.models import Address
+
+
+def make_user(username, role="normalUser"):
+    user = User.objects.create(username=username, email=f"{username}@example.com")
+    user.profile.role = role
+    user.profile.save()
+    return user
+
+
+class OrderFixtureMixin:
+    """Creates a customer, a petsitter and everything needed to place orders."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = make_user("customer")
+        self.sitter = make_user("sitter", role="petsitter")
+        self.customer_address = Address.objects.create(user=self.customer, city="London", latitude=51.5, longitude=-0.12)
+        self.sitter_address = Address.objects.create(user=self.sitter, city="London", latitude=51.51, longitude=-0.13)
+        self.service = Service.objects.create(name="Walking", pet="dog")
+        self.sitter_service = SitterService.objects.create(
+            user=self.sitter, service=self.service, address=self.sitter_address, rate=100
+        )
+        self.pet = Pet.objects.create(user=self.customer, name="Buddy", pet="dog")
+
+    def make_orders(self, count):
+        Order.objects.bulk_create(
+            Order(
+                normal_user=self.customer,
+                petsitter_user=self.sitter,
+                service_model=self.sitter_service,
+                pet=self.pet,
+                user_address=self.customer_address,
+                quantity=1,
+                final_rate=100,
+                start_datetime=datetime(2025, 9, 1, 10, tzinfo=timezone.utc),
+            )
+            for _ in range(count)
+        )
+
+
+class OrderListQueryCountTests(OrderFixtureMixin, TestCase):
+    def _count_list_queries(self, user):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"/api/main/users/{user.id}/orders/")
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), len(response.data)
+
+    def test_query_count_is_constant_as_orders_grow(self):
+        self.make_orders(10)
+        small_queries, small_rows = self._count_list_queries(self.customer)
+        self.assertEqual(small_rows, 10)
+
+        self.make_orders(10_000 - 10)
+        large_queries, large_rows = self._count_list_queries(self.customer)
+        self.assertEqual(large_rows, 10_000)
+        self.assertEqual(small_queries, large_queries)
+
+        sitter_queries, _ = self._count_list_queries(self.sitter)
+        self.assertEqual(sitter_queries, small_queries)
+
+    def test_order_graph_is_fully_expanded(self):
+        self.make_orders(1)
+        response = self.client.get(f"/api/main/users/{self.customer.id}/orders/")
+        order = response.data[0]
+        self.assertEqual(order["normal_user"]["profile"]["role"], "normalUser")
+        self.assertEqual(order["petsitter_user"]["profile"]["role"], "petsitter")
+        self.assertEqual(order["service_model"]["user"]["profile"]["role"], "petsitter")
+        self.assertEqual(order["pet"]["user"]["id"], self.customer.id)
+        self.assertEqual(order["user_address"]["id"], self.customer_address.id)
+
+
+class KeysetPaginationTests(OrderFixtureMixin, TestCase):
+    def _walk(self, url, limit):
+        ids, cursor = [], None
+        while True:
+            params = {"limit": limit}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.data["results"])
+            cursor = response.data["next"]
+            if cursor is None:
+                return ids
+
+    def test_orders_pages_cover_every_row_once_in_order(self):
+        self.make_orders(25)
+        ids = self._walk(f"/api/main/users/{self.customer.id}/orders/", limit=7)
+        expected = list(Order.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_name_keyed_pages(self):
+        Pet.objects.bulk_create(Pet(user=self.customer, name=name, pet="cat") for name in ["Ace", "Ace", "Zed", "Max"])
+        ids = self._walk(f"/api/main/users/{self.customer.id}/pets/", limit=2)
+        expected = list(Pet.objects.filter(user=self.customer).order_by("name", "id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_plain_list_without_pagination_params(self):
+        self.make_orders(3)
+        response = self.client.get(f"/api/main/users/{self.customer.id}/orders/")
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 3)
+
+    def test_invalid_cursor_and_limit(self):
+        url = f"/api/main/users/{self.customer.id}/orders/"
+        self.assertEqual(self.client.get(url, {"cursor": "not-a-cursor"}).status_code, 400)
+        for payload in ([[1], 5], ["2025-01-01T00:00:00Z"], [None, 5], [True, 5], [{"a": 1}, 5], [12, 5], ["2025-01-01", "x"]):
+            cursor = encode_cursor(payload)
+            self.assertEqual(self.client.get(url, {"cursor": cursor}).status_code, 400, payload)
+        self.assertEqual(self.client.get(f"/api/main/users/{self.customer.id}/pets/", {"cursor": encode_cursor([[1], 5])}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"limit": "0"}).status_code, 400)
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+class HotQueryPlanTests(TestCase):
+    """Hot list queries must be index range scans with no sort step."""
+
+    def assertIndexedPlan(self, queryset):
+        plan = queryset.explain()
+        self.assertIsNone(re.search(r"\bSCAN\b", plan), f"full scan in plan:\n{plan}")
+        self.assertNotIn("TEMP B-TREE", plan, f"sort step in plan:\n{plan}")
+
+    def test_order_listing_sides(self):
+        after = keyset_filter(ORDER_KEYSET, (datetime(2025, 1, 1, tzinfo=timezone.utc), 10))
+        customer_side = _order_rows().filter(normal_user_id=1)
+        sitter_side = _order_rows().filter(petsitter_user_id=1).exclude(normal_user_id=1)
+        for side in (customer_side, sitter_side):
+            orders = side.order_by(*ORDER_KEYSET)
+            self.assertIndexedPlan(orders[:51])
+            self.assertIndexedPlan(orders.filter(after)[:51])
+
+    def test_or_predicate_would_sort(self):
+        orders = Order.objects.filter(Q(normal_user_id=1) | Q(petsitter_user_id=1)).order_by(*ORDER_KEYSET)
+        self.assertIn("TEMP B-TREE", orders.explain())
+
+    def test_per_user_and_catalog_lists(self):
+        self.assertIndexedPlan(Pet.objects.filter(user_id=1).select_related("user").order_by("name", "id"))
+        self.assertIndexedPlan(Address.objects.filter(user_id=1).order_by("-created_at", "-id"))
+        self.assertIndexedPlan(Service.objects.filter(pet="dog").order_by("name", "id"))
+        self.assertIndexedPlan(
+            SitterService.objects.filter(user_id=1)
+            .select_related("user__profile", "service", "address")
+            .order_by("-created_at", "-id")
+        )
+
+
+    def test_delta_sync_scans(self):
+        since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for name, querysets in _user_collections(1):
+            for rows in querysets:
+                self.assertIndexedPlan(rows.filter(updated_at__gt=since).order_by(*SYNC_KEYSET))
+        self.assertIndexedPlan(Tombstone.objects.filter(Q(user_id=1) | Q(user_id=None), deleted_at__gt=since))
+
+    def test_discovery_refresh_scans(self):
+        since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for model in (SitterService, Address, Service, RatingSummary, Order):
+            self.assertIndexedPlan(model.objects.filter(updated_at__gt=since).values("id"))
+
+    def test_calendar_scans(self):
+        start, end = datetime(2025, 1, 1, tzinfo=timezone.utc), datetime(2025, 1, 8, tzinfo=timezone.utc)
+        self.assertIndexedPlan(Booking.objects.filter(sitter_id=1, ends_at__gt=start, starts_at__lt=end, order__status__in=BOOKED_STATUSES))
+        self.assertIndexedPlan(SitterAvailability.objects.filter(sitter_service_id__in=[1, 2], ends_at__gt=start, starts_at__lt=end))
+
+    def test_conversation_reads(self):
+        messages = OrderMessage.objects.filter(order_id=1, id__gt=10).order_by("id").values("id")[:51]
+        self.assertIndexedPlan(messages)
+
+
+class SitterSearchTests(OrderFixtureMixin, TestCase):
+    def add_sitter_service(self, username, lat, lng, pet="dog"):
+        sitter = make_user(username, role="petsitter")
+        address = Address.objects.create(user=sitter, latitude=lat, longitude=lng)
+        service = Service.objects.create(name=f"{pet} care", pet=pet)
+        return SitterService.objects.create(user=sitter, service=service, address=address, rate=50)
+
+    def test_results_sorted_by_distance_within_radius(self):
+        near = self.add_sitter_service("near", 51.505, -0.125)
+        further = self.add_sitter_service("further", 51.55, -0.2)
+        self.add_sitter_service("far", 52.5, -1.9)  # Birmingham, well outside 10 km
+        response = self.client.get("/api/main/sitter-services/search/", {"lat": 51.5, "lng": -0.12, "radius_km": 10})
+        self.assertEqual(response.status_code, 200)
+        ids = [row["id"] for row in response.data]
+        self.assertEqual(ids, [near.id, self.sitter_service.id, further.id])
+        distances = [row["distance_km"] for row in response.data]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_pet_filter_and_validation(self):
+        cat = self.add_sitter_service("catsitter", 51.5, -0.12, pet="cat")
+        response = self.client.get("/api/main/sitter-services/search/", {"lat": 51.5, "lng": -0.12, "pet": "cat"})
+        self.assertEqual([row["id"] for row in response.data], [cat.id])
+        self.assertEqual(self.client.get("/api/main/sitter-services/search/", {"lat": 51.5}).status_code, 400)
+        self.assertEqual(
+            self.client.get("/api/main/sitter-services/search/", {"lat": 51.5, "lng": 0, "radius_km": 500}).status_code, 400
+        )
+        response = self.client.get("/api/main/sitter-services/search/", {"lat": 51.5, "lng": -0.12, "service_id": "abc"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/main/sitter-services/search/", {"lat": 51.5, "lng": -0.12, "service_id": cat.service_id})
+        self.assertEqual([row["id"] for row in response.data], [cat.id])
+
+
+class RatingSummaryTests(OrderFixtureMixin, TestCase):
+    def review(self, order, user, rating):
+        return self.client.patch(
+            f"/api/main/orders/{order.id}/review/",
+            {"user_id": user.id, "review": "ok", "rating": rating},
+            format="json",
+        )
+
+    def test_reviews_update_summary_in_their_transaction(self):
+        self.make_orders(2)
+        first, second = Order.objects.order_by("id")
+        self.review(first, self.customer, 5)
+        response = self.review(second, self.customer, 3)
+        self.assertEqual(response.data["rating_for_petsitter"], 3)
+        self.assertEqual(response.data["petsitter_user"]["rating"]["count"], 2)
+        self.assertFalse(Job.objects.exists())
+        response = self.client.get(f"/api/main/users/{self.sitter.id}/sitter-services/")
+        self.assertEqual(response.data[0]["user"]["rating"]["count"], 2)
+        self.assertEqual(response.data[0]["user"]["rating"]["average"], 4.0)
+
+        # Re-rating an order replaces its previous rating rather than adding one
+        self.review(second, self.customer, 1)
+        summary = RatingSummary.objects.get(user=self.sitter)
+        self.assertEqual((summary.count, summary.total), (2, 6))
+        self.assertEqual(summary.histogram, {"1": 1, "2": 0, "3": 0, "4": 0, "5": 1})
+
+        self.review(first, self.sitter, 4)
+        self.assertEqual(RatingSummary.objects.get(user=self.customer).count, 1)
+
+    def test_review_from_a_stale_rating_is_rejected(self):
+        self.make_orders(1)
+        order = Order.objects.get()
+        self.review(order, self.customer, 5)
+        now = transitions.timezone.now
+
+        def rerated_meanwhile():
+            # Another request re-rates the order between this one's read and its UPDATE
+            Order.objects.filter(id=order.id).update(rating_for_petsitter=2)
+            return now()
+
+        with mock.patch("mainApp.transitions.timezone.now", rerated_meanwhile):
+            with self.assertRaises(transitions.TransitionError) as raised:
+                transitions.review(order.id, self.customer.id, "ok", 1)
+        self.assertEqual(raised.exception.status_code, 409)
+        summary = RatingSummary.objects.get(user=self.sitter)
+        self.assertEqual((summary.count, summary.total), (1, 5))
+
+    def test_rebuild_matches_per_user_summaries(self):
+        self.make_orders(3)
+        for order, stars in zip(Order.objects.order_by("id"), (2, 5, 5)):
+            self.review(order, self.customer, stars)
+        before = RatingSummary.objects.get(user=self.sitter)
+        call_command("rebuild_rating_summaries", stdout=StringIO())
+        after = RatingSummary.objects.get(user=self.sitter)
+        self.assertEqual((before.count, before.total, before.histogram), (after.count, after.total, after.histogram))
+
+    def test_sitter_listing_includes_rating_without_aggregates(self):
+        RatingSummary.objects.create(user=self.sitter, count=1, total=4, stars_4=1)
+        response = self.client.get(f"/api/main/users/{self.sitter.id}/sitter-services/")
+        self.assertEqual(response.data[0]["user"]["rating"]["average"], 4.0)
+
+
+class OrderTransitionTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_orders(1)
+        self.order = Order.objects.get()
+
+    def patch(self, action, data=None):
+        return self.client.patch(f"/api/main/orders/{self.order.id}/{action}/", data or {}, format="json")
+
+    def test_transition_is_one_update_plus_one_fetch(self):
+        with self.assertNumQueries(2):
+            response = self.patch("approve")
+        self.assertEqual(response.data["status"], "approved")
+
+    def test_invalid_transition_is_rejected(self):
+        response = self.patch("complete")
+        self.assertEqual(response.status_code, 409)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "pending")
+        self.assertEqual(self.patch("approve").status_code, 200)
+        self.assertEqual(self.patch("approve").status_code, 200)  # retries are harmless
+        self.assertEqual(self.patch("complete").data["status"], "completed")
+
+    def test_repeated_transition_writes_nothing(self):
+        self.patch("approve")
+        approved_at = Order.objects.get().updated_at
+        # The UPDATE matches no row, then one read of the status and the fetch
+        with self.assertNumQueries(3):
+            response = self.patch("approve")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "approved")
+        self.assertEqual(Order.objects.get().updated_at, approved_at)
+
+    def test_missing_order(self):
+        response = self.client.patch("/api/main/orders/999999/approve/", {}, format="json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_updates_touch_only_their_columns(self):
+        self.patch("message-to-petsitter", {"message": "hello sitter"})
+        self.patch("message-to-user", {"message": "hello owner"})
+        self.patch("approve")
+        self.order.refresh_from_db()
+        self.assertEqual(
+            (self.order.msg_for_petsitter, self.order.msg_for_user, self.order.status),
+            ("hello sitter", "hello owner", "approved"),
+        )
+
+    def test_review_from_outsider(self):
+        outsider = make_user("outsider")
+        response = self.patch("review", {"user_id": outsider.id, "review": "?"})
+        self.assertEqual(response.status_code, 400)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Service.objects.create(name="Grooming", pet="cat")
+
+    def test_hits_and_not_modified_skip_the_database(self):
+        first = self.client.get("/api/main/services/")
+        etag = first["ETag"]
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/main/services/")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], etag)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get("/api/main/services/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_save_and_delete_bump_the_version(self):
+        etag = self.client.get("/api/main/pets/cat/services/")["ETag"]
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            added = Service.objects.create(name="Boarding", pet="cat")
+            # Readers keep the old version until the write commits
+            self.assertEqual(catalog_version(), version)
+        response = self.client.get("/api/main/pets/cat/services/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            added.delete()
+        self.assertEqual(len(self.client.get("/api/main/pets/cat/services/").json()), 1)
+
+    @override_settings(CATALOG_CACHE={"TIMEOUT": 0})
+    def test_entries_expire(self):
+        before = cache_stats()
+        self.client.get("/api/main/ads/")
+        self.client.get("/api/main/ads/")
+        self.assertEqual(cache_stats()["miss"] - before["miss"], 2)
+
+    def test_counters_are_scrapeable(self):
+        before = cache_stats()
+        self.client.get("/api/main/ads/")
+        self.client.get("/api/main/ads/")
+        after = cache_stats()
+        self.assertEqual(after["miss"] - before["miss"], 1)
+        self.assertEqual(after["hit"] - before["hit"], 1)
+        metrics = self.client.get("/metrics").content.decode()
+        self.assertIn('catalog_cache_requests_total{result="hit"}', metrics)
+
+    def test_sync_replicas_in_another_process_retires_cached_pages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": f"{tmp}/cache"}}
+            with override_settings(CACHES=shared):
+                self.assertEqual([s["name"] for s in self.client.get("/api/main/services/").json()], ["Grooming"])
+                # A change the version bump never saw, like one only a replica has caught up with
+                Service.objects.update(name="Bathing")
+                self.assertEqual([s["name"] for s in self.client.get("/api/main/services/").json()], ["Grooming"])
+
+                sqlite3.connect(f"{tmp}/primary.sqlite3").close()
+                subprocess.run(
+                    [sys.executable, "manage.py", "sync_replicas"],
+                    cwd=settings.BASE_DIR, check=True, capture_output=True,
+                    env={
+                        **os.environ, "DJANGO_CACHE_DIR": f"{tmp}/cache", "DJANGO_DB_PATH": f"{tmp}/primary.sqlite3",
+                        "DJANGO_DB_REPLICAS": f"{tmp}/replica1.sqlite3",
+                    },
+                )
+                self.assertEqual([s["name"] for s in self.client.get("/api/main/services/").json()], ["Bathing"])
+
+    def test_replicas_refuse_a_per_process_cache(self):
+        settings_file = str(settings.BASE_DIR / "petproject" / "settings.py")
+        replicas = {"DJANGO_DB_REPLICAS": "replica1.sqlite3"}
+        with mock.patch.dict(os.environ, replicas), self.assertRaises(ImproperlyConfigured):
+            runpy.run_path(settings_file)
+        with mock.patch.dict(os.environ, {**replicas, "DJANGO_CACHE_DIR": "/tmp/cache"}):
+            self.assertEqual(runpy.run_path(settings_file)["DATABASE_REPLICAS"], ["replica1"])
+
+
+class RowSerializerTests(OrderFixtureMixin, TestCase):
+    def test_optional_relations(self):
+        Order.objects.create(
+            normal_user=self.customer,
+            petsitter_user=self.sitter,
+            service_model=self.sitter_service,
+            start_datetime=datetime(2025, 9, 1, 10, tzinfo=timezone.utc),
+        )
+        self.customer.profile.delete()
+        order = ORDER_ROW.rows(Order.objects.all()).get()
+        self.assertIsNone(order["pet"])
+        self.assertIsNone(order["user_address"])
+        self.assertNotIn("profile", order["normal_user"])
+        self.assertEqual(order["petsitter_user"]["profile"]["role"], "petsitter")
+        self.assertEqual(order["final_rate"], 100.0)
+        self.assertEqual(order["service_model"]["service"]["pet_label"], "Dog")
+
+    def test_media_urls(self):
+        Service.objects.filter(id=self.service.id).update(image="services/a b.png")
+        service = SERVICE_ROW.rows(Service.objects.all()).get()
+        self.assertEqual(service["image_url"], Service.objects.get().image.url)
+
+
+class StreamingResponseTests(OrderFixtureMixin, TestCase):
+    def assertStreamMatches(self, url):
+        plain = self.client.get(url)
+        streamed = self.client.get(url, {"stream": "1"})
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(b"".join(streamed.streaming_content), plain.content)
+        self.assertEqual(streamed["Content-Type"], plain["Content-Type"])
+
+    def test_list_endpoints_stream_identical_bytes(self):
+        self.make_orders(5)
+        Order.objects.filter(id=Order.objects.first().id).update(msg_for_user="caf\u00e9 \u2028 \U0001f436")
+        self.assertStreamMatches(f"/api/main/users/{self.customer.id}/orders/")
+        self.assertStreamMatches(f"/api/main/users/{self.sitter.id}/orders/")
+        self.assertStreamMatches(f"/api/main/users/{self.customer.id}/pets/")
+        self.assertStreamMatches(f"/api/main/users/{self.sitter.id}/sitter-services/")
+        self.assertStreamMatches(f"/api/user/users/{self.customer.id}/addresses/")
+        self.assertStreamMatches("/api/main/users/999999/orders/")
+
+    def test_chunk_boundaries(self):
+        self.make_orders(5)
+        rows = list(_order_rows())
+        for chunk_size in (1, 2, 5, 6):
+            response = streaming_json_response(iter(rows), chunk_size=chunk_size)
+            self.assertEqual(b"".join(response.streaming_content), JSONRenderer().render(rows))
+
+
+class RequestMetricsTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_records_requests_queries_and_bytes_per_url_name(self):
+        self.make_orders(3)
+        response = self.client.get(f"/api/main/users/{self.customer.id}/orders/")
+        stats = registry.snapshot()["order-list-by-user"]
+        self.assertEqual(stats["requests"], 1)
+        self.assertEqual(stats["queries"], 2)
+        self.assertEqual(stats["response_bytes"], len(response.content))
+
+        metrics = self.client.get("/metrics").content.decode()
+        self.assertIn('http_requests_total{view="order-list-by-user"} 1', metrics)
+        self.assertIn('http_request_duration_seconds_count{view="order-list-by-user"} 1', metrics)
+        self.assertIn('db_queries_total{view="order-list-by-user"} 2', metrics)
+        self.assertIn("catalog_cache_requests_total", metrics)
+
+    def test_slow_requests_log_sql_and_call_site(self):
+        self.make_orders(1)
+        order = Order.objects.get()
+        with self.settings(METRICS={"SLOW_REQUEST_MS": 0}):
+            with self.assertLogs("petproject.slow_requests", level="WARNING") as logs:
+                self.client.patch(f"/api/main/orders/{order.id}/approve/")
+        output = "\n".join(logs.output)
+        self.assertIn("UPDATE", output)
+        self.assertIn("mainApp/transitions.py", output)
+
+    def test_query_crossing_the_threshold_has_its_call_site(self):
+        self.make_orders(1)
+        order = Order.objects.get()
+        execute = CursorWrapper._execute
+
+        def slow_update(cursor, sql, *args):
+            if sql.startswith("UPDATE"):
+                time.sleep(0.1)
+            return execute(cursor, sql, *args)
+
+        with self.settings(METRICS={"SLOW_REQUEST_MS": 50}), mock.patch.object(CursorWrapper, "_execute", slow_update):
+            with self.assertLogs("petproject.slow_requests", level="WARNING") as logs:
+                self.client.patch(f"/api/main/orders/{order.id}/approve/")
+        update = next(line for line in logs.output[0].splitlines() if "UPDATE" in line)
+        self.assertIn("[mainApp/transitions.py:", update)
+
+    def test_fast_requests_skip_call_sites(self):
+        with mock.patch("petproject.metrics._call_site") as call_site:
+            self.client.get(f"/api/main/users/{self.customer.id}/orders/")
+        call_site.assert_not_called()
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def test_seed_generates_consistent_dataset(self):
+        counts = seed(users=50, orders=300, seed=7)
+        self.assertEqual(counts["orders"], 300)
+        self.assertEqual(Order.objects.count(), 300)
+        self.assertEqual(User.objects.filter(profile__role="petsitter").count(), counts["sitters"])
+        address = Address.objects.first()
+        self.assertEqual(address.grid_cell, grid_cell(address.latitude, address.longitude))
+        order = Order.objects.select_related("service_model", "pet").first()
+        self.assertEqual(order.final_rate, order.service_model.rate * order.quantity)
+        self.assertEqual(order.pet.user_id, order.normal_user_id)
+        reviewed = Order.objects.exclude(rating_for_petsitter=None).count()
+        self.assertEqual(sum(RatingSummary.objects.values_list("count", flat=True)), 2 * reviewed)
+        booked = Order.objects.filter(status__in=BOOKED_STATUSES)
+        self.assertEqual(Booking.objects.filter(order__in=booked).count(), booked.count())
+        self.assertEqual(Booking.objects.count(), counts["bookings"])
+        self.assertEqual(SitterAvailability.objects.count(), counts["availability"])
+        self.assertGreater(counts["availability"], 0)
+        # No seeded booking overlaps another of the same sitter
+        for booking in Booking.objects.all():
+            self.assertFalse(Booking.objects.filter(
+                sitter_id=booking.sitter_id, starts_at__lt=booking.ends_at, ends_at__gt=booking.starts_at,
+            ).exclude(id=booking.id).exists())
+
+    def test_bench_api_reports_json(self):
+        out = StringIO()
+        call_command(
+            "bench_api", "--seed-users", "30", "--seed-orders", "200", "--requests", "5", "--warmup", "1",
+            "--alloc-requests", "2", "--only", "service-list", "order-list-by-user", "order-approve",
+            stdout=out, stderr=StringIO(),
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report["endpoints"]), {"service-list", "order-list-by-user", "order-approve"})
+        orders = report["endpoints"]["order-list-by-user"]
+        self.assertEqual(orders["status_codes"], {"200": 5})
+        self.assertGreater(orders["queries_per_request"]["mean"], 0)
+        self.assertLessEqual(orders["latency_ms"]["p50"], orders["latency_ms"]["p99"])
+        # Seeded rows and approvals are rolled back
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_bench_api_covers_every_endpoint(self):
+        from mainApp.management.commands.bench_api import _scenarios
+        from mainApp.urls import urlpatterns as main_urls
+        from userApp.api.urls import urlpatterns as user_urls
+
+        covered = {re.split(r"[? ]", scenario.name)[0] for scenario in _scenarios()}
+        # The event stream never ends, so it is left out (see the command's help)
+        self.assertEqual({pattern.name for pattern in main_urls + user_urls} - covered, {"order-events"})
+
+    def test_bench_search_reports_json(self):
+        out = StringIO()
+        call_command("bench_search", "--addresses", "500", "--queries", "3", "--warmup", "0", stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+        self.assertEqual((report["addresses"], report["sitter_services"]), (500, 100))
+        self.assertEqual(set(report["cases"]), {"radius-10", "radius-10-service", "radius-50"})
+        self.assertEqual(Address.objects.count(), 0)
+
+
+class SQLiteProductionProfileTests(TestCase):
+    def test_pragmas_applied_and_atomic_takes_write_lock(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wrapper = ProductionSQLiteWrapper({
+                **connection.settings_dict,
+                "NAME": f"{tmp}/db.sqlite3",
+                "OPTIONS": {
+                    "transaction_mode": "IMMEDIATE",
+                    "init_command": ";".join(f"PRAGMA {k}={v}" for k, v in SQLITE_PRODUCTION_PRAGMAS.items()),
+                },
+            }, alias="production-profile-test")
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+                    cursor.execute("PRAGMA busy_timeout")
+                    self.assertEqual(cursor.fetchone()[0], 5000)
+                    cursor.execute("CREATE TABLE t (x integer)")
+
+                wrapper._start_transaction_under_autocommit()
+                other = sqlite3.connect(f"{tmp}/db.sqlite3", timeout=0)
+                # The write lock is already held before anything was written
+                with self.assertRaisesMessage(sqlite3.OperationalError, "locked"):
+                    other.execute("INSERT INTO t VALUES (1)")
+                other.close()
+                wrapper.connection.rollback()
+            finally:
+                wrapper.close()
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], REPLICA_READS={"STICKY_SECONDS": 60})
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.read_alias = read_from_replica(lambda request: HttpResponse(router.db_for_read(Order)))
+        self.write = ReplicaStickinessMiddleware(lambda request: HttpResponse(status=201))
+
+    def test_reads_use_replica_and_writes_use_primary(self):
+        self.assertEqual(self.read_alias(self.factory.get("/")).content, b"replica1")
+        self.assertEqual(self.read_alias(self.factory.post("/")).content, b"default")
+        self.assertEqual(router.db_for_read(Order), "default")
+        self.assertEqual(router.db_for_write(Order), "default")
+        self.assertFalse(router.allow_migrate("replica1", "mainApp"))
+
+    def test_client_reads_own_writes_from_primary(self):
+        self.write(self.factory.post("/", HTTP_AUTHORIZATION="Token writer"))
+        self.assertEqual(self.read_alias(self.factory.get("/", HTTP_AUTHORIZATION="Token writer")).content, b"default")
+        self.assertEqual(self.read_alias(self.factory.get("/", HTTP_AUTHORIZATION="Token other")).content, b"replica1")
+
+    def test_tokens_are_read_from_primary(self):
+        read_token = read_from_replica(lambda request: HttpResponse(router.db_for_read(Token)))
+        self.write(self.factory.post("/login/", REMOTE_ADDR="10.0.0.1"))
+        # The first request with the new token is not pinned, but its token lookup is
+        request = self.factory.get("/", HTTP_AUTHORIZATION="Token new", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(self.read_alias(request).content, b"replica1")
+        self.assertEqual(read_token(request).content, b"default")
+
+
+class IdempotentOrderCreationTests(OrderFixtureMixin, TestCase):
+    def order_body(self, **overrides):
+        return {
+            "normal_user_id": self.customer.id,
+            "petsitter_user_id": self.sitter.id,
+            "service_model_id": self.sitter_service.id,
+            "pet_id": self.pet.id,
+            "user_address_id": self.customer_address.id,
+            "start_datetime": "2025-09-01T10:00:00Z",
+            **overrides,
+        }
+
+    def post(self, key, **overrides):
+        return self.client.post("/api/main/orders/", self.order_body(**overrides), format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_stored_response_without_running_view(self):
+        first = self.post("retry-1")
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(1):
+            retry = self.post("retry-1")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+
+        self.assertEqual(self.post("retry-2", start_datetime="2025-09-02T10:00:00Z").status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_key_reused_with_different_body_is_rejected(self):
+        self.post("reused")
+        response = self.post("reused", quantity=3)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_duplicate_of_in_flight_request_does_not_insert(self):
+        self.post("in-flight")
+        IdempotencyKey.objects.update(status_code=None)
+        response = self.post("in-flight")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_late_finish_after_takeover_keeps_new_owners_claim(self):
+        def slow_view(request):
+            # Meanwhile the claim was judged abandoned and taken over
+            IdempotencyKey.objects.update(token="new-owner")
+            return HttpResponse(status=201)
+
+        request = RequestFactory().post("/", data=b"{}", content_type="application/json", HTTP_IDEMPOTENCY_KEY="taken")
+        self.assertEqual(idempotent(slow_view)(request).status_code, 201)
+        record = IdempotencyKey.objects.get()
+        self.assertEqual((record.token, record.status_code), ("new-owner", None))
+
+    def test_expired_keys_are_purged(self):
+        self.post("old")
+        IdempotencyKey.objects.update(created_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+        out = StringIO()
+        call_command("purge_idempotency_keys", stdout=out)
+        self.assertIn("Purged 1", out.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class CreateEndpointQueryBudgetTests(OrderFixtureMixin, TestCase):
+    def test_create_order_resolves_references_in_two_queries(self):
+        body = {
+            "normal_user_id": self.customer.id,
+            "petsitter_user_id": self.sitter.id,
+            "service_model_id": self.sitter_service.id,
+            "pet_id": self.pet.id,
+            "user_address_id": self.customer_address.id,
+            "quantity": 3,
+            "start_datetime": "2025-09-01T10:00:00Z",
+        }
+        # users + profiles, sitter service + pet/address owners, then in a savepoint
+        # the overlap check and both INSERTs (order, booking), then the response row
+        with self.assertNumQueries(8):
+            response = self.client.post("/api/main/orders/", body, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["final_rate"], 300.0)
+
+        other_pet = Pet.objects.create(user=make_user("other"), name="Rex")
+        with self.assertNumQueries(2):
+            response = self.client.post("/api/main/orders/", {**body, "pet_id": other_pet.id}, format="json")
+        self.assertEqual(response.data, {"error": "pet_id must belong to normal_user_id"})
+        with self.assertNumQueries(2):
+            response = self.client.post("/api/main/orders/", {**body, "user_address_id": 999999}, format="json")
+        self.assertEqual(response.data, {"error": "Invalid user, service_model, pet, or address ID"})
+
+    def test_create_sitter_service_resolves_references_in_one_query(self):
+        body = {"user_id": self.sitter.id, "service_id": self.service.id, "address_id": self.sitter_address.id, "rate": "250"}
+        # user + profile + address owner + service check, INSERT, response row
+        with self.assertNumQueries(3):
+            response = self.client.post("/api/main/sitter-services/", body, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["rate"], 250.0)
+
+        with self.assertNumQueries(1):
+            response = self.client.post("/api/main/sitter-services/", {**body, "address_id": self.customer_address.id}, format="json")
+        self.assertEqual(response.data, {"error": "address_id does not belong to user_id"})
+        with self.assertNumQueries(1):
+            response = self.client.post("/api/main/sitter-services/", {**body, "service_id": 999999}, format="json")
+        self.assertEqual(response.data, {"error": "Invalid user_id/service_id/address_id"})
+
+
+class BulkCreateTests(OrderFixtureMixin, TestCase):
+    def test_bulk_pets_in_one_insert(self):
+        pets = [{"name": f"Pet {i}", "pet": "cat", "age": i} for i in range(25)]
+        # user + profile, SAVEPOINT/INSERT/RELEASE, response rows
+        with self.assertNumQueries(5):
+            response = self.client.post("/api/main/pets/bulk/", {"user_id": self.customer.id, "pets": pets}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row["name"] for row in response.data], [pet["name"] for pet in pets])
+        self.assertEqual(response.data[0]["age"], 0)
+        self.assertEqual(Pet.objects.filter(user=self.customer).count(), 26)
+
+    def test_bulk_pets_all_or_nothing(self):
+        pets = [{"name": "Ok", "pet": "cat"}, {"name": "Bad", "pet": "dragon"}, {"pet": "dog"}]
+        response = self.client.post("/api/main/pets/bulk/", {"user_id": self.customer.id, "pets": pets}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.data["errors"]], [1, 2])
+        self.assertEqual(Pet.objects.filter(user=self.customer).count(), 1)
+
+    def test_bulk_sitter_services_validate_with_set_lookups(self):
+        services = [Service.objects.create(name=f"Service {i}", pet="dog") for i in range(10)]
+        items = [{"service_id": s.id, "address_id": self.sitter_address.id, "rate": 100 + i} for i, s in enumerate(services)]
+        # user + profile, services, addresses, SAVEPOINT/INSERT/RELEASE, response rows
+        with self.assertNumQueries(7):
+            response = self.client.post("/api/main/sitter-services/bulk/", {"user_id": self.sitter.id, "services": items}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row["rate"] for row in response.data], [100.0 + i for i in range(10)])
+
+        items.append({"service_id": self.service.id, "address_id": self.customer_address.id, "rate": 5})
+        response = self.client.post("/api/main/sitter-services/bulk/", {"user_id": self.sitter.id, "services": items}, format="json")
+        self.assertEqual(response.data["errors"], [{"index": 10, "error": "address_id does not belong to user_id"}])
+        self.assertEqual(SitterService.objects.count(), 11)
+
+
+@override_settings(SYNC={"OVERLAP_SECONDS": 0})
+class DeltaSyncTests(OrderFixtureMixin, TestCase):
+    def sync(self, user, since=None):
+        response = self.client.get(f"/api/main/users/{user.id}/sync/", {"since": since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_first_sync_is_a_full_snapshot(self):
+        self.make_orders(2)
+        data = self.sync(self.sitter)
+        self.assertTrue(data["full"])
+        self.assertEqual(len(data["orders"]["changed"]), 2)
+        self.assertEqual([row["id"] for row in data["sitter_services"]["changed"]], [self.sitter_service.id])
+        self.assertEqual(data["pets"]["changed"], [])
+
+    def test_incremental_sync_returns_only_changes_and_tombstones(self):
+        self.make_orders(2)
+        spare = Pet.objects.create(user=self.customer, name="Spare", pet="cat")
+        watermark = self.sync(self.customer)["watermark"]
+
+        # six range scans and the tombstone lookup, all empty
+        with self.assertNumQueries(7):
+            data = self.sync(self.customer, watermark)
+        self.assertFalse(data["full"])
+        self.assertTrue(all(data[name] == {"changed": [], "deleted": []} for name in ("orders", "pets", "addresses")))
+
+        order = Order.objects.first()
+        self.client.patch(f"/api/main/orders/{order.id}/approve/")
+        spare_id = spare.id
+        spare.delete()
+        data = self.sync(self.customer, watermark)
+        self.assertEqual([row["id"] for row in data["orders"]["changed"]], [order.id])
+        self.assertEqual(data["orders"]["changed"][0]["status"], "approved")
+        self.assertEqual(data["pets"], {"changed": [], "deleted": [spare_id]})
+        # The sitter sees the approval too, but not the customer's pet deletion
+        sitter_data = self.sync(self.sitter, watermark)
+        self.assertEqual([row["id"] for row in sitter_data["orders"]["changed"]], [order.id])
+        self.assertEqual(sitter_data["pets"]["deleted"], [])
+
+    def test_cascaded_deletes_leave_tombstones(self):
+        self.make_orders(1)
+        order_id, pet_id = Order.objects.get().id, self.pet.id
+        watermark = self.sync(self.customer)["watermark"]
+        self.pet.delete()
+        data = self.sync(self.customer, watermark)
+        self.assertEqual(data["pets"]["deleted"], [pet_id])
+        self.assertEqual(data["orders"]["deleted"], [order_id])
+        self.assertEqual(self.sync(self.sitter, watermark)["orders"]["deleted"], [order_id])
+
+    def test_cascade_writes_its_tombstones_in_one_insert(self):
+        self.make_orders(3)
+        Pet.objects.create(user=self.customer, name="Spare", pet="cat")
+        with CaptureQueriesContext(connection) as queries:
+            self.customer.delete()
+        inserts = [q["sql"] for q in queries.captured_queries if q["sql"].startswith('INSERT INTO "mainApp_tombstone"')]
+        self.assertEqual(len(inserts), 1)
+        kinds = sorted(Tombstone.objects.values_list("kind", flat=True))
+        # Orders have one tombstone per participant
+        self.assertEqual(kinds, ["addresses"] + ["orders"] * 6 + ["pets"] * 2)
+        Pet.objects.create(user=self.sitter, name="Solo", pet="dog").delete()
+        self.assertEqual(Tombstone.objects.filter(kind="pets").count(), 3)
+
+    def test_expired_or_invalid_watermarks(self):
+        response = self.client.get(f"/api/main/users/{self.customer.id}/sync/", {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(self.sync(self.customer, "2000-01-01T00:00:00Z")["full"])
+        Tombstone.objects.create(kind="pets", object_id=1, deleted_at=datetime(2000, 1, 1, tzinfo=timezone.utc))
+        call_command("purge_tombstones", stdout=StringIO())
+        self.assertFalse(Tombstone.objects.exists())
+
+
+def png_upload(name="photo.png", size=(1200, 800)):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 120, 40)).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ImageVariantTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+    def test_upload_renders_hashed_variants(self):
+        from PIL import Image
+
+        response = self.client.post(
+            "/api/main/pets/create/",
+            {"user_id": self.customer.id, "name": "Rex", "pet": "dog", "image": png_upload()},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 201)
+        # The response does not wait for rendering; until then every URL is the original
+        self.assertEqual(set(response.data["image_urls"].values()), {response.data["image_url"]})
+        work(burst=True)
+        urls = PET_ROW.rows(Pet.objects).get(id=response.data["id"])["image_urls"]
+        self.assertEqual(set(urls), {"thumb", "card", "full", "original"})
+        self.assertEqual(urls["original"], response.data["image_url"])
+        self.assertRegex(urls["thumb"], r"^/media/pets/variants/photo\.thumb\.[0-9a-f]{16}\.(webp|jpg)$")
+
+        pet = Pet.objects.get(id=response.data["id"])
+        storage = pet.image.storage
+        with storage.open(pet.image_variants["thumb"]) as f, Image.open(f) as thumb:
+            self.assertEqual(thumb.size, (160, 160))
+        with storage.open(pet.image_variants["card"]) as f, Image.open(f) as card:
+            self.assertEqual(card.size, (640, 427))
+
+        # Saving again without a new image leaves the variants alone
+        variants = dict(pet.image_variants)
+        pet.name = "Rexy"
+        pet.save()
+        self.assertEqual(pet.image_variants, variants)
+        self.assertFalse(Job.objects.exists())
+
+    def test_unrenderable_or_legacy_images_fall_back_to_the_original(self):
+        broken = Pet.objects.create(user=self.customer, name="Broken", image=SimpleUploadedFile("notes.png", b"not an image"))
+        with self.assertLogs("mainApp.images", "WARNING"):
+            work(burst=True)
+        broken.refresh_from_db()
+        self.assertEqual(broken.image_variants, {"source": broken.image.name})
+        row = PET_ROW.rows(Pet.objects).get(id=broken.id)
+        self.assertEqual(set(row["image_urls"].values()), {row["image_url"]})
+
+        legacy = Pet.objects.create(user=self.customer, name="Legacy", image=png_upload("legacy.png", (50, 50)))
+        Job.objects.all().delete()
+        call_command("build_image_variants", stdout=StringIO())
+        legacy.refresh_from_db()
+        self.assertEqual(set(legacy.image_variants), {"source", "thumb", "card", "full"})
+
+
+calls = []
+
+
+@job("tests.record")
+def record_call(value):
+    calls.append(value)
+
+
+@job("tests.flaky", max_attempts=2)
+def flaky_job():
+    raise RuntimeError("flaky job failed")
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueued_jobs_run_once_and_are_removed(self):
+        enqueue(record_call, value=1)
+        enqueue("tests.record", value=2)
+        self.assertEqual(work(burst=True), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(Job.objects.exists())
+
+    def test_delayed_jobs_wait(self):
+        enqueue(record_call, delay=60, value=1)
+        self.assertEqual(work(burst=True), 0)
+        self.assertEqual(Job.objects.get().status, "queued")
+
+    def test_failures_back_off_then_fail_for_good(self):
+        enqueue(flaky_job)
+        with self.assertLogs("mainApp.queue", "WARNING"):
+            work(burst=True)
+        queued = Job.objects.get()
+        self.assertEqual((queued.status, queued.attempts), ("queued", 1))
+        self.assertIn("flaky job failed", queued.last_error)
+        self.assertGreater(queued.run_at, queued.updated_at)
+
+        Job.objects.update(run_at=queued.updated_at)
+        with self.assertLogs("mainApp.queue", "ERROR"):
+            work(burst=True)
+        failed = Job.objects.get()
+        self.assertEqual((failed.status, failed.attempts), ("failed", 2))
+        self.assertEqual(work(burst=True), 0)
+
+    def test_expired_claims_are_taken_over(self):
+        enqueue(record_call, value=1)
+        (stale,) = claim()
+        self.assertEqual(claim(), [])  # hidden while its claim lasts
+        Job.objects.update(locked_until=datetime(2000, 1, 1, tzinfo=timezone.utc))
+        (retried,) = claim()
+        self.assertEqual(retried.attempts, 2)
+        # The worker that lost its claim neither deletes nor re-queues the job
+        run(stale)
+        self.assertEqual(Job.objects.get().lock_token, retried.lock_token)
+        run(retried)
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(calls, [1, 1])
+
+    def test_expired_claim_on_last_attempt_fails(self):
+        enqueue(record_call, value=1)
+        Job.objects.update(max_attempts=1)
+        claim()
+        # The worker died without recording an outcome
+        Job.objects.update(locked_until=datetime(2000, 1, 1, tzinfo=timezone.utc))
+        with self.assertLogs("mainApp.queue", "ERROR"):
+            self.assertEqual(claim(), [])
+        failed = Job.objects.get()
+        self.assertEqual((failed.status, failed.attempts, failed.lock_token), ("failed", 1, ""))
+        self.assertEqual(claim(), [])
+        self.assertEqual(calls, [])
+
+    def test_runworker_burst(self):
+        enqueue(record_call, value=1)
+        out = StringIO()
+        call_command("runworker", "--burst", stdout=out)
+        self.assertEqual(out.getvalue().strip(), "Ran 1 jobs")
+
+
+class RecordingBroker:
+    published = []
+
+    def publish(self, topic, event):
+        self.published.append((topic, event))
+
+
+@override_settings(ORDER_EVENTS={"BROKER": "mainApp.tests.RecordingBroker"})
+class OrderEventTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        RecordingBroker.published.clear()
+
+    def test_transitions_publish_changes_to_both_participants(self):
+        self.make_orders(1)
+        order = Order.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/main/orders/{order.id}/approve/", {}, format="json")
+        self.assertEqual(
+            sorted(topic for topic, _ in RecordingBroker.published),
+            sorted([user_topic(self.customer.id), user_topic(self.sitter.id)]),
+        )
+        _, event = RecordingBroker.published[0]
+        self.assertEqual(event["event"], "order.updated")
+        self.assertEqual(set(event["order"]), {"id", "status", "updated_at"})
+        self.assertEqual((event["order"]["id"], event["order"]["status"]), (order.id, "approved"))
+
+    def test_rejected_transitions_publish_nothing(self):
+        self.make_orders(1)
+        order = Order.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/main/orders/{order.id}/complete/", {}, format="json")
+        self.assertEqual(RecordingBroker.published, [])
+
+    def test_repeated_transitions_publish_nothing(self):
+        self.make_orders(1)
+        order = Order.objects.get()
+        self.client.patch(f"/api/main/orders/{order.id}/approve/", {}, format="json")
+        RecordingBroker.published.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f"/api/main/orders/{order.id}/approve/", {}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(RecordingBroker.published, [])
+
+    def test_created_orders_are_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/main/orders/", {
+                "normal_user_id": self.customer.id, "petsitter_user_id": self.sitter.id,
+                "service_model_id": self.sitter_service.id, "pet_id": self.pet.id,
+                "user_address_id": self.customer_address.id, "quantity": 1,
+                "start_datetime": "2025-09-01T10:00:00Z",
+            }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(RecordingBroker.published), 2)
+        self.assertEqual(RecordingBroker.published[0][1]["event"], "order.created")
+        self.assertEqual(RecordingBroker.published[0][1]["order"]["id"], response.data["id"])
+
+    @override_settings(ORDER_EVENTS={"KEEPALIVE_SECONDS": 0.01, "QUEUE_SIZE": 2})
+    async def test_stream_delivers_events_published_from_other_threads(self):
+        broker = InProcessBroker()
+        self.enterContext(mock.patch("mainApp.events.get_broker", return_value=broker))
+        stream = order_event_stream(7)
+        self.assertEqual(await anext(stream), ": connected\n\n")
+        event = {"event": "order.updated", "order": {"id": 3, "status": "approved"}}
+        publisher = threading.Thread(target=broker.publish, args=(user_topic(7), event))
+        publisher.start()
+        publisher.join()
+        self.assertEqual(
+            await anext(stream), 'event: order.updated\ndata: {"id":3,"status":"approved"}\n\n'
+        )
+        self.assertEqual(await anext(stream), ": keepalive\n\n")
+
+        # A consumer that falls behind is told to resync instead of being sent stale events
+        for _ in range(3):
+            broker.publish(user_topic(7), event)
+        await asyncio.sleep(0)
+        self.assertEqual(await anext(stream), "event: resync\ndata: {}\n\n")
+
+        await stream.aclose()
+        self.assertEqual(dict(broker._subscriptions), {})
+
+
+class OrderConversationTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_orders(1)
+        self.order = Order.objects.get()
+        self.url = f"/api/main/orders/{self.order.id}/messages/"
+
+    def post(self, sender, text):
+        return self.client.post(self.url, {"sender_id": sender.id, "text": text}, format="json")
+
+    def test_append_is_one_read_and_one_insert(self):
+        with self.assertNumQueries(2):
+            response = self.post(self.customer, "hello")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {"id": OrderMessage.objects.get().id})
+        self.assertEqual(Order.objects.get().updated_at, self.order.updated_at)
+
+    def test_reads_after_cursor(self):
+        ids = [self.post(sender, f"message {n}").data["id"] for n, sender in enumerate([self.customer, self.sitter] * 3)]
+        # The participant check, then the range scan
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"user_id": self.customer.id, "after": ids[1], "limit": 3})
+        self.assertEqual([m["id"] for m in response.data["results"]], ids[2:5])
+        self.assertEqual(response.data["results"][0]["sender_id"], self.customer.id)
+        self.assertTrue(response.data["has_more"])
+        response = self.client.get(self.url, {"user_id": self.sitter.id, "after": ids[4]})
+        self.assertEqual([m["text"] for m in response.data["results"]], ["message 5"])
+        self.assertFalse(response.data["has_more"])
+        self.assertEqual(len(self.client.get(self.url, {"user_id": self.sitter.id}).data["results"]), 6)
+
+    def test_only_participants_read(self):
+        self.post(self.customer, "private")
+        outsider = self.client.get(self.url, {"user_id": make_user("outsider").id})
+        self.assertEqual(outsider.status_code, 404)
+        missing = self.client.get("/api/main/orders/999999/messages/", {"user_id": self.customer.id})
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(outsider.data, missing.data)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"user_id": "abc"}).status_code, 400)
+
+    def test_rejected_messages(self):
+        self.assertEqual(self.post(make_user("outsider"), "hi").status_code, 400)
+        self.assertEqual(self.client.post(self.url, {"sender_id": self.customer.id}, format="json").status_code, 400)
+        missing = self.client.post("/api/main/orders/999999/messages/", {"sender_id": 1, "text": "hi"}, format="json")
+        self.assertEqual(missing.status_code, 404)
+        Order.objects.update(status="cancelled")
+        self.assertEqual(self.post(self.customer, "hi").status_code, 409)
+        self.assertFalse(OrderMessage.objects.exists())
+
+    @override_settings(ORDER_EVENTS={"BROKER": "mainApp.tests.RecordingBroker"})
+    def test_participants_are_notified(self):
+        RecordingBroker.published.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            message_id = self.post(self.sitter, "on my way").data["id"]
+        self.assertEqual(len(RecordingBroker.published), 2)
+        self.assertEqual(
+            RecordingBroker.published[0][1],
+            {"event": "order.message", "order": {"id": self.order.id, "message_id": message_id, "sender_id": self.sitter.id}},
+        )
+        self.assertEqual(messages_after(self.order.id, message_id), [])
+
+
+def at(day, hour):
+    return datetime(2025, 9, day, hour, tzinfo=timezone.utc)
+
+
+class SitterCalendarTests(OrderFixtureMixin, TestCase):
+    def order(self, start, **extra):
+        body = {
+            "normal_user_id": self.customer.id, "petsitter_user_id": self.sitter.id,
+            "service_model_id": self.sitter_service.id, "pet_id": self.pet.id,
+            "user_address_id": self.customer_address.id, "start_datetime": start.isoformat(), **extra,
+        }
+        return self.client.post("/api/main/orders/", body, format="json")
+
+    def test_overlapping_orders_are_rejected(self):
+        response = self.order(at(1, 10), quantity=2)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["end_datetime"], at(1, 12))
+        self.assertEqual(self.order(at(1, 11)).status_code, 409)
+        self.assertEqual(self.order(at(1, 9), end_datetime=at(1, 10).isoformat()).status_code, 201)  # touching is fine
+        self.assertEqual(self.order(at(1, 12)).status_code, 201)
+        # The sitter is busy whichever of their services is booked
+        other_service = SitterService.objects.create(
+            user=self.sitter, service=Service.objects.create(name="Grooming", pet="dog"), address=self.sitter_address, rate=50,
+        )
+        self.assertEqual(self.order(at(1, 11), service_model_id=other_service.id).status_code, 409)
+        self.assertEqual(Booking.objects.count(), 3)
+        self.assertEqual(self.order(at(1, 14), end_datetime=at(1, 13).isoformat()).status_code, 400)
+        self.assertEqual(self.order(at(1, 14), end_datetime=1700000000).status_code, 400)
+        self.assertEqual(self.order(at(1, 14), end_datetime=["2025-09-01"]).status_code, 400)
+
+    def test_lock_contention_is_retryable(self):
+        body = {
+            "normal_user_id": self.customer.id, "petsitter_user_id": self.sitter.id,
+            "service_model_id": self.sitter_service.id, "pet_id": self.pet.id,
+            "user_address_id": self.customer_address.id, "start_datetime": at(1, 10).isoformat(),
+        }
+        # What a deferred SQLite transaction gets when it loses the race for the write lock
+        with mock.patch("mainApp.bookings.is_booked", side_effect=OperationalError("database is locked")):
+            response = self.client.post("/api/main/orders/", body, format="json", HTTP_IDEMPOTENCY_KEY="locked-once")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertFalse(Order.objects.exists())
+        # The key was released, so the retry runs, and the loser of the race then gets its 409
+        retry = self.client.post("/api/main/orders/", body, format="json", HTTP_IDEMPOTENCY_KEY="locked-once")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(self.order(at(1, 10)).status_code, 409)
+
+    def test_cancelled_orders_free_their_time(self):
+        first = self.order(at(1, 10), quantity=2).data["id"]
+        Order.objects.filter(id=first).update(status="cancelled")
+        self.assertEqual(free_windows([self.sitter_service.id], at(1, 0), at(2, 0)), {self.sitter_service.id: []})
+        SitterAvailability.objects.create(sitter_service=self.sitter_service, starts_at=at(1, 8), ends_at=at(1, 18))
+        self.assertEqual(free_windows([self.sitter_service.id], at(1, 0), at(2, 0)), {self.sitter_service.id: [(at(1, 8), at(1, 18))]})
+        self.assertEqual(self.order(at(1, 11)).status_code, 201)
+
+    def test_subtract(self):
+        windows = [(at(1, 8), at(1, 12)), (at(1, 11), at(1, 18)), (at(2, 8), at(2, 10))]
+        busy = [(at(1, 9), at(1, 10)), (at(1, 9), at(1, 11)), (at(1, 17), at(2, 9))]
+        self.assertEqual(subtract(windows, busy), [(at(1, 8), at(1, 9)), (at(1, 11), at(1, 17)), (at(2, 9), at(2, 10))])
+
+    def test_free_windows_for_many_sitters_in_one_query(self):
+        other_sitter = make_user("other-sitter", role="petsitter")
+        other_service = SitterService.objects.create(
+            user=other_sitter, service=self.service, address=self.sitter_address, rate=80,
+        )
+        response = self.client.post(
+            f"/api/main/sitter-services/{self.sitter_service.id}/availability/",
+            {"windows": [{"start": at(1, 8).isoformat(), "end": at(1, 18).isoformat()}]}, format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        SitterAvailability.objects.create(sitter_service=other_service, starts_at=at(1, 12), ends_at=at(1, 20))
+        self.order(at(1, 10), quantity=3)
+
+        with self.assertNumQueries(1):
+            free = free_windows([self.sitter_service.id, other_service.id], at(1, 0), at(1, 16))
+        self.assertEqual(free, {
+            self.sitter_service.id: [(at(1, 8), at(1, 10)), (at(1, 13), at(1, 16))],
+            other_service.id: [(at(1, 12), at(1, 16))],
+        })
+
+        response = self.client.get("/api/main/sitter-services/free-windows/", {
+            "ids": f"{self.sitter_service.id},{other_service.id}",
+            "from": at(1, 0).isoformat(), "to": at(2, 0).isoformat(), "min_minutes": 180,
+        })
+        self.assertEqual(response.data, [
+            {"sitter_service_id": self.sitter_service.id, "free": [{"start": at(1, 13), "end": at(1, 18)}]},
+            {"sitter_service_id": other_service.id, "free": [{"start": at(1, 12), "end": at(1, 20)}]},
+        ])
+        missing = self.client.get("/api/main/sitter-services/free-windows/", {"ids": "1", "from": at(1, 0).isoformat()})
+        self.assertEqual(missing.status_code, 400)
+
+
+@override_settings(DISCOVERY={"REFRESH_SECONDS": 0})
+class SitterDiscoveryTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = SitterIndex()
+        self.enterContext(mock.patch("mainApp.discovery.sitter_index", self.index))
+        # A dearer sitter further away, with a better record
+        self.other_sitter = make_user("other-sitter", role="petsitter")
+        far_address = Address.objects.create(user=self.other_sitter, city="London", latitude=51.6, longitude=-0.2)
+        self.other_service = SitterService.objects.create(
+            user=self.other_sitter, service=self.service, address=far_address, rate=300,
+        )
+
+    def discover(self, **params):
+        return self.client.get("/api/main/sitter-services/discover/", {"address_id": self.customer_address.id, **params})
+
+    def test_ranks_by_weighted_features(self):
+        response = self.discover(service_id=self.service.id)
+        self.assertEqual([r["id"] for r in response.data], [self.sitter_service.id, self.other_service.id])
+        self.assertGreater(response.data[0]["score"], response.data[1]["score"])
+        self.assertLess(response.data[0]["distance_km"], 2)
+
+        with self.settings(DISCOVERY={"REFRESH_SECONDS": 0, "WEIGHTS": {"price": 0, "rating": 1, "distance": 0, "completion": 0}}):
+            RatingSummary.objects.create(user=self.other_sitter, count=40, total=200, stars_5=40)
+            response = self.discover(pet="dog")
+        self.assertEqual(response.data[0]["id"], self.other_service.id)
+
+        self.assertEqual(self.discover(service_id=self.service.id, radius_km=5).data[0]["id"], self.sitter_service.id)
+        self.assertEqual(len(self.discover(service_id=self.service.id, radius_km=5).data), 1)
+        self.assertEqual(self.discover().status_code, 400)
+
+    def test_refresh_applies_changes_incrementally(self):
+        self.index.refresh()
+        watermark = self.index.watermark
+        columns = self.index.columns
+        self.assertEqual(sorted(columns["id"].tolist()), [self.sitter_service.id, self.other_service.id])
+
+        SitterService.objects.filter(id=self.sitter_service.id).update(rate=500, updated_at=datetime.now(timezone.utc))
+        added = SitterService.objects.create(user=self.sitter, service=self.service, address=self.sitter_address, rate=50)
+        self.other_service.delete()
+        self.make_orders(2)
+        Order.objects.filter(id=Order.objects.first().id).update(status="cancelled")
+        Order.objects.exclude(status="cancelled").update(status="completed")
+        self.index.refresh()
+
+        self.assertGreater(self.index.watermark, watermark)
+        columns = self.index.columns
+        alive = {i: row for row, i in enumerate(columns["id"].tolist()) if columns["alive"][row]}
+        self.assertEqual(set(alive), {self.sitter_service.id, added.id})
+        self.assertEqual(columns["rate"][alive[self.sitter_service.id]], 500)
+        # 1 of 2 finished orders completed, smoothed with 5 orders at 0.8
+        self.assertAlmostEqual(columns["completion"][alive[added.id]], (1 + 4) / 7)
+
+    def test_refresh_leaves_arrays_held_by_readers_alone(self):
+        self.index.refresh()
+        held = self.index.columns
+        rates = held["rate"].copy()
+        SitterService.objects.filter(id=self.sitter_service.id).update(rate=500, updated_at=datetime.now(timezone.utc))
+        self.other_service.delete()
+        self.index.refresh()
+
+        self.assertIsNot(self.index.columns, held)
+        np.testing.assert_array_equal(held["rate"], rates)
+        self.assertTrue(held["alive"].all())
+        self.assertIn(500, self.index.columns["rate"].tolist())
+
+    def test_top_k_matches_a_full_sort(self):
+        rng = np.random.default_rng(0)
+        size = 2000
+        index = SitterIndex.from_columns(
+            id=np.arange(1, size + 1), sitter=np.arange(1, size + 1), service=rng.integers(1, 3, size),
+            pet=np.zeros(size), lat=51.5 + rng.normal(0, 0.1, size), lng=-0.1 + rng.normal(0, 0.1, size),
+            rate=rng.uniform(100, 900, size), rating=rng.uniform(1, 5, size), completion=rng.uniform(0, 1, size),
+        )
+        everything = index.top(51.5, -0.1, 20, size, service_id=1)
+        self.assertEqual(index.top(51.5, -0.1, 20, 25, service_id=1), everything[:25])
+        scores = [score for _, score, _ in everything]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+
+class FullTextSearchTests(OrderFixtureMixin, TestCase):
+    def search(self, **params):
+        return self.client.get("/api/main/search/", params)
+
+    def test_prefix_match_ranks_names_first(self):
+        described = Service.objects.create(name="Day care", pet="dog", description="Includes a short walk")
+        Service.objects.create(name="Grooming", pet="cat")
+        response = self.search(q="WALK", type="services")
+        self.assertEqual([s["id"] for s in response.data["services"]], [self.service.id, described.id])
+        self.assertGreater(response.data["services"][0]["score"], response.data["services"][1]["score"])
+        self.assertEqual([s["id"] for s in self.search(q="sho wal", type="services").data["services"]], [described.id])
+        # FTS syntax in the input is just more words
+        self.assertEqual(self.search(q='walk" OR NOT *', type="services").data["services"], [])
+
+        response = self.search(q="bud")
+        self.assertEqual(set(response.data), {"services", "pets", "reviews"})
+        self.assertEqual(response.data["pets"][0]["user"]["username"], "customer")
+        self.assertEqual(self.search(q="!!").status_code, 400)
+        self.assertEqual(self.search(q="walk", type="users").status_code, 400)
+
+    def test_index_follows_writes(self):
+        self.make_orders(3)
+        reviewed, unreviewed, _ = Order.objects.order_by("id")
+        Order.objects.filter(id=reviewed.id).update(rating_for_petsitter=5, rating_review_for_petsitter="Wonderful with anxious dogs")
+        Order.objects.filter(id=unreviewed.id).update(status="approved")
+        self.assertEqual([r["id"] for r in self.search(q="anxious", type="reviews").data["reviews"]], [reviewed.id])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM order_review_fts_docsize")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        self.pet.name = "Rex"
+        self.pet.save()
+        self.assertEqual(self.search(q="buddy", type="pets").data["pets"], [])
+        self.assertEqual(len(self.search(q="rex", type="pets").data["pets"]), 1)
+        Order.objects.all().delete()
+        self.pet.delete()
+        self.assertEqual(self.search(q="rex anxious").data, {"services": [], "pets": [], "reviews": []})
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO order_review_fts(order_review_fts) VALUES ('integrity-check')")
+            cursor.execute("INSERT INTO pet_fts(pet_fts) VALUES ('integrity-check')")
+
+    def test_admin_search_uses_index(self):
+        self.make_orders(2)
+        reviewed = Order.objects.first()
+        Order.objects.filter(id=reviewed.id).update(rating_review_for_user="Punctual and friendly")
+        order_admin = site._registry[Order]
+        all_orders = set(Order.objects.values_list("id", flat=True))
+        for term, expected in (("punct", {reviewed.id}), ("walk", all_orders), ("budd", all_orders), ("sitter", all_orders), ("sit", all_orders),
+                               ("itter", set()), ("lond", all_orders), ("LONDON", all_orders), ("paris", set())):
+            queryset, may_have_duplicates = order_admin.get_search_results(None, Order.objects.all(), term)
+            self.assertEqual(set(queryset.values_list("id", flat=True)), expected, term)
+            self.assertFalse(may_have_duplicates)
+        plan = order_admin.get_search_results(None, Order.objects.all(), "punct")[0].explain()
+        self.assertNotIn("SCAN mainApp_order", plan)
+        self.assertNotIn("SCAN auth_user", plan)
+        self.assertNotIn("SCAN userApp_address", plan)
+
+        for term in ("customer", "cust"):
+            pets, _ = site._registry[Pet].get_search_results(None, Pet.objects.all(), term)
+            self.assertEqual(list(pets), [self.pet], term)
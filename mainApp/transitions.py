@@ -0,0 +1,100 @@
+"""Order state transitions, each applied as one conditional UPDATE.
+
+Every transition is ``UPDATE order SET <changed columns> WHERE id = ? AND
+status IN (...)``: only the touched columns are written, concurrent PATCHes
+cannot overwrite each other's fields, and a transition that is not allowed
+from the current status simply matches no row. Repeating a status change
+matches no row either, and writes nothing. Only when no row matched is the
+order read, once, to tell a repeat from a missing order or a conflicting
+state. Each transition returns the columns it wrote, which become the change
+event pushed to the participants (see mainApp.events); a repeat returns none.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from mainApp.models import Order
+from mainApp.ratings import apply_rating_change
+
+# Statuses an order can still be messaged and reviewed in
+ACTIVE_STATUSES = ("pending", "approved", "completed")
+
+# Repeating a transition that already happened is allowed so client retries are safe
+APPROVE_FROM = ("pending", "approved")
+COMPLETE_FROM = ("approved", "completed")
+
+
+class TransitionError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _apply(order_id, allowed_from, action, **changes):
+    target = changes.get("status")
+    changes["updated_at"] = timezone.now()
+    from_statuses = [order_status for order_status in allowed_from if order_status != target]
+    if Order.objects.filter(id=order_id, status__in=from_statuses).update(**changes):
+        return changes
+    current = Order.objects.filter(id=order_id).values_list("status", flat=True).first()
+    if current is None:
+        raise TransitionError("Order not found", 404)
+    if current == target:
+        return {}
+    raise TransitionError(f"Cannot {action} an order that is not {' or '.join(allowed_from)}", 409)
+
+
+def approve(order_id):
+    return _apply(order_id, APPROVE_FROM, "approve", status="approved")
+
+
+def complete(order_id):
+    return _apply(order_id, COMPLETE_FROM, "complete", status="completed")
+
+
+def message_petsitter(order_id, message):
+    return _apply(order_id, ACTIVE_STATUSES, "message on", msg_for_petsitter=message)
+
+
+def message_user(order_id, message):
+    return _apply(order_id, ACTIVE_STATUSES, "message on", msg_for_user=message)
+
+
+@transaction.atomic
+def review(order_id, user_id, text, rating=None):
+    """Store user_id's review (and optional 1-5 rating) of the other participant.
+
+    Reads the participants first to know which side's columns to write. A
+    changed rating moves the rated user's RatingSummary by the old -> new
+    delta in the same transaction (mainApp.ratings.apply_rating_change). The
+    UPDATE only matches while the rating is still the one read, so two
+    concurrent re-ratings cannot both apply a delta from the same old value.
+    """
+    row = Order.objects.filter(id=order_id).values_list(
+        "normal_user_id", "petsitter_user_id", "status", "rating_for_petsitter", "rating_for_user"
+    ).first()
+    if row is None:
+        raise TransitionError("Order not found", 404)
+    normal_user_id, petsitter_user_id, order_status, rating_for_petsitter, rating_for_user = row
+    if order_status not in ACTIVE_STATUSES:
+        raise TransitionError(f"Cannot review an order that is {order_status}", 409)
+
+    if user_id == normal_user_id:
+        # Normal user reviewing petsitter
+        rated_user_id, rating_column, old_rating = petsitter_user_id, "rating_for_petsitter", rating_for_petsitter
+        changes = {"rating_review_for_petsitter": text}
+    elif user_id == petsitter_user_id:
+        # Petsitter reviewing normal user
+        rated_user_id, rating_column, old_rating = normal_user_id, "rating_for_user", rating_for_user
+        changes = {"rating_review_for_user": text}
+    else:
+        raise TransitionError("User not part of this order", 400)
+
+    if rating is not None:
+        changes[rating_column] = rating
+    changes["updated_at"] = timezone.now()
+    if not Order.objects.filter(id=order_id, status__in=ACTIVE_STATUSES, **{rating_column: old_rating}).update(**changes):
+        raise TransitionError("Order was changed concurrently", 409)
+    if rating is not None:
+        apply_rating_change(rated_user_id, old_rating, rating)
+    return changes
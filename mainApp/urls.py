@@ -3,11 +3,18 @@ from mainApp.views import (
     get_pet_list,
     get_services_by_pet,
     get_all_services,
+    full_text_search,
     create_sitter_service,
+    create_sitter_services_bulk,
     list_sitter_services_for_user,
     sitter_service_detail,
+    search_sitter_services,
+    discover_sitter_services,
+    sitter_service_availability,
+    sitter_services_free_windows,
     get_all_ads,
     create_pet,
+    create_pets_bulk,
     list_pets_for_user,
     create_order,
     list_orders_for_user,
@@ -15,28 +22,42 @@ from mainApp.views import (
     complete_order,
     send_message_to_petsitter,
     send_message_to_user,
+    order_messages,
     add_review,
+    sync_for_user,
+    order_events,
 )
 
 urlpatterns = [
     path('services/', get_all_services, name='service-list'),
     path('pets/', get_pet_list, name='pet-list'),
     path('pets/<str:pet>/services/', get_services_by_pet, name='services-by-pet'),
+    path('search/', full_text_search, name='full-text-search'),  # GET ?q=&type=&limit=
     # Sitter services
     path('sitter-services/', create_sitter_service, name='sitter-service-create'),  # POST
+    path('sitter-services/bulk/', create_sitter_services_bulk, name='sitter-service-bulk-create'),  # POST
     path('users/<int:user_id>/sitter-services/', list_sitter_services_for_user, name='sitter-service-list-by-user'),  # GET
+    path('sitter-services/search/', search_sitter_services, name='sitter-service-search'),  # GET
+    path('sitter-services/discover/', discover_sitter_services, name='sitter-service-discover'),  # GET
+    path('sitter-services/free-windows/', sitter_services_free_windows, name='sitter-service-free-windows'),  # GET
     path('sitter-services/<int:sitter_service_id>/', sitter_service_detail, name='sitter-service-detail'),  # GET
+    path('sitter-services/<int:sitter_service_id>/availability/', sitter_service_availability, name='sitter-service-availability'),  # GET, POST
     # Ads
     path('ads/', get_all_ads, name='ad-list'),  # GET
     # Pets
     path('pets/create/', create_pet, name='pet-create'),  # POST
+    path('pets/bulk/', create_pets_bulk, name='pet-bulk-create'),  # POST
     path('users/<int:user_id>/pets/', list_pets_for_user, name='pet-list-by-user'),  # GET
     # Orders
     path('orders/', create_order, name='order-create'),  # POST
     path('users/<int:user_id>/orders/', list_orders_for_user, name='order-list-by-user'),  # GET
+    path('users/<int:user_id>/orders/events/', order_events, name='order-events'),  # GET, server-sent events
     path('orders/<int:order_id>/approve/', approve_order, name='order-approve'),  # PATCH
     path('orders/<int:order_id>/complete/', complete_order, name='order-complete'),  # PATCH
     path('orders/<int:order_id>/message-to-petsitter/', send_message_to_petsitter, name='order-msg-to-petsitter'),  # PATCH
     path('orders/<int:order_id>/message-to-user/', send_message_to_user, name='order-msg-to-user'),  # PATCH
+    path('orders/<int:order_id>/messages/', order_messages, name='order-messages'),  # GET ?after=<id>, POST
     path('orders/<int:order_id>/review/', add_review, name='order-add-review'),  # PATCH
+    # Delta sync
+    path('users/<int:user_id>/sync/', sync_for_user, name='user-sync'),  # GET
 ]
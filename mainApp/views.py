@@ -1,13 +1,33 @@
+from django.http import HttpResponseNotAllowed, StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth.models import User
-from mainApp.models import PET_CHOICES, Service, SitterService, Ad, Pet, Order
+from django.db import transaction
+from django.db.models import Exists, Subquery
+from django.utils import timezone
+from mainApp.models import PET_CHOICES, Service, SitterService, Ad, Pet, Order, Booking, SitterAvailability
+from mainApp.pagination import KeysetPagination, keyset_filter
+from mainApp import bookings, conversations, discovery, search, transitions
+from mainApp.bulk import bulk_items, invalid_items_response
+from mainApp.caching import cached_catalog_response
+from mainApp.events import order_event_stream, publish_order_event
+from mainApp.idempotency import idempotent
+from mainApp.rows import AD_ROW, ORDER_ROW, PET_ROW, REVIEW_ROW, SERVICE_ROW, SITTER_SERVICE_ROW
+from mainApp.streaming import STREAM_CHUNK_SIZE, streaming_json_response, wants_stream
+from mainApp.sync import changes_since, parse_watermark
+from petproject.routers import read_from_replica
+from userApp import geo
 from userApp.models import Address
-from datetime import datetime
+from datetime import datetime, timedelta
+import heapq
+import itertools
+import numpy as np
 
 
+@cached_catalog_response
+@read_from_replica
 @api_view(['GET'])
 def get_pet_list(request):
     """Return available pet choices as list of {key, label}."""
@@ -15,6 +35,8 @@ def get_pet_list(request):
     return Response(pets)
 
 
+@cached_catalog_response
+@read_from_replica
 @api_view(['GET'])
 def get_services_by_pet(request, pet: str):
     """Return list of services for given pet key (e.g., dog, cat)."""
@@ -22,94 +44,73 @@ def get_services_by_pet(request, pet: str):
     if pet not in valid_keys:
         return Response({"error": "Invalid pet"}, status=status.HTTP_400_BAD_REQUEST)
 
-    services = Service.objects.filter(pet=pet).order_by('name')
-    data = [
-        {
-            "id": s.id,
-            "name": s.name,
-            "pet": s.pet,
-            "pet_label": dict(PET_CHOICES).get(s.pet, s.pet),
-            "description": s.description,
-            "image_url": (s.image.url if s.image else None),
-        }
-        for s in services
-    ]
-    return Response(data)
+    services = SERVICE_ROW.rows(Service.objects.filter(pet=pet)).order_by('name')
+    paginator = KeysetPagination(("name", "id"))
+    page = paginator.paginate_queryset(services, request)
+    if page is not None:
+        return paginator.get_paginated_response(page)
+    return Response(list(services))
 
 # New: list all services
+@cached_catalog_response
+@read_from_replica
 @api_view(['GET'])
 def get_all_services(request):
-    services = Service.objects.all().order_by('name')
-    data = [
-        {
-            "id": s.id,
-            "name": s.name,
-            "pet": s.pet,
-            "pet_label": dict(PET_CHOICES).get(s.pet, s.pet),
-            "description": s.description,
-            "image_url": (s.image.url if s.image else None),
-        }
-        for s in services
-    ]
-    return Response(data)
+    services = SERVICE_ROW.rows(Service.objects.all()).order_by('name')
+    paginator = KeysetPagination(("name", "id"))
+    page = paginator.paginate_queryset(services, request)
+    if page is not None:
+        return paginator.get_paginated_response(page)
+    return Response(list(services))
+
+
+FULL_TEXT_DEFAULT_LIMIT = 20
+FULL_TEXT_MAX_LIMIT = 100
+FULL_TEXT_ROWS = {"services": SERVICE_ROW, "pets": PET_ROW, "reviews": REVIEW_ROW}
+
+
+@read_from_replica
+@api_view(["GET"])
+def full_text_search(request):
+    """Services, pets and order reviews matching ?q=, best match first.
+
+    Query: q (required; each word matches as a word prefix, all must match),
+    type (comma-separated services, pets, reviews; default all), limit per
+    type (default 20, max 100). Results carry a bm25 ``score``, higher is
+    better (see mainApp.search).
+    """
+    params = request.query_params
+    terms = search.search_terms(params.get("q", ""))
+    if not terms:
+        return Response({"error": "q must contain at least one word"}, status=status.HTTP_400_BAD_REQUEST)
+    kinds = params.get("type", ",".join(FULL_TEXT_ROWS)).split(",")
+    if not set(kinds) <= FULL_TEXT_ROWS.keys():
+        return Response({"error": f"type must be among {', '.join(FULL_TEXT_ROWS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(params.get("limit", FULL_TEXT_DEFAULT_LIMIT)), FULL_TEXT_MAX_LIMIT))
+    except ValueError:
+        return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = {}
+    for kind in kinds:
+        ranked = search.ranked(kind, terms, limit)
+        model = search.SEARCH_INDEXES[kind].model
+        by_id = {row["id"]: row for row in FULL_TEXT_ROWS[kind].rows(model.objects.filter(id__in=[pk for pk, _ in ranked]))}
+        results[kind] = [{**by_id[pk], "score": score} for pk, score in ranked if pk in by_id]
+    return Response(results)
 
 # Create your views here.
 
 
-# --------- SitterService APIs ---------
+def _all_ids(*values):
+    """True if every value is an integer id (as int or numeric string)."""
+    try:
+        return all(int(value) > 0 for value in values)
+    except (TypeError, ValueError):
+        return False
 
-def _address_to_dict(addr: Address):
-    return {
-        "id": addr.id,
-        "address": addr.address,
-        "city": addr.city,
-        "state": addr.state,
-        "zipcode": addr.zipcode,
-        "latitude": addr.latitude,
-        "longitude": addr.longitude,
-        "country": addr.country,
-    }
-
-
-def _service_to_dict(svc: Service):
-    return {
-        "id": svc.id,
-        "name": svc.name,
-        "pet": svc.pet,
-        "pet_label": dict(PET_CHOICES).get(svc.pet, svc.pet),
-        "description": svc.description,
-        "image_url": (svc.image.url if svc.image else None),
-    }
-
-
-def _user_to_dict(user: User):
-    data = {
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-    }
-    profile = getattr(user, "profile", None)
-    if profile:
-        data["profile"] = {
-            "name": profile.name,
-            "role": profile.role,
-            "phone_number": profile.phone_number,
-            "verified": profile.verified,
-        }
-    return data
-
-
-def _sitter_service_to_dict(ss: SitterService):
-    return {
-        "id": ss.id,
-        "rate": float(ss.rate),
-        "created_at": ss.created_at,
-        "updated_at": ss.updated_at,
-        "user": _user_to_dict(ss.user),
-        "service": _service_to_dict(ss.service),
-        "address": _address_to_dict(ss.address),
-    }
 
+# --------- SitterService APIs ---------
 
 @api_view(["POST"])
 def create_sitter_service(request):
@@ -122,15 +123,24 @@ def create_sitter_service(request):
     if not all([user_id, service_id, address_id, rate]):
         return Response({"error": "user_id, service_id, address_id, and rate are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    try:
-        user = User.objects.get(id=user_id)
-        service = Service.objects.get(id=service_id)
-        address = Address.objects.get(id=address_id)
-    except (User.DoesNotExist, Service.DoesNotExist, Address.DoesNotExist):
+    if not _all_ids(user_id, service_id, address_id):
+        return Response({"error": "Invalid user_id/service_id/address_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # One query: the user with its profile, plus the address owner and whether the service exists
+    user = (
+        User.objects.select_related("profile")
+        .annotate(
+            address_user_id=Subquery(Address.objects.filter(id=address_id).values("user_id")),
+            service_exists=Exists(Service.objects.filter(id=service_id)),
+        )
+        .filter(id=user_id)
+        .first()
+    )
+    if user is None or user.address_user_id is None or not user.service_exists:
         return Response({"error": "Invalid user_id/service_id/address_id"}, status=status.HTTP_400_BAD_REQUEST)
 
     # Optional: ensure address belongs to the same user
-    if address.user_id != user.id:
+    if user.address_user_id != user.id:
         return Response({"error": "address_id does not belong to user_id"}, status=status.HTTP_400_BAD_REQUEST)
 
     # Optional: ensure user is petsitter
@@ -143,46 +153,278 @@ def create_sitter_service(request):
     except (TypeError, ValueError):
         return Response({"error": "rate must be a number"}, status=status.HTTP_400_BAD_REQUEST)
 
-    ss = SitterService.objects.create(user=user, service=service, address=address, rate=rate_val)
-    return Response(_sitter_service_to_dict(ss), status=status.HTTP_201_CREATED)
+    ss = SitterService.objects.create(user=user, service_id=service_id, address_id=address_id, rate=rate_val)
+    return Response(SITTER_SERVICE_ROW.rows(SitterService.objects).get(id=ss.id), status=status.HTTP_201_CREATED)
+
 
+@idempotent
+@api_view(["POST"])
+def create_sitter_services_bulk(request):
+    """Create many SitterServices for one sitter. Body: user_id, services: [{service_id, address_id, rate}]"""
+    user_id = request.data.get("user_id")
+    items, error = bulk_items(request.data, "services")
+    if error:
+        return error
+    if not _all_ids(user_id):
+        return Response({"error": "Invalid user_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+    user = User.objects.select_related("profile").filter(id=user_id).first()
+    if user is None:
+        return Response({"error": "Invalid user_id"}, status=status.HTTP_400_BAD_REQUEST)
+    profile = getattr(user, "profile", None)
+    if profile and profile.role != "petsitter":
+        return Response({"error": "user must be a petsitter"}, status=status.HTTP_400_BAD_REQUEST)
 
+    # Every referenced service and address in one query each
+    service_ids = {item.get("service_id") for item in items if _all_ids(item.get("service_id"))}
+    address_ids = {item.get("address_id") for item in items if _all_ids(item.get("address_id"))}
+    services = set(Service.objects.filter(id__in=service_ids).values_list("id", flat=True))
+    address_owners = dict(Address.objects.filter(id__in=address_ids).values_list("id", "user_id"))
+
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        service_id, address_id, rate = item.get("service_id"), item.get("address_id"), item.get("rate")
+        if not all([service_id, address_id, rate]):
+            errors.append((index, "service_id, address_id, and rate are required"))
+        elif not _all_ids(service_id, address_id) or int(service_id) not in services or int(address_id) not in address_owners:
+            errors.append((index, "Invalid service_id/address_id"))
+        elif address_owners[int(address_id)] != user.id:
+            errors.append((index, "address_id does not belong to user_id"))
+        else:
+            try:
+                rows.append(SitterService(user=user, service_id=service_id, address_id=address_id, rate=float(rate)))
+            except (TypeError, ValueError):
+                errors.append((index, "rate must be a number"))
+    if errors:
+        return invalid_items_response(errors)
+
+    with transaction.atomic():
+        created = SitterService.objects.bulk_create(rows)
+    ids = [ss.id for ss in created]
+    by_id = {ss["id"]: ss for ss in SITTER_SERVICE_ROW.rows(SitterService.objects.filter(id__in=ids))}
+    return Response([by_id[ss_id] for ss_id in ids], status=status.HTTP_201_CREATED)
+
+
+@read_from_replica
 @api_view(["GET"])
 def list_sitter_services_for_user(request, user_id: int):
     """List sitter services for a given user_id with expanded details."""
-    services = SitterService.objects.filter(user_id=user_id).select_related("user", "service", "address")
-    data = [_sitter_service_to_dict(ss) for ss in services]
-    return Response(data)
+    services = SITTER_SERVICE_ROW.rows(SitterService.objects.filter(user_id=user_id))
+    paginator = KeysetPagination(("-created_at", "-id"))
+    page = paginator.paginate_queryset(services, request)
+    if page is not None:
+        return paginator.get_paginated_response(page)
+    if wants_stream(request):
+        return streaming_json_response(services.iterator(chunk_size=STREAM_CHUNK_SIZE))
+    return Response(list(services))
 
 
+@read_from_replica
 @api_view(["GET"])
 def sitter_service_detail(request, sitter_service_id: int):
     try:
-        ss = SitterService.objects.select_related("user", "service", "address").get(id=sitter_service_id)
+        ss = SITTER_SERVICE_ROW.rows(SitterService.objects).get(id=sitter_service_id)
     except SitterService.DoesNotExist:
         return Response({"error": "Not found"}, status=status.HTTP_404_NOT_FOUND)
-    return Response(_sitter_service_to_dict(ss))
+    return Response(ss)
 
 
-# --------- Ad APIs ---------
+SEARCH_DEFAULT_RADIUS_KM = 10
+SEARCH_MAX_RADIUS_KM = 50
+SEARCH_MAX_RESULTS = 200
 
+
+@read_from_replica
 @api_view(["GET"])
-def get_all_ads(request):
-    """Return all ads with image_url, punch_line, and url."""
-    ads = Ad.objects.all().order_by('-created_at')
+def search_sitter_services(request):
+    """Sitter services near a point, closest first.
+
+    Query: lat, lng (required), radius_km (default 10, max 50), pet, service_id, limit.
+    Candidates come from a grid-cell/bounding-box filter in SQL; exact
+    haversine distances are then computed for all of them in one NumPy pass.
+    """
+    params = request.query_params
+    try:
+        lat = float(params["lat"])
+        lng = float(params["lng"])
+        radius_km = float(params.get("radius_km", SEARCH_DEFAULT_RADIUS_KM))
+        limit = int(params.get("limit", SEARCH_MAX_RESULTS))
+        service_id = int(params["service_id"]) if params.get("service_id") else None
+    except KeyError:
+        return Response({"error": "lat and lng are required"}, status=status.HTTP_400_BAD_REQUEST)
+    except (TypeError, ValueError):
+        return Response({"error": "lat, lng, radius_km, limit and service_id must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return Response({"error": "lat/lng out of range"}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < radius_km <= SEARCH_MAX_RADIUS_KM:
+        return Response({"error": f"radius_km must be between 0 and {SEARCH_MAX_RADIUS_KM}"}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+
+    candidates = SitterService.objects.filter(geo.box_filter(geo.bounding_box(lat, lng, radius_km), prefix="address__"))
+    pet = params.get("pet")
+    if pet:
+        if pet not in {k for k, _ in PET_CHOICES}:
+            return Response({"error": "Invalid pet"}, status=status.HTTP_400_BAD_REQUEST)
+        candidates = candidates.filter(service__pet=pet)
+    if service_id is not None:
+        candidates = candidates.filter(service_id=service_id)
+
+    rows = np.array(list(candidates.values_list("id", "address__latitude", "address__longitude")), dtype=float).reshape(-1, 3)
+    distances = geo.haversine_km(lat, lng, rows[:, 1], rows[:, 2])
+    inside = np.flatnonzero(distances <= radius_km)
+    nearest = inside[np.argsort(distances[inside], kind="stable")[:limit]]
+
+    ids = rows[nearest, 0].astype(int).tolist()
+    by_id = {ss["id"]: ss for ss in SITTER_SERVICE_ROW.rows(SitterService.objects.filter(id__in=ids))}
     data = [
-        {
-            "id": ad.id,
-            "punch_line": ad.punch_line,
-            "url": ad.url,
-            "image_url": (ad.image.url if ad.image else None),
-            "created_at": ad.created_at,
-        }
-        for ad in ads
+        {**by_id[ss_id], "distance_km": round(float(distance), 3)}
+        for ss_id, distance in zip(ids, distances[nearest])
     ]
     return Response(data)
 
 
+DISCOVER_DEFAULT_RADIUS_KM = 25
+DISCOVER_DEFAULT_LIMIT = 50
+
+
+@api_view(["GET"])
+def discover_sitter_services(request):
+    """Sitter services ranked for a user, best first.
+
+    Query: address_id (the user's address, required), service_id or pet,
+    radius_km (default 25, max 50), limit (default 50, max 200). Scores
+    weigh rate, rating, distance and completion ratio (see mainApp.discovery).
+    """
+    params = request.query_params
+    try:
+        address_id = int(params["address_id"])
+        service_id = int(params["service_id"]) if params.get("service_id") else None
+        radius_km = float(params.get("radius_km", DISCOVER_DEFAULT_RADIUS_KM))
+        limit = int(params.get("limit", DISCOVER_DEFAULT_LIMIT))
+    except KeyError:
+        return Response({"error": "address_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+    except (TypeError, ValueError):
+        return Response({"error": "address_id, service_id, radius_km and limit must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+    pet = params.get("pet") or None
+    if service_id is None and pet is None:
+        return Response({"error": "service_id or pet is required"}, status=status.HTTP_400_BAD_REQUEST)
+    if pet is not None and pet not in {k for k, _ in PET_CHOICES}:
+        return Response({"error": "Invalid pet"}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < radius_km <= SEARCH_MAX_RADIUS_KM:
+        return Response({"error": f"radius_km must be between 0 and {SEARCH_MAX_RADIUS_KM}"}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+
+    point = Address.objects.filter(id=address_id).values_list("latitude", "longitude").first()
+    if point is None:
+        return Response({"error": "Address not found"}, status=status.HTTP_404_NOT_FOUND)
+    if None in point:
+        return Response({"error": "Address has no coordinates"}, status=status.HTTP_400_BAD_REQUEST)
+
+    ranked = discovery.discover(*point, radius_km, limit, service_id=service_id, pet=pet)
+    by_id = {ss["id"]: ss for ss in SITTER_SERVICE_ROW.rows(SitterService.objects.filter(id__in=[r[0] for r in ranked]))}
+    # A winner deleted since the last index refresh is skipped
+    return Response([
+        {**by_id[ss_id], "score": round(score, 4), "distance_km": round(distance, 3)}
+        for ss_id, score, distance in ranked if ss_id in by_id
+    ])
+
+
+def _window(start, end):
+    return {"start": start, "end": end}
+
+
+@read_from_replica
+@api_view(["GET", "POST"])
+def sitter_service_availability(request, sitter_service_id: int):
+    """
+    GET: availability windows of the sitter service ending after ?from= (default now), up to ?to=
+    POST: add windows. Body: {"windows": [{"start", "end"}]}
+    """
+    if request.method == "GET":
+        try:
+            start = _parse_datetime(request.query_params["from"]) if "from" in request.query_params else timezone.now()
+            end = _parse_datetime(request.query_params["to"]) if "to" in request.query_params else None
+        except (AttributeError, ValueError):
+            return Response({"error": "Invalid from or to. Use ISO format"}, status=status.HTTP_400_BAD_REQUEST)
+        windows = SitterAvailability.objects.filter(sitter_service_id=sitter_service_id, ends_at__gt=start)
+        if end is not None:
+            windows = windows.filter(starts_at__lt=end)
+        return Response([_window(*w) for w in windows.order_by("ends_at").values_list("starts_at", "ends_at")])
+
+    windows = request.data.get("windows")
+    if not isinstance(windows, list) or not windows:
+        return Response({"error": "windows must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if not SitterService.objects.filter(id=sitter_service_id).exists():
+        return Response({"error": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+    parsed = []
+    for window in windows:
+        try:
+            start, end = _parse_datetime(window["start"]), _parse_datetime(window["end"])
+        except (KeyError, TypeError, AttributeError, ValueError):
+            return Response({"error": "Each window needs ISO start and end"}, status=status.HTTP_400_BAD_REQUEST)
+        if end <= start:
+            return Response({"error": "Each window must end after it starts"}, status=status.HTTP_400_BAD_REQUEST)
+        parsed.append(SitterAvailability(sitter_service_id=sitter_service_id, starts_at=start, ends_at=end))
+    SitterAvailability.objects.bulk_create(parsed)
+    return Response([_window(w.starts_at, w.ends_at) for w in parsed], status=status.HTTP_201_CREATED)
+
+
+FREE_WINDOWS_MAX_SERVICES = 100
+FREE_WINDOWS_MAX_DAYS = 31
+
+
+@read_from_replica
+@api_view(["GET"])
+def sitter_services_free_windows(request):
+    """Free time of many sitter services in one query.
+
+    Query: ids (comma-separated sitter service ids), from, to (ISO datetimes),
+    min_minutes (drop shorter windows). Free time is a service's availability
+    minus every booking of its sitter.
+    """
+    params = request.query_params
+    try:
+        ids = list(dict.fromkeys(int(i) for i in params.get("ids", "").split(",") if i.strip()))
+        min_minutes = int(params.get("min_minutes", 0))
+    except ValueError:
+        return Response({"error": "ids and min_minutes must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+    if not ids:
+        return Response({"error": "ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > FREE_WINDOWS_MAX_SERVICES:
+        return Response({"error": f"At most {FREE_WINDOWS_MAX_SERVICES} ids"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        start, end = _parse_datetime(params["from"]), _parse_datetime(params["to"])
+    except KeyError:
+        return Response({"error": "from and to are required"}, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError:
+        return Response({"error": "Invalid from or to. Use ISO format"}, status=status.HTTP_400_BAD_REQUEST)
+    if not start < end <= start + timedelta(days=FREE_WINDOWS_MAX_DAYS):
+        return Response(
+            {"error": f"to must be after from, by at most {FREE_WINDOWS_MAX_DAYS} days"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    free = bookings.free_windows(ids, start, end, timedelta(minutes=min_minutes))
+    return Response([
+        {"sitter_service_id": ss_id, "free": [_window(*w) for w in free[ss_id]]} for ss_id in ids
+    ])
+
+
+# --------- Ad APIs ---------
+
+@cached_catalog_response
+@read_from_replica
+@api_view(["GET"])
+def get_all_ads(request):
+    """Return all ads with image_url, punch_line, and url."""
+    ads = AD_ROW.rows(Ad.objects.all()).order_by('-created_at')
+    paginator = KeysetPagination(("-created_at", "-id"))
+    page = paginator.paginate_queryset(ads, request)
+    if page is not None:
+        return paginator.get_paginated_response(page)
+    return Response(list(ads))
+
+
 # --------- Pet APIs ---------
 
 @api_view(["POST"])
@@ -235,81 +477,126 @@ def create_pet(request):
         image=image
     )
     
-    return Response(_pet_to_dict(pet_obj), status=status.HTTP_201_CREATED)
+    return Response(PET_ROW.rows(Pet.objects).get(id=pet_obj.id), status=status.HTTP_201_CREATED)
+
+
+@idempotent
+@api_view(["POST"])
+def create_pets_bulk(request):
+    """Create many Pets for one user. Body: user_id, pets: [{name, pet, breed, age, bio, important_info}]"""
+    user_id = request.data.get("user_id")
+    items, error = bulk_items(request.data, "pets")
+    if error:
+        return error
+    if not _all_ids(user_id):
+        return Response({"error": "Invalid user_id"}, status=status.HTTP_400_BAD_REQUEST)
 
+    user = User.objects.select_related("profile").filter(id=user_id).first()
+    if user is None:
+        return Response({"error": "Invalid user_id"}, status=status.HTTP_400_BAD_REQUEST)
+    profile = getattr(user, "profile", None)
+    if profile and profile.role != "normalUser":
+        return Response({"error": "Only normal users can create pets"}, status=status.HTTP_400_BAD_REQUEST)
 
+    valid_pets = {k for k, _ in PET_CHOICES}
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        name, pet_type, age = item.get("name"), item.get("pet"), item.get("age")
+        if not all([name, pet_type]):
+            errors.append((index, "name and pet are required"))
+            continue
+        if pet_type not in valid_pets:
+            errors.append((index, f"Invalid pet type. Valid choices: {sorted(valid_pets)}"))
+            continue
+        if age in ("", None):
+            age = None
+        else:
+            try:
+                age = int(age)
+            except (TypeError, ValueError):
+                errors.append((index, "Age must be a number"))
+                continue
+            if age < 0:
+                errors.append((index, "Age must be positive"))
+                continue
+        rows.append(Pet(
+            user=user,
+            name=name,
+            pet=pet_type,
+            breed=item.get("breed", ""),
+            age=age,
+            bio=item.get("bio", ""),
+            important_info=item.get("important_info", ""),
+        ))
+    if errors:
+        return invalid_items_response(errors)
+
+    with transaction.atomic():
+        created = Pet.objects.bulk_create(rows)
+    ids = [pet.id for pet in created]
+    by_id = {pet["id"]: pet for pet in PET_ROW.rows(Pet.objects.filter(id__in=ids))}
+    return Response([by_id[pet_id] for pet_id in ids], status=status.HTTP_201_CREATED)
+
+
+@read_from_replica
 @api_view(["GET"])
 def list_pets_for_user(request, user_id: int):
     """List all pets for a given user_id."""
-    pets = Pet.objects.filter(user_id=user_id).order_by('name')
-    data = [_pet_to_dict(pet) for pet in pets]
-    return Response(data)
+    pets = PET_ROW.rows(Pet.objects.filter(user_id=user_id)).order_by('name')
+    paginator = KeysetPagination(("name", "id"))
+    page = paginator.paginate_queryset(pets, request)
+    if page is not None:
+        return paginator.get_paginated_response(page)
+    if wants_stream(request):
+        return streaming_json_response(pets.iterator(chunk_size=STREAM_CHUNK_SIZE))
+    return Response(list(pets))
+
 
+# --------- Order APIs ---------
 
-def _pet_to_dict(pet: Pet):
-    return {
-        "id": pet.id,
-        "name": pet.name,
-        "pet": pet.pet,
-        "pet_label": dict(PET_CHOICES).get(pet.pet, pet.pet),
-        "breed": pet.breed,
-        "age": pet.age,
-        "bio": pet.bio,
-        "important_info": pet.important_info,
-        "image_url": (pet.image.url if pet.image else None),
-        "created_at": pet.created_at,
-        "updated_at": pet.updated_at,
-        "user": {
-            "id": pet.user.id,
-            "username": pet.user.username,
-            "email": pet.user.email,
-        }
-    }
+def _order_rows():
+    """Orders as API dicts; the whole graph (users, profiles, ratings, sitter
+    service, pet, address) is JOINed into a single values query."""
+    return ORDER_ROW.rows(Order.objects.all())
 
 
-# --------- Order APIs ---------
+ORDER_KEYSET = ("-created_at", "-id")
+
+
+def _user_orders(user_id, after=None, limit=None, chunk_size=None):
+    """Iterate orders where user_id is the customer or the petsitter, newest first.
 
-def _address_to_dict(address):
-    """Helper function to convert Address object to dict"""
-    return {
-        "id": address.id,
-        "address": address.address,
-        "city": address.city,
-        "state": address.state,
-        "zipcode": address.zipcode,
-        "latitude": address.latitude,
-        "longitude": address.longitude,
-        "country": address.country,
-        "created_at": address.created_at,
-        "updated_at": address.updated_at,
-    }
-
-def _order_to_dict(order: Order):
-    return {
-        "id": order.id,
-        "quantity": order.quantity,
-        "final_rate": float(order.final_rate),
-        "start_datetime": order.start_datetime,
-        "status": order.status,
-        "msg_for_user": order.msg_for_user,
-        "msg_for_petsitter": order.msg_for_petsitter,
-        "rating_for_petsitter": order.rating_for_petsitter,
-        "rating_review_for_petsitter": order.rating_review_for_petsitter,
-        "rating_for_user": order.rating_for_user,
-        "rating_review_for_user": order.rating_review_for_user,
-        "created_at": order.created_at,
-        "updated_at": order.updated_at,
-        "normal_user": _user_to_dict(order.normal_user),
-        "petsitter_user": _user_to_dict(order.petsitter_user),
-        "service_model": _sitter_service_to_dict(order.service_model),
-        "pet": _pet_to_dict(order.pet) if order.pet else None,
-        "user_address": _address_to_dict(order.user_address) if order.user_address else None,
-    }
+    Rather than ``normal_user_id = ? OR petsitter_user_id = ?`` (a multi-index
+    OR followed by a temp B-tree sort), each side is read as an ordered range
+    scan on its (user, created_at) index and the two sorted streams are merged
+    here. ``after`` is a keyset position and ``limit`` caps the result;
+    ``chunk_size`` reads both sides with server-side chunked cursors.
+    """
+    customer_side = _order_rows().filter(normal_user_id=user_id)
+    # Orders where the user is on both sides already come from customer_side
+    sitter_side = _order_rows().filter(petsitter_user_id=user_id).exclude(normal_user_id=user_id)
+    streams = []
+    for orders in (customer_side, sitter_side):
+        if after is not None:
+            orders = orders.filter(keyset_filter(ORDER_KEYSET, after))
+        orders = orders.order_by(*ORDER_KEYSET)
+        if limit is not None:
+            orders = orders[:limit]
+        streams.append(orders.iterator(chunk_size=chunk_size) if chunk_size else orders)
+    merged = heapq.merge(*streams, key=lambda o: (o["created_at"], o["id"]), reverse=True)
+    return itertools.islice(merged, limit)
 
 
+def _parse_datetime(value):
+    """Aware datetime from an ISO string (naive means the server time zone); raises ValueError."""
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+@idempotent
 @api_view(["POST"])
 def create_order(request):
-    """Create order. Body: normal_user_id, petsitter_user_id, service_model_id, pet_id, user_address_id, quantity, start_datetime"""
+    """Create order. Body: normal_user_id, petsitter_user_id, service_model_id, pet_id, user_address_id, quantity, start_datetime, end_datetime (optional)"""
     normal_user_id = request.data.get("normal_user_id")
     petsitter_user_id = request.data.get("petsitter_user_id")
     service_model_id = request.data.get("service_model_id")
@@ -317,17 +604,31 @@ def create_order(request):
     user_address_id = request.data.get("user_address_id")
     quantity = request.data.get("quantity", 1)
     start_datetime = request.data.get("start_datetime")
+    end_datetime = request.data.get("end_datetime")
 
     if not all([normal_user_id, petsitter_user_id, service_model_id, pet_id, user_address_id, start_datetime]):
         return Response({"error": "normal_user_id, petsitter_user_id, service_model_id, pet_id, user_address_id, start_datetime are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    try:
-        normal_user = User.objects.get(id=normal_user_id)
-        petsitter_user = User.objects.get(id=petsitter_user_id)
-        service_model = SitterService.objects.get(id=service_model_id)
-        pet = Pet.objects.get(id=pet_id)
-        user_address = Address.objects.get(id=user_address_id)
-    except (User.DoesNotExist, SitterService.DoesNotExist, Pet.DoesNotExist, Address.DoesNotExist):
+    if not _all_ids(normal_user_id, petsitter_user_id, service_model_id, pet_id, user_address_id):
+        return Response({"error": "Invalid user, service_model, pet, or address ID"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Two queries resolve every reference: both users with their profiles, then
+    # the sitter service together with the owners of the pet and the address
+    users = User.objects.select_related("profile").in_bulk({int(normal_user_id), int(petsitter_user_id)})
+    service_model = (
+        SitterService.objects.annotate(
+            pet_user_id=Subquery(Pet.objects.filter(id=pet_id).values("user_id")),
+            address_user_id=Subquery(Address.objects.filter(id=user_address_id).values("user_id")),
+        )
+        .filter(id=service_model_id)
+        .first()
+    )
+    normal_user = users.get(int(normal_user_id))
+    petsitter_user = users.get(int(petsitter_user_id))
+    if (
+        normal_user is None or petsitter_user is None or service_model is None
+        or service_model.pet_user_id is None or service_model.address_user_id is None
+    ):
         return Response({"error": "Invalid user, service_model, pet, or address ID"}, status=status.HTTP_400_BAD_REQUEST)
 
     # Validate quantity
@@ -340,9 +641,18 @@ def create_order(request):
 
     # Parse start_datetime (ISO format expected)
     try:
-        start_dt = datetime.fromisoformat(start_datetime.replace('Z', '+00:00'))
-    except ValueError:
+        start_dt = _parse_datetime(start_datetime)
+    except (TypeError, AttributeError, ValueError):
         return Response({"error": "Invalid start_datetime format. Use ISO format"}, status=status.HTTP_400_BAD_REQUEST)
+    if end_datetime:
+        try:
+            end_dt = _parse_datetime(end_datetime)
+        except (TypeError, AttributeError, ValueError):
+            return Response({"error": "Invalid end_datetime format. Use ISO format"}, status=status.HTTP_400_BAD_REQUEST)
+        if end_dt <= start_dt:
+            return Response({"error": "end_datetime must be after start_datetime"}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        end_dt = bookings.default_end(start_dt, quantity)
 
     # Validate user roles
     normal_profile = getattr(normal_user, "profile", None)
@@ -355,62 +665,102 @@ def create_order(request):
         return Response({"error": "petsitter_user_id must be a petsitter"}, status=status.HTTP_400_BAD_REQUEST)
 
     # Validate pet belongs to normal_user
-    if pet.user_id != normal_user.id:
+    if service_model.pet_user_id != normal_user.id:
         return Response({"error": "pet_id must belong to normal_user_id"}, status=status.HTTP_400_BAD_REQUEST)
 
     # Validate address belongs to normal_user
-    if user_address.user_id != normal_user.id:
+    if service_model.address_user_id != normal_user.id:
         return Response({"error": "user_address_id must belong to normal_user_id"}, status=status.HTTP_400_BAD_REQUEST)
 
-    order = Order.objects.create(
-        normal_user=normal_user,
-        petsitter_user=petsitter_user,
-        service_model=service_model,
-        pet=pet,
-        user_address=user_address,
-        quantity=quantity,
-        start_datetime=start_dt
+    # The overlap check and the booking commit together, so two orders cannot take the same time
+    with transaction.atomic():
+        bookings.lock_sitter(petsitter_user.id)
+        if bookings.is_booked(petsitter_user.id, start_dt, end_dt):
+            return Response({"error": "The petsitter is already booked at that time"}, status=status.HTTP_409_CONFLICT)
+        # final_rate is computed in Order.save() from the service_model loaded above
+        order = Order.objects.create(
+            normal_user=normal_user,
+            petsitter_user=petsitter_user,
+            service_model=service_model,
+            pet_id=pet_id,
+            user_address_id=user_address_id,
+            quantity=quantity,
+            start_datetime=start_dt
+        )
+        Booking.objects.create(
+            order=order, sitter=petsitter_user, sitter_service=service_model, starts_at=start_dt, ends_at=end_dt,
+        )
+    publish_order_event(
+        "order.created", order.id, (normal_user.id, petsitter_user.id),
+        {"status": order.status, "start_datetime": order.start_datetime, "updated_at": order.updated_at},
     )
-    
-    return Response(_order_to_dict(order), status=status.HTTP_201_CREATED)
 
+    return Response(_order_rows().get(id=order.id), status=status.HTTP_201_CREATED)
 
+
+@read_from_replica
 @api_view(["GET"])
 def list_orders_for_user(request, user_id: int):
     """List orders for user_id (as normal user OR petsitter)"""
-    from django.db import models
-    orders = Order.objects.filter(
-        models.Q(normal_user_id=user_id) | models.Q(petsitter_user_id=user_id)
-    ).select_related("normal_user", "petsitter_user", "service_model__user", "service_model__service", "service_model__address").order_by('-created_at')
-    
-    data = [_order_to_dict(order) for order in orders]
-    return Response(data)
+    paginator = KeysetPagination(ORDER_KEYSET)
+    if paginator.is_requested(request):
+        limit = paginator.get_limit(request)
+        orders = list(_user_orders(user_id, after=paginator.get_position(request, Order), limit=limit + 1))
+        page = paginator.trim_page(orders, limit)
+        return paginator.get_paginated_response(page)
+
+    if wants_stream(request):
+        return streaming_json_response(_user_orders(user_id, chunk_size=STREAM_CHUNK_SIZE))
+    return Response(list(_user_orders(user_id)))
+
+
+# Deliberately not read_from_replica: a lagging replica would lose rows behind the watermark
+@api_view(["GET"])
+def sync_for_user(request, user_id: int):
+    """Orders, pets, addresses and services changed or deleted since ?since=<watermark>."""
+    since = request.query_params.get("since")
+    if since:
+        try:
+            since = parse_watermark(since)
+        except ValueError:
+            return Response({"error": "Invalid since watermark"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(changes_since(user_id, since or None))
+
+
+def _transition_response(order_id, transition, *args):
+    """Run an order transition, push its changes (if any) to both participants
+    and answer with the freshly loaded order graph."""
+    try:
+        changes = transition(order_id, *args)
+    except transitions.TransitionError as e:
+        return Response({"error": e.message}, status=e.status_code)
+    order = _order_rows().get(id=order_id)
+    if changes:
+        publish_order_event("order.updated", order_id, (order["normal_user"]["id"], order["petsitter_user"]["id"]), changes)
+    return Response(order)
+
+
+async def order_events(request, user_id: int):
+    """Server-sent events with changes to user_id's orders. Needs ASGI, see mainApp.events."""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    response = StreamingHttpResponse(order_event_stream(user_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @api_view(["PATCH"])
 def approve_order(request, order_id: int):
     """Petsitter approves order (changes status to approved)"""
-    try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
-        return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
-    
-    order.status = "approved"
-    order.save()
-    return Response(_order_to_dict(order))
+    return _transition_response(order_id, transitions.approve)
 
 
 @api_view(["PATCH"])
 def complete_order(request, order_id: int):
     """User marks order as completed"""
-    try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
-        return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
-    
-    order.status = "completed"
-    order.save()
-    return Response(_order_to_dict(order))
+    return _transition_response(order_id, transitions.complete)
 
 
 @api_view(["PATCH"])
@@ -419,15 +769,7 @@ def send_message_to_petsitter(request, order_id: int):
     message = request.data.get("message")
     if not message:
         return Response({"error": "message is required"}, status=status.HTTP_400_BAD_REQUEST)
-    
-    try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
-        return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
-    
-    order.msg_for_petsitter = message
-    order.save()
-    return Response(_order_to_dict(order))
+    return _transition_response(order_id, transitions.message_petsitter, message)
 
 
 @api_view(["PATCH"])
@@ -436,15 +778,57 @@ def send_message_to_user(request, order_id: int):
     message = request.data.get("message")
     if not message:
         return Response({"error": "message is required"}, status=status.HTTP_400_BAD_REQUEST)
-    
+    return _transition_response(order_id, transitions.message_user, message)
+
+
+@read_from_replica
+@idempotent
+@api_view(["GET", "POST"])
+def order_messages(request, order_id: int):
+    """
+    GET: messages of the order with an id above ?after= (default 0), oldest first, at most ?limit=,
+    for the participant ?user_id=
+    POST: append a message. Body: sender_id, text. Returns only the new message id.
+    """
+    if request.method == "GET":
+        if "user_id" not in request.query_params:
+            return Response({"error": "user_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            user_id = int(request.query_params["user_id"])
+            after = int(request.query_params.get("after", 0))
+            limit = int(request.query_params.get("limit", conversations.DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "user_id, after and limit must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+        if limit <= 0:
+            return Response({"error": "limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, conversations.MAX_PAGE_SIZE)
+        # One extra row tells whether the client should read again straight away
+        try:
+            messages = conversations.read_messages(order_id, user_id, after, limit + 1)
+        except transitions.TransitionError as e:
+            return Response({"error": e.message}, status=e.status_code)
+        return Response({"results": messages[:limit], "has_more": len(messages) > limit})
+
+    sender_id = request.data.get("sender_id")
+    text = request.data.get("text")
+    if not sender_id or not text:
+        return Response({"error": "sender_id and text are required"}, status=status.HTTP_400_BAD_REQUEST)
     try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
-        return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
-    
-    order.msg_for_user = message
-    order.save()
-    return Response(_order_to_dict(order))
+        sender_id = int(sender_id)
+    except (TypeError, ValueError):
+        return Response({"error": "sender_id must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(text, str):
+        return Response({"error": "text must be a string"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(text) > conversations.MAX_MESSAGE_LENGTH:
+        return Response(
+            {"error": f"text must be at most {conversations.MAX_MESSAGE_LENGTH} characters"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        message_id = conversations.post_message(order_id, sender_id, text)
+    except transitions.TransitionError as e:
+        return Response({"error": e.message}, status=e.status_code)
+    return Response({"id": message_id}, status=status.HTTP_201_CREATED)
 
 
 @api_view(["PATCH"])
@@ -456,6 +840,11 @@ def add_review(request, order_id: int):
     
     if not all([user_id, review]):
         return Response({"error": "user_id and review are required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return Response({"error": "user_id must be a number"}, status=status.HTTP_400_BAD_REQUEST)
     
     # Validate rating if provided
     if rating is not None:
@@ -465,26 +854,5 @@ def add_review(request, order_id: int):
                 return Response({"error": "Rating must be between 1 and 5"}, status=status.HTTP_400_BAD_REQUEST)
         except (TypeError, ValueError):
             return Response({"error": "Rating must be a number"}, status=status.HTTP_400_BAD_REQUEST)
-    
-    try:
-        order = Order.objects.get(id=order_id)
-        user = User.objects.get(id=user_id)
-    except (Order.DoesNotExist, User.DoesNotExist):
-        return Response({"error": "Order or user not found"}, status=status.HTTP_404_NOT_FOUND)
-    
-    # Determine if user is normal user or petsitter in this order
-    if user.id == order.normal_user.id:
-        # Normal user reviewing petsitter
-        order.rating_review_for_petsitter = review
-        if rating is not None:
-            order.rating_for_petsitter = rating
-    elif user.id == order.petsitter_user.id:
-        # Petsitter reviewing normal user
-        order.rating_review_for_user = review
-        if rating is not None:
-            order.rating_for_user = rating
-    else:
-        return Response({"error": "User not part of this order"}, status=status.HTTP_400_BAD_REQUEST)
-    
-    order.save()
-    return Response(_order_to_dict(order))
+
+    return _transition_response(order_id, transitions.review, user_id, review, rating)
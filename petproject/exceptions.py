@@ -0,0 +1,25 @@
+"""DRF exception handler that turns SQLite lock contention into a retryable 503.
+
+With the default SQLite profile, a transaction that read before writing
+cannot wait for a concurrent writer and fails at once with "database is
+locked" (see petproject.sqlite_backend for the production profile, where
+IMMEDIATE transactions queue on busy_timeout instead). Nothing was written,
+so the client is told to retry rather than shown a 500; the retry then
+either succeeds or gets the view's own answer, such as a 409 conflict.
+"""
+from django.db import OperationalError
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+
+LOCKED_RETRY_AFTER_SECONDS = 1
+
+
+def exception_handler(exc, context):
+    if isinstance(exc, OperationalError) and "database is locked" in str(exc):
+        return Response(
+            {"error": "The database is busy, retry shortly"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(LOCKED_RETRY_AFTER_SECONDS)},
+        )
+    return drf_exception_handler(exc, context)
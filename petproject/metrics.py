@@ -0,0 +1,214 @@
+"""Per-endpoint request metrics, exposed in Prometheus text format at /metrics.
+
+RequestMetricsMiddleware times every request and wraps every database
+connection with ``execute_wrapper`` to count queries and DB time, then files
+the numbers under the resolved URL name. Requests slower than
+``METRICS['SLOW_REQUEST_MS']`` are logged to ``petproject.slow_requests``
+with each query's SQL and duration. Walking the stack for the project code
+that issued a query is only done once the request has run past that
+threshold, so fast requests never pay for it and the queries of a slow one
+from that point on carry their call site. Counters are per process.
+"""
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from mainApp.caching import render_cache_metrics
+
+logger = logging.getLogger("petproject.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_METRICS = {"SLOW_REQUEST_MS": 500, "CAPTURE_CALL_SITES": True}
+
+_PROJECT_DIR = str(Path(settings.BASE_DIR).resolve())
+_THIS_FILE = str(Path(__file__).resolve())
+
+
+def _metrics_settings():
+    return {**DEFAULT_METRICS, **getattr(settings, "METRICS", {})}
+
+
+def _call_site():
+    """``file:line in function`` of the innermost project frame outside this module."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_DIR) and filename != _THIS_FILE and "site-packages" not in filename:
+            return f"{Path(filename).relative_to(_PROJECT_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "<unknown>"
+
+
+class _EndpointStats:
+    __slots__ = ("requests", "buckets", "duration", "queries", "db_time", "response_bytes")
+
+    def __init__(self):
+        self.requests = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._endpoints = defaultdict(_EndpointStats)
+        self._lock = threading.Lock()
+
+    def observe(self, view, duration, queries, db_time, response_bytes):
+        with self._lock:
+            stats = self._endpoints[view]
+            stats.requests += 1
+            stats.duration += duration
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[i] += 1
+                    break
+            stats.queries += queries
+            stats.db_time += db_time
+            stats.response_bytes += response_bytes
+
+    def add_bytes(self, view, n):
+        with self._lock:
+            self._endpoints[view].response_bytes += n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {
+                    "requests": s.requests, "buckets": list(s.buckets), "duration": s.duration,
+                    "queries": s.queries, "db_time": s.db_time, "response_bytes": s.response_bytes,
+                }
+                for view, s in self._endpoints.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def render(self):
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("http_requests_total", "counter", "Requests handled, by URL name.")
+        lines += [f'http_requests_total{{view="{v}"}} {s["requests"]}' for v, s in snapshot.items()]
+
+        family("http_request_duration_seconds", "histogram", "Request latency, by URL name.")
+        for view, s in snapshot.items():
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, s["buckets"]):
+                cumulative += n
+                lines.append(f'http_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {s["requests"]}')
+            lines.append(f'http_request_duration_seconds_sum{{view="{view}"}} {s["duration"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{view="{view}"}} {s["requests"]}')
+
+        family("db_queries_total", "counter", "Database queries issued, by URL name.")
+        lines += [f'db_queries_total{{view="{v}"}} {s["queries"]}' for v, s in snapshot.items()]
+
+        family("db_query_duration_seconds_total", "counter", "Time spent in database queries, by URL name.")
+        lines += [f'db_query_duration_seconds_total{{view="{v}"}} {s["db_time"]:.6f}' for v, s in snapshot.items()]
+
+        family("http_response_bytes_total", "counter", "Response body bytes sent, by URL name.")
+        lines += [f'http_response_bytes_total{{view="{v}"}} {s["response_bytes"]}' for v, s in snapshot.items()]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class _QueryRecorder:
+    """``execute_wrapper`` callable collecting one request's queries.
+
+    Call sites are captured for queries ending at or after the
+    ``capture_after`` perf_counter time, including the one that crossed it;
+    None captures none. The caller's frames are still on the stack then.
+    """
+
+    def __init__(self, capture_after=None):
+        self.capture_after = capture_after
+        self.count = 0
+        self.time = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            end = time.perf_counter()
+            elapsed = end - start
+            self.count += 1
+            self.time += elapsed
+            site = _call_site() if self.capture_after is not None and end >= self.capture_after else None
+            self.queries.append((elapsed, sql, site))
+
+
+def _counting(chunks, view):
+    for chunk in chunks:
+        registry.add_bytes(view, len(chunk))
+        yield chunk
+
+
+async def _acounting(chunks, view):
+    # Async streams, such as server-sent events under ASGI
+    async for chunk in chunks:
+        registry.add_bytes(view, len(chunk))
+        yield chunk
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = _metrics_settings()
+        start = time.perf_counter()
+        recorder = _QueryRecorder(start + config["SLOW_REQUEST_MS"] / 1000 if config["CAPTURE_CALL_SITES"] else None)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else None) or "<unmatched>"
+        if response.streaming:
+            # Streamed bodies are counted as they are sent
+            counting = _acounting if response.is_async else _counting
+            response.streaming_content = counting(response.streaming_content, view)
+            body_bytes = 0
+        else:
+            body_bytes = len(response.content)
+        registry.observe(view, duration, recorder.count, recorder.time, body_bytes)
+
+        if duration * 1000 >= config["SLOW_REQUEST_MS"]:
+            self.log_slow_request(request, view, duration, recorder)
+        return response
+
+    def log_slow_request(self, request, view, duration, recorder):
+        lines = [
+            f"Slow request {request.method} {request.get_full_path()} ({view}): "
+            f"{duration * 1000:.1f} ms, {recorder.count} queries, {recorder.time * 1000:.1f} ms in DB"
+        ]
+        for elapsed, sql, site in recorder.queries:
+            lines.append(f"  {elapsed * 1000:8.2f} ms  {sql}" + (f"  [{site}]" if site else ""))
+        logger.warning("\n".join(lines))
+
+
+def metrics_view(request):
+    body = registry.render() + render_cache_metrics()
+    return HttpResponse(body, content_type="text/plain; version=0.0.4")
@@ -0,0 +1,88 @@
+"""Read replicas for GET list/detail views, with read-your-writes stickiness.
+
+Views wrapped in ``read_from_replica`` run their GET/HEAD requests with
+every ORM read routed to one of ``settings.DATABASE_REPLICAS``; everything
+else, and every write, uses ``default``. After a client's own successful
+write (any non-GET request), ReplicaStickinessMiddleware pins that client to
+the primary for ``REPLICA_READS['STICKY_SECONDS']`` so a freshly created
+order shows up in the very next listing even if the replicas lag. Clients
+are identified by their Authorization header, or their IP address when
+anonymous. The pin lives in ``CACHES['default']``, which settings require
+to be shared between processes whenever replicas are configured.
+
+Streamed responses are rendered after the view returns and read from the
+primary. Tokens are always read from the primary: a client's first request
+after login or registration carries a token its earlier, IP-keyed pin does
+not cover, and a lagging replica would reject it with a 401.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_REPLICA_READS = {"STICKY_SECONDS": 5}
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Models (app_label.model_name) whose reads never go to a replica
+PRIMARY_READ_MODELS = ("authtoken.token",)
+
+_read_alias = ContextVar("read_alias", default=None)
+
+
+def _replica_settings():
+    return {**DEFAULT_REPLICA_READS, **getattr(settings, "REPLICA_READS", {})}
+
+
+def _sticky_key(request):
+    identity = request.META.get("HTTP_AUTHORIZATION") or request.META.get("REMOTE_ADDR", "")
+    return f"replica:sticky:{hashlib.sha1(identity.encode()).hexdigest()}"
+
+
+def read_from_replica(view):
+    """Route the view's reads to a replica, unless the client wrote recently."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replicas = getattr(settings, "DATABASE_REPLICAS", ())
+        if not replicas or request.method not in ("GET", "HEAD") or cache.get(_sticky_key(request)):
+            return view(request, *args, **kwargs)
+        token = _read_alias.set(random.choice(replicas))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    return wrapper
+
+
+class ReplicaStickinessMiddleware:
+    """Pin a client to the primary for a short window after each of its writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and getattr(settings, "DATABASE_REPLICAS", ()):
+            cache.set(_sticky_key(request), True, timeout=_replica_settings()["STICKY_SECONDS"])
+        return response
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_READ_MODELS:
+            return "default"
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema along with the data from sync_replicas
+        return db not in getattr(settings, "DATABASE_REPLICAS", ())
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'petproject.metrics.RequestMetricsMiddleware',
+    'petproject.routers.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,10 +88,49 @@ WSGI_APPLICATION = 'petproject.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DJANGO_DB_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Production SQLite profile, enabled with DJANGO_DB_PROFILE=production.
+# WAL lets readers run alongside the single writer, busy_timeout makes
+# writers queue for the lock instead of failing with "database is locked",
+# and IMMEDIATE transactions take the write lock before their first read.
+# Connections are kept open between requests.
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # durable at checkpoints; safe against corruption in WAL mode
+    'busy_timeout': 5000,  # ms
+    'cache_size': -65536,  # KiB, i.e. 64 MiB per connection
+    'mmap_size': 268435456,  # 256 MiB
+    'temp_store': 'MEMORY',
+}
+
+if os.environ.get('DJANGO_DB_PROFILE') == 'production':
+    DATABASES['default'].update({
+        'ENGINE': 'petproject.sqlite_backend',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRODUCTION_PRAGMAS.items()),
+        },
+    })
+
+# Read replicas for GET list/detail views (see petproject.routers), e.g.
+# DJANGO_DB_REPLICAS=/srv/replica1.sqlite3,/srv/replica2.sqlite3
+# Local SQLite replicas are refreshed from the primary by `manage.py sync_replicas`.
+DATABASE_REPLICAS = []
+for index, path in enumerate(filter(None, os.environ.get('DJANGO_DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'NAME': path, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['petproject.routers.ReplicaRouter']
+
+REPLICA_READS = {
+    'STICKY_SECONDS': 5,  # reads stay on the primary this long after the client's own write
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -110,13 +153,117 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
     
-        'rest_framework.authentication.TokenAuthentication',
+        'userApp.authentication.CachedTokenAuthentication',
 
       
     ],
+    # "database is locked" becomes a 503 with Retry-After, see petproject.exceptions
+    'EXCEPTION_HANDLER': 'petproject.exceptions.exception_handler',
    
     
 }
+# Catalog responses (services, pets, ads) are cached here, see mainApp.caching.
+# Point this at a shared backend (e.g. Memcached/Redis) when running several workers;
+# DJANGO_CACHE_DIR selects a file-based cache shared by all processes on this host.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    }
+}
+if os.environ.get('DJANGO_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['DJANGO_CACHE_DIR'],
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
+# Cached catalog responses expire after this, which also drops those of retired versions
+CATALOG_CACHE = {
+    'TIMEOUT': 60 * 60,  # seconds
+}
+
+# Replica stickiness and the catalog version bumped by sync_replicas must be
+# seen by every worker, which a per-process cache cannot do.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+if DATABASE_REPLICAS and CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+    raise ImproperlyConfigured(
+        'DJANGO_DB_REPLICAS needs a cache shared between processes; set DJANGO_CACHE_DIR or configure CACHES.'
+    )
+
+# Authenticated users are cached per token key in each process. Logouts and user
+# changes reach other processes through CACHES['default'], so share it between workers.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,  # seconds
+}
+
+# Idempotency-Key handling for POST /api/main/orders/ (see mainApp.idempotency)
+IDEMPOTENCY = {
+    'TTL': 24 * 60 * 60,  # seconds a stored response is replayed; purge_idempotency_keys removes older keys
+    'ABANDON_SECONDS': 60,  # an in-flight key older than this is taken over by the next duplicate
+    'RETRY_AFTER_SECONDS': 1,  # Retry-After sent with the 409 for a duplicate of an in-flight request
+}
+
+# Delta sync, see mainApp.sync
+SYNC = {
+    'TOMBSTONE_TTL': 30 * 24 * 60 * 60,  # seconds deletions are kept; older watermarks get a full snapshot
+    'OVERLAP_SECONDS': 5,  # re-send rows this close before the watermark, covering late commits and clock skew
+}
+
+# Background job queue, see mainApp.queue; run workers with `manage.py runworker`
+JOBS = {
+    'VISIBILITY_TIMEOUT': 300,  # seconds a claimed job stays hidden before another worker may retry it
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 10,  # first retry delay, doubled on each further attempt
+    'MAX_BACKOFF_SECONDS': 60 * 60,
+    'POLL_SECONDS': 1.0,  # idle workers check the queue this often
+}
+
+# Sitter calendars, see mainApp.bookings
+BOOKINGS = {
+    'UNIT_MINUTES': 60,  # an order without end_datetime books quantity x this many minutes
+}
+
+# Ranked sitter discovery, see mainApp.discovery; each process keeps its own index
+DISCOVERY = {
+    'WEIGHTS': {'price': 1.0, 'rating': 1.0, 'distance': 1.0, 'completion': 1.0},
+    'REFRESH_SECONDS': 5,  # how stale the in-memory index may get before a request refreshes it
+    'OVERLAP_SECONDS': 5,
+    'RATING_PRIOR': (5, 3.5),  # few ratings count as if mixed with 5 ratings of 3.5
+    'COMPLETION_PRIOR': (5, 0.8),
+}
+
+# Order change events streamed over SSE, see mainApp.events; served by the ASGI app (petproject.asgi)
+ORDER_EVENTS = {
+    'BROKER': 'mainApp.events.InProcessBroker',  # in-process fan-out; swap for a shared broker with several processes
+    'KEEPALIVE_SECONDS': 15,
+    'QUEUE_SIZE': 100,  # events buffered per connection before it is sent a `resync`
+}
+
+# Per-endpoint request metrics, served at /metrics (see petproject.metrics)
+METRICS = {
+    'SLOW_REQUEST_MS': 500,  # requests at least this slow log their SQL and call sites
+    'CAPTURE_CALL_SITES': True,
+}
+
+# Mutes petproject.slow_requests while tests run, see petproject.test_runner
+TEST_RUNNER = 'petproject.test_runner.TestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'petproject.slow_requests': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -0,0 +1,32 @@
+"""SQLite backend with the two connection options Django 5.1 adds.
+
+``OPTIONS["init_command"]`` holds ``;``-separated statements (typically
+PRAGMAs) run on every new connection. ``OPTIONS["transaction_mode"]`` sets how
+``atomic()`` begins transactions; ``"IMMEDIATE"`` takes the write lock up
+front, so a block that reads and then writes waits on ``busy_timeout``
+instead of failing with "database is locked" when it tries to upgrade its
+read lock. On Django 5.1+ the stock ``django.db.backends.sqlite3`` engine
+accepts the same OPTIONS.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.init_command = params.pop("init_command", "")
+        self.transaction_mode = params.pop("transaction_mode", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for statement in self.init_command.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,17 @@
+"""Test runner that keeps diagnostic log output out of the test report.
+
+Tests check these loggers with ``assertLogs``, which swaps in its own handler
+for the duration, so nothing is lost by muting them otherwise.
+"""
+import logging
+
+from django.test.runner import DiscoverRunner
+
+QUIET_LOGGERS = ("petproject.slow_requests",)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).handlers = [logging.NullHandler()]
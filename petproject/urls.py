@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
+from petproject.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -9,6 +10,8 @@ urlpatterns = [
     path('api/user/', include('userApp.api.urls')),
     # Main App APIs
     path('api/main/', include('mainApp.urls')),
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
   
 ]
 
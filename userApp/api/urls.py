@@ -5,6 +5,7 @@ from userApp.api.views import (
     logout_view,
     login_with_email,
     user_addresses,
+    user_addresses_bulk,
 )
 
 urlpatterns = [
@@ -12,4 +13,5 @@ urlpatterns = [
     path('register/' , regisgration_view , name='register') , 
     path('logout/' , logout_view , name='logout'),
     path('users/<int:user_id>/addresses/', user_addresses, name='user-addresses'),
+    path('users/<int:user_id>/addresses/bulk/', user_addresses_bulk, name='user-addresses-bulk'),
 ]
\ No newline at end of file
@@ -5,7 +5,15 @@ from userApp.api.serializers import RegistrationSerializer, UserSerializer, Addr
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import api_view
+from userApp.geo import grid_cell
 from userApp.models import Address
+from django.contrib.auth.models import User
+from django.db import transaction
+from mainApp.bulk import bulk_items, invalid_items_response
+from mainApp.idempotency import idempotent
+from mainApp.pagination import KeysetPagination
+from mainApp.streaming import STREAM_CHUNK_SIZE, streaming_json_response, wants_stream
+from petproject.routers import read_from_replica
 
 @api_view(['POST'])
 def regisgration_view(request):
@@ -68,6 +76,7 @@ def login_with_email(request):
     else:
         return Response({'error': 'Invalid email or password'}, status=status.HTTP_400_BAD_REQUEST)
 
+@read_from_replica
 @api_view(['GET', 'POST'])
 def user_addresses(request, user_id: int):
     """
@@ -78,6 +87,13 @@ def user_addresses(request, user_id: int):
     """
     if request.method == 'GET':
         queryset = Address.objects.filter(user_id=user_id).order_by('-created_at')
+        paginator = KeysetPagination(("-created_at", "-id"))
+        page = paginator.paginate_queryset(queryset, request)
+        if page is not None:
+            return paginator.get_paginated_response(AddressSerializer(page, many=True).data)
+        if wants_stream(request):
+            rows = (AddressSerializer(addr).data for addr in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE))
+            return streaming_json_response(rows)
         serializer = AddressSerializer(queryset, many=True)
         return Response(serializer.data)
 
@@ -96,4 +112,29 @@ def user_addresses(request, user_id: int):
                 country=serializer.validated_data.get('country', ''),
             )
             return Response(AddressSerializer(addr).data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@idempotent
+@api_view(['POST'])
+def user_addresses_bulk(request, user_id: int):
+    """Create many addresses for user_id. Body: {"addresses": [{address, city, state, zipcode, latitude, longitude, country}]}"""
+    items, error = bulk_items(request.data, 'addresses')
+    if error:
+        return error
+    if not User.objects.filter(id=user_id).exists():
+        return Response({'error': 'Invalid user_id'}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = AddressSerializer(data=items, many=True)
+    if not serializer.is_valid():
+        return invalid_items_response([(i, errors) for i, errors in enumerate(serializer.errors) if errors])
+
+    # bulk_create skips Address.save(), so the grid cell is filled in here
+    rows = []
+    for data in serializer.validated_data:
+        addr = Address(user_id=user_id, **data)
+        addr.grid_cell = grid_cell(addr.latitude, addr.longitude)
+        rows.append(addr)
+    with transaction.atomic():
+        created = Address.objects.bulk_create(rows)
+    return Response(AddressSerializer(created, many=True).data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,116 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+DEFAULT_TOKEN_CACHE = {"MAX_SIZE": 10_000, "TTL": 300}
+REVOCATION_KEY = "auth:revoked:{}"
+
+
+def revocation_key(user_id):
+    return REVOCATION_KEY.format(user_id)
+
+
+class TokenCache:
+    """Bounded, thread-safe LRU of token key -> (user, token) with a TTL.
+
+    Each entry remembers the user's revocation stamp in ``CACHES['default']``
+    when it was cached, and is stale once the stamp changes, so a logout or a
+    user change in any process sharing that cache takes effect everywhere.
+    Entries also expire after ``ttl`` seconds, which bounds staleness should
+    a stamp be evicted. ``get`` hands out a copy of the cached user, so
+    requests in other threads never see each other's changes to it.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, stamp, (user, token) = entry
+        if expires_at <= time.monotonic() or cache.get(revocation_key(user.pk)) != stamp:
+            self.invalidate(key)
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return copy.copy(user), token
+
+    def set(self, key, value, stamp=None):
+        """Cache ``value`` = (user, token) under the user's current revocation ``stamp``."""
+        user_id = value[0].pk
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, stamp, value)
+            self._keys_by_user[user_id].add(key)
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            user_id = entry[2][0].pk
+            keys = self._keys_by_user[user_id]
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+    def invalidate(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_config = {**DEFAULT_TOKEN_CACHE, **getattr(settings, "TOKEN_AUTH_CACHE", {})}
+token_cache = TokenCache(max_size=_config["MAX_SIZE"], ttl=_config["TTL"])
+
+
+def revoke_user(user_id):
+    """Drop cached credentials of ``user_id`` here at once, and in every
+    process sharing ``CACHES['default']`` once the change is committed."""
+    token_cache.invalidate_user(user_id)
+    # The stamp outlives every entry cached before it
+    transaction.on_commit(lambda: cache.set(revocation_key(user_id), uuid.uuid4().hex, timeout=token_cache.ttl))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the token -> user query for recently seen tokens.
+
+    Entries are dropped when the token is deleted (logout, admin) or the user
+    row is saved, see the signal handlers in userApp.models.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        # The stamp can only be read once the user id is known. A revocation
+        # landing between the two reads goes unseen until the entry expires.
+        token_cache.set(key, (user, token), stamp=cache.get(revocation_key(user.pk)))
+        return copy.copy(user), token
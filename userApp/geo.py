@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+from django.db.models import Q
+
+# Addresses are bucketed into a fixed lat/lng grid so radius searches can
+# narrow candidates with an index range scan before any distance math.
+GRID_CELL_DEGREES = 0.1  # ~11 km north-south
+GRID_COLUMNS = int(360 / GRID_CELL_DEGREES)
+GRID_ROWS = int(180 / GRID_CELL_DEGREES)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+
+def _row(lat):
+    return min(int((lat + 90) // GRID_CELL_DEGREES), GRID_ROWS - 1)
+
+
+def _column(lng):
+    return int((lng + 180) // GRID_CELL_DEGREES) % GRID_COLUMNS
+
+
+def grid_cell(lat, lng):
+    """Grid cell id for a coordinate, or None when either part is missing."""
+    if lat is None or lng is None:
+        return None
+    return _row(lat) * GRID_COLUMNS + _column(lng)
+
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) enclosing the circle around (lat, lng).
+
+    Longitudes are not normalised, so a box crossing the antimeridian has
+    min_lng < -180 or max_lng > 180.
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, max_lat, -180.0, 180.0
+    widest = max(abs(min_lat), abs(max_lat))
+    dlng = radius_km / (KM_PER_DEGREE_LAT * math.cos(math.radians(widest)))
+    if dlng >= 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+
+def _longitude_spans(min_lng, max_lng):
+    """Split a possibly wrapping longitude range into plain [-180, 180] spans."""
+    if min_lng < -180:
+        return [(min_lng + 360, 180.0), (-180.0, max_lng)]
+    if max_lng > 180:
+        return [(min_lng, 180.0), (-180.0, max_lng - 360)]
+    return [(min_lng, max_lng)]
+
+
+def box_filter(box, prefix=""):
+    """Q restricting ``{prefix}grid_cell`` and lat/lng columns to ``box``.
+
+    Each grid row becomes a contiguous ``grid_cell`` range, so the database
+    answers it with one index range scan per row; the lat/lng comparisons
+    then trim the cells' overhang to the exact box.
+    """
+    min_lat, max_lat, min_lng, max_lng = box
+    spans = _longitude_spans(min_lng, max_lng)
+    cells = Q()
+    for row in range(_row(min_lat), _row(max_lat) + 1):
+        base = row * GRID_COLUMNS
+        for lo, hi in spans:
+            cells |= Q(**{f"{prefix}grid_cell__range": (base + _column(lo), base + _column(min(hi, 180 - 1e-9)))})
+    coords = Q()
+    for lo, hi in spans:
+        coords |= Q(**{f"{prefix}longitude__range": (lo, hi)})
+    return cells & coords & Q(**{f"{prefix}latitude__range": (min_lat, max_lat)})
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distance in km from (lat, lng) to each point of the arrays."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
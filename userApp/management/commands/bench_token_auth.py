@@ -0,0 +1,42 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from userApp.authentication import CachedTokenAuthentication, token_cache
+
+
+class Command(BaseCommand):
+    help = "Compare per-request authentication cost of TokenAuthentication and CachedTokenAuthentication."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        n = options["requests"]
+        # Throwaway user/token, rolled back at the end
+        with transaction.atomic():
+            user = User.objects.create(username="bench-token-auth")
+            token = Token.objects.create(user=user)
+            request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Token {token.key}")
+            token_cache.clear()
+            for backend in (TokenAuthentication(), CachedTokenAuthentication()):
+                elapsed, queries = self._run(backend, request, n)
+                self.stdout.write(
+                    f"{type(backend).__name__:<28} {elapsed / n * 1e6:8.1f} us/request  {queries / n:.2f} queries/request"
+                )
+            transaction.set_rollback(True)
+        token_cache.clear()
+
+    def _run(self, backend, request, n):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for _ in range(n):
+                backend.authenticate(request)
+            elapsed = time.perf_counter() - start
+        return elapsed, len(ctx.captured_queries)
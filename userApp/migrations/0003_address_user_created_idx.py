@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-17 12:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userApp', '0002_address'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['user', 'created_at'], name='address_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-17 12:26
+
+from django.db import migrations, models
+
+from userApp.geo import grid_cell
+
+
+def backfill_grid_cells(apps, schema_editor):
+    Address = apps.get_model('userApp', 'Address')
+    batch = []
+    for addr in Address.objects.exclude(latitude=None).exclude(longitude=None).only('id', 'latitude', 'longitude').iterator():
+        addr.grid_cell = grid_cell(addr.latitude, addr.longitude)
+        batch.append(addr)
+    Address.objects.bulk_update(batch, ['grid_cell'], batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userApp', '0003_address_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='address',
+            name='grid_cell',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-17 13:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userApp', '0005_address_user_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['updated_at'], name='address_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-17 13:42
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userApp', '0006_address_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(django.db.models.functions.text.Lower('city'), name='address_city_lower_idx'),
+        ),
+    ]
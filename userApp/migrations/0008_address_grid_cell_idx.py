@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-17 13:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userApp', '0007_address_city_lower_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The new index leads with grid_cell, so the single-column one goes
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['grid_cell', 'latitude', 'longitude'], name='address_grid_cell_idx'),
+        ),
+        migrations.AlterField(
+            model_name='address',
+            name='grid_cell',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
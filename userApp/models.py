@@ -1,7 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from userApp.authentication import revoke_user, token_cache
+from userApp.geo import grid_cell
 
 ROLE_CHOICES = (
      ("petsitter", "PetSitter"),
@@ -26,6 +29,9 @@ class UserProfile(models.Model):
 
 @receiver(post_save, sender=User)
 def create_or_update_user_profile(sender, instance, created, **kwargs):
+     # Cached auth entries hold a copy of the user row; drop them in every
+     # process so changes such as is_active take effect on the next request
+     revoke_user(instance.pk)
      if created:
          # Default values will be updated by serializers on registration
          UserProfile.objects.create(
@@ -56,6 +62,12 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
              )
 
 
+@receiver(post_delete, sender="authtoken.Token")
+def forget_deleted_token(sender, instance, **kwargs):
+     token_cache.invalidate(instance.key)
+     revoke_user(instance.user_id)
+
+
 class Address(models.Model):
      user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="addresses")
      address = models.CharField(max_length=255, blank=True, default="")
@@ -65,8 +77,29 @@ class Address(models.Model):
      latitude = models.FloatField(null=True, blank=True)
      longitude = models.FloatField(null=True, blank=True)
      country = models.CharField(max_length=120, blank=True, default="")
+     # Spatial bucket of (latitude, longitude), see userApp.geo
+     grid_cell = models.IntegerField(null=True, blank=True, editable=False)
      created_at = models.DateTimeField(auto_now_add=True)
      updated_at = models.DateTimeField(auto_now=True)
 
+     class Meta:
+         indexes = [
+             # Covers the radius search's box filter, which then never reads the table
+             models.Index(fields=["grid_cell", "latitude", "longitude"], name="address_grid_cell_idx"),
+             models.Index(fields=["user", "created_at"], name="address_user_created_idx"),
+             models.Index(fields=["user", "updated_at"], name="address_user_updated_idx"),
+             # Moved sitter addresses are picked up by the discovery index (mainApp.discovery)
+             models.Index(fields=["updated_at"], name="address_updated_idx"),
+             # Case-insensitive city prefix search in the Order admin
+             models.Index(Lower("city"), name="address_city_lower_idx"),
+         ]
+
+     def save(self, *args, **kwargs):
+         self.grid_cell = grid_cell(self.latitude, self.longitude)
+         update_fields = kwargs.get("update_fields")
+         if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+             kwargs["update_fields"] = {*update_fields, "grid_cell"}
+         super().save(*args, **kwargs)
+
      def __str__(self):
          return f"Address({self.user.username} - {self.city})"
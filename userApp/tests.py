@@ -1,3 +1,136 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from userApp import geo
+from userApp.authentication import TokenCache, revocation_key, token_cache
+from userApp.models import Address
+
+
+class AddressPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username="owner", email="owner@example.com")
+        Address.objects.bulk_create(Address(user=self.user, city=f"City {i}") for i in range(5))
+
+    def test_addresses_paginate_with_cursor(self):
+        url = f"/api/user/users/{self.user.id}/addresses/"
+        first = self.client.get(url, {"limit": 3}).data
+        self.assertEqual(len(first["results"]), 3)
+        second = self.client.get(url, {"limit": 3, "cursor": first["next"]}).data
+        self.assertEqual(len(second["results"]), 2)
+        self.assertIsNone(second["next"])
+        seen = {row["id"] for row in first["results"] + second["results"]}
+        self.assertEqual(seen, set(Address.objects.values_list("id", flat=True)))
+
+
+class GridCellTests(TestCase):
+    def test_grid_cell_follows_coordinates(self):
+        user = User.objects.create(username="mover")
+        address = Address.objects.create(user=user, latitude=51.5, longitude=-0.12)
+        self.assertEqual(address.grid_cell, geo.grid_cell(51.5, -0.12))
+        address.latitude, address.longitude = None, None
+        address.save(update_fields=["latitude", "longitude"])
+        address.refresh_from_db()
+        self.assertIsNone(address.grid_cell)
+
+    def test_box_filter_across_antimeridian(self):
+        user = User.objects.create(username="fiji")
+        east = Address.objects.create(user=user, latitude=-17.0, longitude=179.99)
+        west = Address.objects.create(user=user, latitude=-17.0, longitude=-179.99)
+        Address.objects.create(user=user, latitude=-17.0, longitude=170.0)
+        box = geo.bounding_box(-17.0, 179.99, 20)
+        found = set(Address.objects.filter(geo.box_filter(box)).values_list("id", flat=True))
+        self.assertEqual(found, {east.id, west.id})
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username="authed", email="authed@example.com")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.url = f"/api/user/users/{self.user.id}/addresses/"
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_repeat_requests_skip_token_lookup(self):
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as second:
+            self.client.get(self.url)
+        self.assertEqual(len(first.captured_queries) - len(second.captured_queries), 1)
+
+    def test_logout_invalidates(self):
+        self.client.get(self.url)
+        self.assertEqual(self.client.post("/api/user/logout/").status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_user_change_invalidates(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertIsNotNone(cache.get(revocation_key(self.user.id)))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_lru_eviction_and_ttl(self):
+        cache = TokenCache(max_size=2, ttl=60)
+        for key in "abc":
+            cache.set(key, (self.user, key))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), (self.user, "c"))
+        expired = TokenCache(max_size=2, ttl=0)
+        expired.set("a", (self.user, "a"))
+        self.assertIsNone(expired.get("a"))
+
+    def test_revocation_in_another_process(self):
+        self.client.get(self.url)
+        # Another worker deactivated the user and published a new stamp
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        cache.set(revocation_key(self.user.id), "elsewhere")
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_users_are_copies_and_invalidated_per_user(self):
+        other = User.objects.create(username="other")
+        tokens = TokenCache(max_size=10, ttl=60)
+        tokens.set("a", (self.user, "a"))
+        tokens.set("b", (self.user, "b"))
+        tokens.set("c", (other, "c"))
+        tokens.get("a")[0].first_name = "changed in one request"
+        self.assertEqual(tokens.get("a")[0].first_name, "")
+        tokens.invalidate_user(self.user.id)
+        self.assertEqual((tokens.get("a"), tokens.get("b"), len(tokens)), (None, None, 1))
+        self.assertEqual(tokens.get("c")[0], other)
+
+
+class BulkAddressTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username="household")
+        self.url = f"/api/user/users/{self.user.id}/addresses/bulk/"
+
+    def test_creates_all_addresses_with_grid_cells(self):
+        items = [{"city": f"City {i}", "latitude": 51.5 + i, "longitude": -0.12} for i in range(20)]
+        # user check, then SAVEPOINT/INSERT/RELEASE for the transaction
+        with self.assertNumQueries(4):
+            response = self.client.post(self.url, {"addresses": items}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row["city"] for row in response.data], [item["city"] for item in items])
+        address = Address.objects.get(id=response.data[5]["id"])
+        self.assertEqual(address.grid_cell, geo.grid_cell(56.5, -0.12))
+
+    def test_invalid_item_creates_nothing(self):
+        items = [{"city": "Fine"}, {"city": "Broken", "latitude": "north"}]
+        response = self.client.post(self.url, {"addresses": items}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.data["errors"]], [1])
+        self.assertFalse(Address.objects.exists())
 
-# Create your tests here.